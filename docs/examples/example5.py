@@ -0,0 +1,13 @@
+from paseto.paserk.keys import SymmetricKey
+from paseto.protocol.version4 import create_symmetric_key, decrypt, encrypt
+
+message = b"this is a secret message"  # your data
+key = SymmetricKey(create_symmetric_key())  # key is parsed once and reused
+
+token = encrypt(message, key)
+plain_text = decrypt(token, key)
+
+assert plain_text == message
+print(f"token={token}")
+print(f"plain_text={plain_text}")
+print(f"message={message}")
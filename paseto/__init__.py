@@ -1,5 +1,8 @@
-"""This module checks if all dependencies are present."""
+"""This module checks if all dependencies are present and exports the top level API."""
 
 import pysodium
 
-__all__ = ["pysodium"]
+from paseto.dispatch import Decoder, decode
+from paseto.keyring import Keyring, KeyState
+
+__all__ = ["Decoder", "KeyState", "Keyring", "decode", "pysodium"]
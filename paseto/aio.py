@@ -0,0 +1,183 @@
+"""This module processes tokens from coroutines without blocking the event loop.
+
+Every call is offloaded to an executor. Calls with the same operation, key,
+footer and implicit assertion that arrive within a short window are coalesced
+into one call of a batch function, so many concurrent requests cost one
+executor dispatch and one key setup. Cancelled calls are dropped from batches
+not dispatched yet, and a bounded number of calls is in flight at any time.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any, NamedTuple
+
+from paseto.executor import BatchFunction
+from paseto.paserk.keys import PublicKey, SecretKey, SymmetricKey
+from paseto.protocol import version4
+
+DEFAULT_BATCH_WINDOW = 0.001
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_IN_FLIGHT = 4096
+
+
+class _Batch(NamedTuple):
+    """Items waiting for dispatch, the futures of their callers and the dispatch timer."""
+
+    items: list[bytes]
+    futures: list["asyncio.Future[bytes]"]
+    timer: asyncio.TimerHandle
+
+
+def _deliver(
+    futures: list["asyncio.Future[bytes]"],
+    dispatched: "asyncio.Future[list[bytes | Exception]]",
+) -> None:
+    """Hand result or exception of every item to callers still waiting for it."""
+    waiting = [future for future in futures if not future.done()]
+    if dispatched.cancelled():
+        for future in waiting:
+            future.cancel()
+        return
+    error = dispatched.exception()
+    if error is not None:
+        for future in waiting:
+            future.set_exception(error)
+        return
+    for future, result in zip(futures, dispatched.result()):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+class AsyncTokenClient:
+    """Coroutines for version4 operations, batched and run on an executor.
+
+    An instance is bound to the event loop it is first used on.
+    """
+
+    __slots__ = (
+        "_batch_window",
+        "_batches",
+        "_executor",
+        "_max_batch_size",
+        "_semaphore",
+    )
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        *,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> None:
+        """Run batches on executor, by default the default executor of the loop.
+
+        Calls are collected for batch_window seconds or until max_batch_size
+        calls are waiting, whichever comes first. Once max_in_flight calls are
+        waiting for results further calls wait before being batched.
+        """
+        if batch_window < 0:
+            raise ValueError("batch_window must not be negative")
+        if max_batch_size <= 0 or max_in_flight <= 0:
+            raise ValueError("max_batch_size and max_in_flight must be positive")
+        self._executor = executor
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._batches: dict[tuple[Any, ...], _Batch] = {}
+
+    async def submit(
+        self, batch_function: BatchFunction, item: bytes, *args: Any
+    ) -> bytes:
+        """Return result of batch_function([item], *args)[0], raise it if an exception.
+
+        batch_function is one of the *_many() functions of a protocol module,
+        args are its remaining arguments such as key and footer, which must be
+        hashable to group calls into batches.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            future: asyncio.Future[bytes] = loop.create_future()
+            group = (batch_function, *args)
+            batch = self._batches.get(group)
+            if batch is None:
+                timer = loop.call_later(self._batch_window, self._dispatch, group)
+                batch = self._batches[group] = _Batch([], [], timer)
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self._max_batch_size:
+                self._dispatch(group)
+            # cancelling the caller cancels future, which drops item if not dispatched yet
+            return await future
+
+    def _dispatch(self, group: tuple[Any, ...]) -> None:
+        """Run batch of group on the executor."""
+        batch = self._batches.pop(group)
+        batch.timer.cancel()
+        waiting = [
+            (item, future)
+            for item, future in zip(batch.items, batch.futures)
+            if not future.cancelled()
+        ]
+        if not waiting:
+            return
+        batch_function, *args = group
+        dispatched = asyncio.get_running_loop().run_in_executor(
+            self._executor, batch_function, [item for item, _ in waiting], *args
+        )
+        dispatched.add_done_callback(
+            functools.partial(_deliver, [future for _, future in waiting])
+        )
+
+    async def encrypt(
+        self,
+        message: bytes,
+        key: bytes | SymmetricKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes:
+        """Return v4.local token of message."""
+        return await self.submit(
+            version4.encrypt_many, message, key, footer, implicit_assertion
+        )
+
+    async def decrypt(
+        self,
+        token: bytes,
+        key: bytes | SymmetricKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes:
+        """Return plaintext of v4.local token."""
+        return await self.submit(
+            version4.decrypt_many, token, key, footer, implicit_assertion
+        )
+
+    async def sign(
+        self,
+        message: bytes,
+        secret_key: bytes | SecretKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes:
+        """Return v4.public token of message."""
+        return await self.submit(
+            version4.sign_many, message, secret_key, footer, implicit_assertion
+        )
+
+    async def verify(
+        self,
+        signed_message: bytes,
+        public_key: bytes | PublicKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes:
+        """Return message of v4.public token."""
+        return await self.submit(
+            version4.verify_many, signed_message, public_key, footer, implicit_assertion
+        )
@@ -0,0 +1,499 @@
+"""This module contains the size bounded caches of keys and of valid and invalid tokens."""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, NamedTuple, TypeVar
+
+from paseto.claims import parse_time
+from paseto.exceptions import RejectedToken
+from paseto.protocol.common import BATCH_ITEM_ERRORS
+from paseto.protocol.util import pae_update
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class LRUCache(Generic[_K, _V]):
+    """Mapping holding at most maxsize items, dropping the least recently used.
+
+    Hits, misses and evictions are counted. A cache is safe to share between
+    threads, on_evict is called outside of its lock with every dropped item.
+    """
+
+    __slots__ = (
+        "_items",
+        "_lock",
+        "_maxsize",
+        "_on_evict",
+        "evictions",
+        "hits",
+        "misses",
+    )
+
+    def __init__(
+        self, maxsize: int, on_evict: Callable[[_K, _V], None] | None = None
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self._maxsize = maxsize
+        self._on_evict = on_evict
+        self._items: OrderedDict[_K, _V] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def get(self, key: _K) -> _V | None:
+        """Return value of key and mark it as recently used, None if not cached."""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: _K, value: _V) -> None:
+        """Cache value of key, evicting the least recently used item if full."""
+        with self._lock:
+            evicted = self._insert(key, value)
+        self._notify(evicted)
+
+    def get_or_create(self, key: _K, factory: Callable[[_K], _V]) -> _V:
+        """Return cached value of key, created with factory(key) and cached on a miss.
+
+        factory runs outside of the lock, threads missing the same key at the same
+        time may each call it, the first value cached is returned to all of them.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        created = factory(key)
+        evicted = None
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                value = created
+                evicted = self._insert(key, created)
+        self._notify(evicted)
+        return value
+
+    def pop(self, key: _K) -> _V | None:
+        """Remove key and return its value, None if not cached. Not an eviction."""
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all items without calling on_evict, counters are kept."""
+        with self._lock:
+            self._items.clear()
+
+    def _insert(self, key: _K, value: _V) -> tuple[_K, _V] | None:
+        """Insert item while holding the lock, return the evicted item if any."""
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) <= self._maxsize:
+            return None
+        self.evictions += 1
+        return self._items.popitem(last=False)
+
+    def _notify(self, evicted: tuple[_K, _V] | None) -> None:
+        if evicted is not None and self._on_evict is not None:
+            self._on_evict(*evicted)
+
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_TTL = 300.0
+
+# approximate memory used by an entry besides its payload
+_ENTRY_OVERHEAD = 160
+_DIGEST_SIZE = 16
+
+
+class _TokenEntry(NamedTuple):
+    """Verified payload of a token, when it expires and the ID of its key."""
+
+    payload: bytes
+    expires_at: float
+    kid: str
+
+
+class TokenCache:  # pylint: disable=too-many-instance-attributes
+    """Payloads of verified or decrypted tokens, to skip repeated cryptography.
+
+    Entries are keyed by a digest of token, key ID, footer and implicit assertion.
+    They expire when the token does, at the latest after max_ttl seconds, and the
+    least recently used entries are evicted once payloads take more than
+    max_bytes. expiry returns the timestamp a payload expires at, math.inf if it
+    never does, and None if that can not be determined, such as for payloads
+    that are not JSON, which are then not cached. By default it reads the "exp"
+    claim of JSON payloads. Hits, misses, evictions and expirations are counted.
+
+    Claims other than "exp" are not validated, validate them after every hit.
+    """
+
+    __slots__ = (
+        "_by_kid",
+        "_clock",
+        "_entries",
+        "_expiry",
+        "_hash_state",
+        "_lock",
+        "_max_bytes",
+        "_max_ttl",
+        "evictions",
+        "expirations",
+        "hits",
+        "misses",
+        "size",
+    )
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        *,
+        max_ttl: float = DEFAULT_MAX_TTL,
+        clock: Callable[[], float] = time.time,
+        expiry: Callable[[bytes], float | None] | None = None,
+    ) -> None:
+        if max_bytes <= 0 or max_ttl <= 0:
+            raise ValueError("max_bytes and max_ttl must be positive")
+        self._max_bytes = max_bytes
+        self._max_ttl = max_ttl
+        self._clock = clock
+        self._expiry = _payload_expiry if expiry is None else expiry
+        # keyed with a random key, so digests can not be precomputed
+        self._hash_state = hashlib.blake2b(
+            key=os.urandom(_DIGEST_SIZE), digest_size=_DIGEST_SIZE
+        )
+        self._entries: OrderedDict[bytes, _TokenEntry] = OrderedDict()
+        self._by_kid: dict[str, set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # approximate bytes used by all entries
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        token: bytes,
+        kid: str,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes | None:
+        """Return cached payload of token, None if not cached or expired."""
+        digest = self._digest(token, kid, footer, implicit_assertion)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._remove(digest)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry.payload
+
+    def put(
+        self,
+        token: bytes,
+        kid: str,
+        payload: bytes,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> None:
+        """Cache payload of token verified with key kid.
+
+        Payloads that already expired or whose expiry is unknown are not cached.
+        """
+        expiry = self._expiry(payload)
+        if expiry is None:
+            return
+        now = self._clock()
+        expires_at = min(expiry, now + self._max_ttl)
+        size = len(payload) + _ENTRY_OVERHEAD
+        if expires_at <= now or size > self._max_bytes:
+            return
+        digest = self._digest(token, kid, footer, implicit_assertion)
+        with self._lock:
+            if digest in self._entries:
+                self._remove(digest)
+            self._entries[digest] = _TokenEntry(payload, expires_at, kid)
+            self._by_kid.setdefault(kid, set()).add(digest)
+            self.size += size
+            while self.size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def decode(
+        self,
+        token: bytes,
+        kid: str,
+        decode: Callable[[bytes], bytes],
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> bytes:
+        """Return cached payload of token, or payload of decode(token) cached.
+
+        decode must verify or decrypt token with key kid, footer and implicit
+        assertion, its exceptions are raised and nothing is cached.
+        """
+        payload = self.get(token, kid, footer, implicit_assertion)
+        if payload is None:
+            payload = decode(token)
+            self.put(token, kid, payload, footer, implicit_assertion)
+        return payload
+
+    def invalidate(self, kid: str) -> int:
+        """Remove every entry of key kid, such as a revoked key, return their number."""
+        with self._lock:
+            digests = self._by_kid.get(kid, set()).copy()
+            for digest in digests:
+                self._remove(digest)
+        return len(digests)
+
+    def clear(self) -> None:
+        """Remove all entries, counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._by_kid.clear()
+            self.size = 0
+
+    def _digest(
+        self, token: bytes, kid: str, footer: bytes, implicit_assertion: bytes
+    ) -> bytes:
+        state = self._hash_state.copy()
+        pae_update(state, [token, kid.encode(), footer, implicit_assertion])
+        return state.digest()
+
+    def _remove(self, digest: bytes) -> None:
+        """Remove entry while holding the lock."""
+        entry = self._entries.pop(digest)
+        self.size -= len(entry.payload) + _ENTRY_OVERHEAD
+        digests = self._by_kid[entry.kid]
+        digests.discard(digest)
+        if not digests:
+            del self._by_kid[entry.kid]
+
+
+def _payload_expiry(payload: bytes) -> float | None:
+    """Return "exp" claim of a JSON payload as timestamp, math.inf if it has none.
+
+    Returns None if payload is not a JSON object or its "exp" claim is invalid.
+    """
+    try:
+        claims = json.loads(payload)
+    except (ValueError, RecursionError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    if "exp" not in claims:
+        return math.inf
+    try:
+        return parse_time(claims["exp"])
+    except (ValueError, TypeError):
+        return None
+
+
+DEFAULT_MAX_ENTRIES = 65536
+DEFAULT_NEGATIVE_TTL = 60.0
+DEFAULT_ERROR_RATE = 1e-6
+
+
+class BloomFilter:
+    """Approximate set of 16 byte digests with a bounded false positive rate.
+
+    Digests added are always found, digests not added are found with a
+    probability of about error_rate while at most capacity digests were added.
+    """
+
+    __slots__ = ("_bits", "_hash_count", "_size")
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate within (0, 1)")
+        self._size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self._bits
+        return all(
+            bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(digest)
+        )
+
+    def add(self, digest: bytes) -> None:
+        """Add digest to the set."""
+        bits = self._bits
+        for index in self._indexes(digest):
+            bits[index >> 3] |= 1 << (index & 7)
+
+    def clear(self) -> None:
+        """Remove all digests."""
+        self._bits[:] = bytes(len(self._bits))
+
+    def _indexes(self, digest: bytes) -> list[int]:
+        # double hashing, both halves of a uniformly distributed digest
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        return [(first + i * second) % self._size for i in range(self._hash_count)]
+
+
+class NegativeCache:  # pylint: disable=too-many-instance-attributes
+    """Digests of tokens that failed to decode, to reject replays without cryptography.
+
+    Entries are kept for ttl seconds and at most max_entries of them, the oldest
+    are dropped first. With approximate=True digests are kept in two Bloom filters
+    of max_entries digests instead, which take a fixed amount of memory. Entries
+    are kept for ttl to 2 * ttl seconds, and a valid token is rejected with a
+    probability of about error_rate.
+
+    A token failing to decode with some keys may decode once keys change, so
+    the context of a lookup must identify the keys, footer and implicit assertion
+    used, or the cache must be cleared when they change.
+    """
+
+    __slots__ = (
+        "_clock",
+        "_digests",
+        "_filters",
+        "_hash_state",
+        "_lock",
+        "_max_entries",
+        "_rotated_at",
+        "_ttl",
+        "additions",
+        "hits",
+        "misses",
+    )
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        *,
+        ttl: float = DEFAULT_NEGATIVE_TTL,
+        approximate: bool = False,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0 or ttl <= 0:
+            raise ValueError("max_entries and ttl must be positive")
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._hash_state = hashlib.blake2b(
+            key=os.urandom(_DIGEST_SIZE), digest_size=_DIGEST_SIZE
+        )
+        self._digests: OrderedDict[bytes, float] = OrderedDict()
+        # current and previous filter in approximate mode
+        self._filters: list[BloomFilter] | None = (
+            [BloomFilter(max_entries, error_rate), BloomFilter(max_entries, error_rate)]
+            if approximate
+            else None
+        )
+        self._rotated_at = clock()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.additions = 0
+
+    def __len__(self) -> int:
+        """Return number of exact entries, always 0 in approximate mode."""
+        return len(self._digests)
+
+    def rejected(self, token: bytes, context: bytes = b"") -> bool:
+        """Return True if token failed to decode in context before."""
+        digest = self._digest(token, context)
+        now = self._clock()
+        with self._lock:
+            if self._filters is not None:
+                self._rotate(now)
+                found = any(digest in bloom_filter for bloom_filter in self._filters)
+            else:
+                expires_at = self._digests.get(digest)
+                found = expires_at is not None and expires_at > now
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def add(self, token: bytes, context: bytes = b"") -> None:
+        """Remember that token failed to decode in context."""
+        digest = self._digest(token, context)
+        now = self._clock()
+        with self._lock:
+            self.additions += 1
+            if self._filters is not None:
+                self._rotate(now)
+                self._filters[0].add(digest)
+                return
+            self._digests.pop(digest, None)
+            self._digests[digest] = now + self._ttl
+            # entries share one ttl, so the oldest expire first
+            while self._digests and (
+                len(self._digests) > self._max_entries
+                or next(iter(self._digests.values())) <= now
+            ):
+                self._digests.popitem(last=False)
+
+    def decode(
+        self, token: bytes, decode: Callable[[bytes], bytes], context: bytes = b""
+    ) -> bytes:
+        """Return decode(token), remembering tokens it raises an exception for.
+
+        Raises RejectedToken without calling decode for tokens that failed before.
+        """
+        if self.rejected(token, context):
+            raise RejectedToken("Token failed to decode before")
+        try:
+            return decode(token)
+        except BATCH_ITEM_ERRORS:
+            self.add(token, context)
+            raise
+
+    def clear(self) -> None:
+        """Forget all tokens, counters are kept."""
+        with self._lock:
+            self._digests.clear()
+            for bloom_filter in self._filters or ():
+                bloom_filter.clear()
+            self._rotated_at = self._clock()
+
+    def _digest(self, token: bytes, context: bytes) -> bytes:
+        state = self._hash_state.copy()
+        pae_update(state, [token, context])
+        return state.digest()
+
+    def _rotate(self, now: float) -> None:
+        """Replace filters older than ttl while holding the lock."""
+        assert self._filters is not None
+        elapsed = now - self._rotated_at
+        if elapsed < self._ttl:
+            return
+        current, previous = self._filters
+        previous.clear()
+        if elapsed >= 2 * self._ttl:
+            current.clear()
+        self._filters = [previous, current]
+        self._rotated_at = now
@@ -0,0 +1,440 @@
+"""This module encodes, decodes and validates the JSON claims of token payloads.
+
+Validation rules are compiled once into a ClaimsValidator, a tuple of checks of
+the claims that have rules, so validating a token only looks up those claims
+instead of walking every rule for every claim. Times are RFC 3339 strings with a
+time zone, as in the registered claims "exp", "nbf" and "iat" of PASETO. They
+are parsed to integer epoch seconds and memoized, as the same token and the
+tokens issued within the same second carry the same times.
+"""
+
+import functools
+import json
+import math
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from datetime import datetime, timezone
+from json.encoder import encode_basestring_ascii
+from json.scanner import make_scanner
+from typing import Any
+
+from paseto.exceptions import InvalidClaims
+
+Claims = dict[str, Any]
+
+TIME_MEMO_SIZE = 4096
+
+# date and time with seconds and a time zone, as RFC 3339 requires
+_RFC3339 = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[Tt](\d{2}:\d{2}:\d{2})(?:\.\d+)?"
+    r"(?:[Zz]|([+-]\d{2}:[0-5]\d))",
+    re.ASCII,
+)
+# whitespace JSON allows between tokens
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# parses one JSON value at an index of a string, raises StopIteration if invalid
+_scan_value = make_scanner(json.JSONDecoder())  # type: ignore[arg-type]
+
+# returns the reason a claim value fails at the current time, None if it passes
+_Check = Callable[[Any, float], str | None]
+
+
+def parse_time(value: Any) -> int:
+    """Return epoch seconds of an RFC 3339 date and time, fractions are dropped.
+
+    Recently parsed strings are memoized. Raises TypeError if value is not a
+    string and ValueError if it is not a date and time with a time zone.
+    """
+    if not isinstance(value, str):
+        raise TypeError(f"Time must be a string, not {type(value).__name__}")
+    return _parse_rfc3339(value)
+
+
+@functools.lru_cache(maxsize=TIME_MEMO_SIZE)
+def _parse_rfc3339(value: str) -> int:
+    match = _RFC3339.fullmatch(value)
+    if match is None:
+        raise ValueError(f"Invalid time {value}")
+    date, time_of_day, offset = match.groups()
+    # fromisoformat() is implemented in C and faster than parsing in Python,
+    # it is given the form every supported Python version reads, fractions are
+    # dropped as flooring the timestamp drops them
+    try:
+        parsed = datetime.fromisoformat(f"{date}T{time_of_day}{offset or '+00:00'}")
+    except ValueError:
+        raise ValueError(f"Invalid time {value}") from None
+    return math.floor(parsed.timestamp())
+
+
+def format_time(value: float | datetime) -> str:
+    """Return ISO 8601 string of a timestamp or an aware datetime.
+
+    Raises ValueError for datetimes without a time zone.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.fromtimestamp(value, timezone.utc)
+    elif value.tzinfo is None:
+        raise ValueError(f"Time {value} has no time zone")
+    return value.isoformat()
+
+
+def encode_claims(claims: Mapping[str, Any]) -> bytes:
+    """Return compact JSON of claims, with datetimes as ISO 8601 strings."""
+    return json.dumps(claims, separators=(",", ":"), default=_json_default).encode()
+
+
+def decode_claims(payload: bytes) -> Claims:
+    """Return claims of a JSON payload, raise InvalidClaims if it is not an object."""
+    try:
+        claims = json.loads(payload)
+    except ValueError as error:
+        raise InvalidClaims("Payload is not JSON") from error
+    if not isinstance(claims, dict):
+        raise InvalidClaims("Payload is not a JSON object")
+    return claims
+
+
+class ClaimsTemplate:  # pylint: disable=too-few-public-methods
+    """Claims with static values encoded once, for payloads that differ in a few claims.
+
+    Templates are immutable and can be shared between threads.
+    """
+
+    __slots__ = ("_names", "_parts", "_slots")
+
+    def __init__(self, claims: Mapping[str, Any], dynamic: Iterable[str]) -> None:
+        """Encode claims except those named in dynamic, which are set per payload.
+
+        Dynamic claims keep their position in claims, their values there are
+        placeholders. Raises ValueError if a dynamic claim is not in claims.
+        """
+        names = frozenset(dynamic)
+        missing = names - claims.keys()
+        if missing:
+            raise ValueError(f"Dynamic claims {sorted(missing)} are not in claims")
+        # JSON text between dynamic values, compact like encode_claims()
+        parts: list[str] = []
+        slots: list[tuple[int, str]] = []
+        static = "{"
+        for name, value in claims.items():
+            if static != "{":
+                static += ","
+            static += encode_basestring_ascii(name) + ":"
+            if name in names:
+                parts.append(static)
+                slots.append((len(parts), name))
+                parts.append("")
+                static = ""
+            else:
+                static += _encode_value(value)
+        parts.append(static + "}")
+        self._parts = parts
+        self._slots = tuple(slots)
+        self._names = names
+
+    def encode(self, values: Mapping[str, Any]) -> bytes:
+        """Return compact JSON of claims with values of the dynamic claims.
+
+        The result is identical to encode_claims() of claims updated with
+        values. Raises ValueError unless values has every dynamic claim only.
+        """
+        if len(values) != len(self._names):
+            raise ValueError(f"Values of exactly {sorted(self._names)} are required")
+        parts = self._parts.copy()
+        try:
+            for slot, name in self._slots:
+                parts[slot] = _encode_value(values[name])
+        except KeyError as error:
+            raise ValueError(f"Value of {error} is required") from None
+        return "".join(parts).encode()
+
+
+def _encode_value(value: Any) -> str:
+    """Return compact JSON of value, with fast paths for strings and integers."""
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value_type is int:
+        return int.__repr__(value)
+    return json.dumps(value, separators=(",", ":"), default=_json_default)
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return format_time(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class LazyClaims(Mapping[str, Any]):
+    """Read-only claims of a JSON payload, parsed only as far as claims are read.
+
+    Top-level claims are parsed one at a time, in order, by the C scanner of
+    the json module, until the claims read are found. Claims after them are
+    never parsed, unless a key read occurs again later in the text, so claims
+    always equal those of decode_claims(). Payloads the scanner can not read
+    are parsed with decode_claims(), which raises InvalidClaims if they are
+    malformed. Errors after the last claim read are
+    only raised once scanning reaches them, iterating parses every claim.
+    Lazy claims are not safe to share between threads.
+    """
+
+    __slots__ = ("_escaped", "_payload", "_position", "_text", "_values")
+
+    def __init__(self, payload: bytes) -> None:
+        self._payload = payload
+        self._values: Claims = {}
+        # index of the next claim in text, -1 once every claim is parsed
+        self._position = -1
+        try:
+            self._text = payload.decode()
+        except UnicodeDecodeError:
+            # other encodings are left to decode_claims()
+            self._text = ""
+        # keys with escapes may equal keys written differently
+        self._escaped = "\\" in self._text
+        position = _skip_whitespace(self._text, 0)
+        if self._text.startswith("{", position):
+            self._position = _skip_whitespace(self._text, position + 1)
+            if self._text.startswith("}", self._position):
+                self._end(self._position + 1)
+        else:
+            self._parse_all()
+
+    def __getitem__(self, key: str) -> Any:
+        self._scan_for((key,))
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        self._scan_all()
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        self._scan_all()
+        return len(self._values)
+
+    def project(self, keys: Iterable[str]) -> Claims:
+        """Return the claims of keys that are present, parsing as few as possible."""
+        wanted = tuple(keys)
+        self._scan_for(wanted)
+        values = self._values
+        return {key: values[key] for key in wanted if key in values}
+
+    def _scan_for(self, keys: tuple[str, ...]) -> None:
+        """Parse claims until keys are parsed and can not occur again."""
+        if self._position < 0:
+            return
+        if self._escaped:
+            self._scan_all()
+            return
+        # only the last occurrence of a key counts, claims after the last
+        # occurrence of each key in the text can not replace it
+        last = max(self._text.rfind(f'"{key}"') for key in keys) if keys else -1
+        values, wanted = self._values, frozenset(keys)
+        while self._position >= 0 and (
+            self._position <= last or not values.keys() >= wanted
+        ):
+            self._scan()
+
+    def _scan_all(self) -> None:
+        while self._position >= 0:
+            self._scan()
+
+    def _scan(self) -> None:
+        """Parse the next claim, or every claim if the scanner can not read it."""
+        text = self._text
+        try:
+            if text[self._position] != '"':
+                raise ValueError("Expected claim name")
+            key, position = _scan_value(text, self._position)
+            position = _skip_whitespace(text, position)
+            if text[position] != ":":
+                raise ValueError("Expected colon")
+            self._values[key], position = _scan_value(
+                text, _skip_whitespace(text, position + 1)
+            )
+            position = _skip_whitespace(text, position)
+            if text[position] == ",":
+                self._position = _skip_whitespace(text, position + 1)
+            elif text[position] == "}":
+                self._end(position + 1)
+            else:
+                raise ValueError("Expected comma")
+        except (StopIteration, ValueError, IndexError):
+            self._parse_all()
+
+    def _end(self, position: int) -> None:
+        if _skip_whitespace(self._text, position) != len(self._text):
+            self._parse_all()
+        self._position = -1
+
+    def _parse_all(self) -> None:
+        self._values = decode_claims(self._payload)
+        self._position = -1
+
+
+def _skip_whitespace(text: str, position: int) -> int:
+    # the pattern matches empty strings, so there always is a match
+    return _WHITESPACE.match(text, position).end()  # type: ignore[union-attr]
+
+
+class CoarseClock:  # pylint: disable=too-few-public-methods
+    """Clock returning the current time in epoch seconds, updated at most once per tick.
+
+    Every token validated within a tick sees the same time, which is behind by
+    up to tick seconds. clock returns the current time as timestamp.
+    """
+
+    __slots__ = ("_clock", "_next_update", "_now", "_tick")
+
+    def __init__(
+        self, tick: float = 1.0, clock: Callable[[], float] = time.time
+    ) -> None:
+        if tick <= 0:
+            raise ValueError("Tick must be positive")
+        self._tick = tick
+        self._clock = clock
+        self._now = 0
+        self._next_update = -math.inf
+
+    def __call__(self) -> int:
+        now = self._clock()
+        if now >= self._next_update:
+            self._now = int(now)
+            self._next_update = now + self._tick
+        return self._now
+
+
+class ClaimsValidator:
+    """Validation rules of claims, compiled once and shared between tokens.
+
+    Validators are immutable and can be shared between threads.
+    """
+
+    __slots__ = ("_checks", "_clock", "_required")
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        issuer: str | None = None,
+        audience: str | Iterable[str] | None = None,
+        subject: str | None = None,
+        required: Iterable[str] = (),
+        leeway: float = 0.0,
+        max_age: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Compile rules for claims.
+
+        Claims must contain every claim in required. With issuer or subject the
+        "iss" or "sub" claim must be present and equal to it, with audience the
+        "aud" claim must be present and one of audience. Claims "exp", "nbf" and
+        "iat" are checked whenever present, with leeway seconds of tolerance for
+        clock skew. With max_age the "iat" claim must be present and at most
+        max_age seconds old. clock returns the current time as timestamp.
+        """
+        required_claims = set(required)
+        checks: list[tuple[str, _Check]] = [
+            ("exp", _expiration(leeway)),
+            ("nbf", _not_before(leeway)),
+            ("iat", _issued_at(leeway, max_age)),
+        ]
+        if issuer is not None:
+            checks.append(("iss", _one_of("iss", frozenset((issuer,)))))
+        if subject is not None:
+            checks.append(("sub", _one_of("sub", frozenset((subject,)))))
+        if audience is not None:
+            audiences = (
+                frozenset((audience,))
+                if isinstance(audience, str)
+                else frozenset(audience)
+            )
+            checks.append(("aud", _one_of("aud", audiences)))
+        required_claims.update(
+            name
+            for name, rule in (("iss", issuer), ("sub", subject), ("aud", audience))
+            if rule is not None
+        )
+        if max_age is not None:
+            required_claims.add("iat")
+        self._checks = tuple(checks)
+        self._required = frozenset(required_claims)
+        self._clock = clock
+
+    def check(self, claims: Mapping[str, Any]) -> str | None:
+        """Return the reason of the first rule claims fail, None if they pass."""
+        if not self._required <= claims.keys():
+            return f"Missing claim {min(self._required - claims.keys())}"
+        now = self._clock()
+        for name, check in self._checks:
+            # null claims are present and fail their rules
+            if name in claims:
+                reason = check(claims[name], now)
+                if reason is not None:
+                    return reason
+        return None
+
+    def validate(self, claims: Mapping[str, Any]) -> None:
+        """Raise InvalidClaims with the reason of the first rule claims fail."""
+        reason = self.check(claims)
+        if reason is not None:
+            raise InvalidClaims(reason)
+
+    def decode(self, payload: bytes) -> Claims:
+        """Return validated claims of a JSON payload, raise InvalidClaims if invalid."""
+        claims = decode_claims(payload)
+        self.validate(claims)
+        return claims
+
+
+def _timestamp(value: Any) -> float | None:
+    """Return timestamp of a time claim, None if it is not a valid time."""
+    try:
+        return parse_time(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _expiration(leeway: float) -> _Check:
+    def check(value: Any, now: float) -> str | None:
+        expiration = _timestamp(value)
+        if expiration is None:
+            return "Invalid exp claim"
+        return "Token has expired" if expiration <= now - leeway else None
+
+    return check
+
+
+def _not_before(leeway: float) -> _Check:
+    def check(value: Any, now: float) -> str | None:
+        not_before = _timestamp(value)
+        if not_before is None:
+            return "Invalid nbf claim"
+        return "Token is not valid yet" if not_before > now + leeway else None
+
+    return check
+
+
+def _issued_at(leeway: float, max_age: float | None) -> _Check:
+    def check(value: Any, now: float) -> str | None:
+        issued_at = _timestamp(value)
+        if issued_at is None:
+            return "Invalid iat claim"
+        if issued_at > now + leeway:
+            return "Token is issued in the future"
+        if max_age is not None and issued_at + max_age < now - leeway:
+            return "Token is too old"
+        return None
+
+    return check
+
+
+def _one_of(name: str, allowed: frozenset[str]) -> _Check:
+    def check(value: Any, _: float) -> str | None:
+        return (
+            None
+            if isinstance(value, str) and value in allowed
+            else f"Invalid {name} claim"
+        )
+
+    return check
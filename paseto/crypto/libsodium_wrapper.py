@@ -1,30 +1,385 @@
-"""This module accesses libsodium via ctypes."""
+"""This module accesses libsodium via ctypes.
+
+Function prototypes and size constants are resolved once at import time.
+Any object supporting the buffer protocol, such as bytes, bytearray, memoryview
+or mmap, can be passed to libsodium without being copied. Read only buffers other
+than bytes are exported with PyObject_GetBuffer(), only buffers that are not
+contiguous are copied. Results are written into ctypes buffers, or into the
+writable buffer given as out.
+"""
 
 import ctypes
 import ctypes.util
+import mmap
+from typing import TypeVar, overload
 
 _library = ctypes.util.find_library("sodium") or ctypes.util.find_library("libsodium")
 if _library is None:
     raise ValueError("Could not find libsodium")
 _sodium = ctypes.cdll.LoadLibrary(_library)
 
+Buffer = bytes | bytearray | memoryview | mmap.mmap
+WritableBuffer = bytearray | memoryview | mmap.mmap
+_WritableBufferT = TypeVar("_WritableBufferT", bytearray, memoryview, mmap.mmap)
+
+_NONCE_SIZE: int = _sodium.crypto_stream_xchacha20_noncebytes()
+_KEY_SIZE: int = _sodium.crypto_stream_xchacha20_keybytes()
+
+_crypto_stream_xchacha20_xor_ic = _sodium.crypto_stream_xchacha20_xor_ic
+# char pointers convert bytes and ctypes arrays faster than void pointers
+_crypto_stream_xchacha20_xor_ic.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+    ctypes.c_uint64,
+    ctypes.c_char_p,
+)
+_crypto_stream_xchacha20_xor_ic.restype = ctypes.c_int
+
+_AEAD_NONCE_SIZE: int = _sodium.crypto_aead_xchacha20poly1305_ietf_npubbytes()
+_AEAD_KEY_SIZE: int = _sodium.crypto_aead_xchacha20poly1305_ietf_keybytes()
+_AEAD_TAG_SIZE: int = _sodium.crypto_aead_xchacha20poly1305_ietf_abytes()
+
+_crypto_aead_xchacha20poly1305_ietf_encrypt = (
+    _sodium.crypto_aead_xchacha20poly1305_ietf_encrypt
+)
+_crypto_aead_xchacha20poly1305_ietf_encrypt.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_void_p,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_void_p,
+    ctypes.c_char_p,
+    ctypes.c_char_p,
+)
+_crypto_aead_xchacha20poly1305_ietf_encrypt.restype = ctypes.c_int
+
+_crypto_aead_xchacha20poly1305_ietf_decrypt = (
+    _sodium.crypto_aead_xchacha20poly1305_ietf_decrypt
+)
+_crypto_aead_xchacha20poly1305_ietf_decrypt.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_void_p,
+    ctypes.c_void_p,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+    ctypes.c_char_p,
+)
+_crypto_aead_xchacha20poly1305_ietf_decrypt.restype = ctypes.c_int
+
+_SIGNATURE_SIZE: int = _sodium.crypto_sign_bytes()
+_SECRET_KEY_SIZE: int = _sodium.crypto_sign_secretkeybytes()
+_PUBLIC_KEY_SIZE: int = _sodium.crypto_sign_publickeybytes()
+
+_crypto_sign_detached = _sodium.crypto_sign_detached
+_crypto_sign_detached.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_void_p,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+)
+_crypto_sign_detached.restype = ctypes.c_int
+
+_crypto_sign_verify_detached = _sodium.crypto_sign_verify_detached
+_crypto_sign_verify_detached.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+)
+_crypto_sign_verify_detached.restype = ctypes.c_int
+
+_GENERICHASH_MIN_SIZE: int = _sodium.crypto_generichash_bytes_min()
+_GENERICHASH_MAX_SIZE: int = _sodium.crypto_generichash_bytes_max()
+_GENERICHASH_KEY_MAX_SIZE: int = _sodium.crypto_generichash_keybytes_max()
+
+_crypto_generichash = _sodium.crypto_generichash
+_crypto_generichash.argtypes = (
+    ctypes.c_char_p,
+    ctypes.c_size_t,
+    ctypes.c_char_p,
+    ctypes.c_ulonglong,
+    ctypes.c_char_p,
+    ctypes.c_size_t,
+)
+_crypto_generichash.restype = ctypes.c_int
+
+_sodium_version_string = _sodium.sodium_version_string
+_sodium_version_string.argtypes = ()
+_sodium_version_string.restype = ctypes.c_char_p
+
+
+# pylint: disable=too-few-public-methods
+class _ExportedBuffer(ctypes.Structure):
+    """Py_buffer of a read only buffer, passed to libsodium as pointer to its contents.
+
+    The export is released when the structure is collected, until then the memory
+    stays valid even while libsodium runs without the GIL.
+    """
+
+    _fields_ = (
+        ("buf", ctypes.c_void_p),
+        ("obj", ctypes.c_void_p),
+        ("len", ctypes.c_ssize_t),
+        ("itemsize", ctypes.c_ssize_t),
+        ("readonly", ctypes.c_int),
+        ("ndim", ctypes.c_int),
+        ("format", ctypes.c_char_p),
+        ("shape", ctypes.c_void_p),
+        ("strides", ctypes.c_void_p),
+        ("suboffsets", ctypes.c_void_p),
+        ("internal", ctypes.c_void_p),
+    )
+
+    @property
+    def _as_parameter_(self) -> ctypes.c_char_p:
+        return ctypes.c_char_p(self.buf)
+
+    def __del__(self) -> None:
+        _PyBuffer_Release(ctypes.byref(self))
+
+
+# PyDLL calls raise the Python exception the function sets
+_PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+_PyObject_GetBuffer.argtypes = (
+    ctypes.py_object,
+    ctypes.POINTER(_ExportedBuffer),
+    ctypes.c_int,
+)
+_PyObject_GetBuffer.restype = ctypes.c_int
+_PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+_PyBuffer_Release.argtypes = (ctypes.POINTER(_ExportedBuffer),)
+_PyBuffer_Release.restype = None
+# PyBUF_SIMPLE, contiguous buffer without format, shape or strides
+_BUFFER_SIMPLE = 0
+
+_Pointer = bytes | ctypes.Array[ctypes.c_char] | _ExportedBuffer
 
-def crypto_stream_xchacha20_xor(message: bytes, nonce: bytes, key: bytes) -> bytes:
+
+def _input_pointer(message: Buffer) -> tuple[_Pointer, int]:
+    """Return pointer to contents of message and its length."""
+    if isinstance(message, bytes):
+        # ctypes passes a pointer to the contents of bytes objects
+        return message, len(message)
+    with memoryview(message) as view:
+        readonly, message_length = view.readonly, view.nbytes
+    if not readonly:
+        return _writable_array(message, message_length), message_length
+    exported = _ExportedBuffer()
+    try:
+        _PyObject_GetBuffer(message, ctypes.byref(exported), _BUFFER_SIMPLE)
+    except BufferError:
+        return bytes(message), message_length
+    return exported, message_length
+
+
+def _writable_array(obj: Buffer, size: int) -> ctypes.Array[ctypes.c_char]:
+    """Return ctypes array sharing memory with a writable buffer."""
+    return (ctypes.c_char * size).from_buffer(obj)
+
+
+@overload
+def crypto_stream_xchacha20_xor(
+    message: Buffer, nonce: bytes, key: bytes, out: None = None
+) -> bytes: ...
+
+
+@overload
+def crypto_stream_xchacha20_xor(
+    message: Buffer, nonce: bytes, key: bytes, out: _WritableBufferT
+) -> _WritableBufferT: ...
+
+
+def crypto_stream_xchacha20_xor(
+    message: Buffer, nonce: bytes, key: bytes, out: WritableBuffer | None = None
+) -> bytes | WritableBuffer:
+    """Gives access to libsodium function of the same name.
+
+    Result is written into out when given, which must be at least as long as message.
+    """
+    # same as crypto_stream_xchacha20_xor_ic() with an initial counter of 0
+    return crypto_stream_xchacha20_xor_ic(message, nonce, 0, key, out)
+
+
+@overload
+def crypto_stream_xchacha20_xor_ic(
+    message: Buffer, nonce: bytes, initial_counter: int, key: bytes, out: None = None
+) -> bytes: ...
+
+
+@overload
+def crypto_stream_xchacha20_xor_ic(
+    message: Buffer,
+    nonce: bytes,
+    initial_counter: int,
+    key: bytes,
+    out: _WritableBufferT,
+) -> _WritableBufferT: ...
+
+
+def crypto_stream_xchacha20_xor_ic(
+    message: Buffer,
+    nonce: bytes,
+    initial_counter: int,
+    key: bytes,
+    out: WritableBuffer | None = None,
+) -> bytes | WritableBuffer:
+    """Gives access to libsodium function of the same name.
+
+    Keystream starts at block "initial_counter", blocks are 64 bytes long.
+    Result is written into out when given, which must be at least as long as message.
+    """
+
+    if len(nonce) != _NONCE_SIZE:
+        raise ValueError("incorrect nonce size")
+    if len(key) != _KEY_SIZE:
+        raise ValueError("incorrect key size")
+
+    message_pointer, message_length = _input_pointer(message)
+    out_pointer = (
+        ctypes.create_string_buffer(message_length)
+        if out is None
+        # raises ValueError when out is too small
+        else _writable_array(out, message_length)
+    )
+    exit_code: int = _crypto_stream_xchacha20_xor_ic(
+        out_pointer, message_pointer, message_length, nonce, initial_counter, key
+    )
+    if exit_code != 0:
+        raise ValueError
+
+    return out_pointer.raw if out is None else out
+
+
+def crypto_aead_xchacha20poly1305_ietf_encrypt(
+    message: Buffer, aad: Buffer | None, nonce: bytes, key: bytes
+) -> bytes:
     """Gives access to libsodium function of the same name."""
 
-    if len(nonce) != _sodium.crypto_stream_xchacha20_noncebytes():
+    if len(nonce) != _AEAD_NONCE_SIZE:
         raise ValueError("incorrect nonce size")
-    if len(key) != _sodium.crypto_stream_xchacha20_keybytes():
+    if len(key) != _AEAD_KEY_SIZE:
         raise ValueError("incorrect key size")
 
-    message_length: ctypes.c_longlong = ctypes.c_longlong(len(message))
+    message_pointer, message_length = _input_pointer(message)
+    aad_pointer, aad_length = _input_pointer(b"" if aad is None else aad)
+    result = ctypes.create_string_buffer(message_length + _AEAD_TAG_SIZE)
+    exit_code: int = _crypto_aead_xchacha20poly1305_ietf_encrypt(
+        result,
+        None,
+        message_pointer,
+        message_length,
+        aad_pointer,
+        aad_length,
+        None,
+        nonce,
+        key,
+    )
+    if exit_code != 0:
+        raise ValueError
+
+    return result.raw
+
 
-    ciphertext = ctypes.create_string_buffer(len(message))
+def crypto_aead_xchacha20poly1305_ietf_decrypt(
+    ciphertext: Buffer, aad: Buffer | None, nonce: bytes, key: bytes
+) -> bytes:
+    """Gives access to libsodium function of the same name."""
+
+    if len(nonce) != _AEAD_NONCE_SIZE:
+        raise ValueError("incorrect nonce size")
+    if len(key) != _AEAD_KEY_SIZE:
+        raise ValueError("incorrect key size")
 
-    exit_code = _sodium.crypto_stream_xchacha20_xor(
-        ciphertext, message, message_length, nonce, key
+    ciphertext_pointer, ciphertext_length = _input_pointer(ciphertext)
+    if ciphertext_length < _AEAD_TAG_SIZE:
+        raise ValueError("truncated ciphertext")
+    aad_pointer, aad_length = _input_pointer(b"" if aad is None else aad)
+    result = ctypes.create_string_buffer(ciphertext_length - _AEAD_TAG_SIZE)
+    exit_code: int = _crypto_aead_xchacha20poly1305_ietf_decrypt(
+        result,
+        None,
+        None,
+        ciphertext_pointer,
+        ciphertext_length,
+        aad_pointer,
+        aad_length,
+        nonce,
+        key,
     )
     if exit_code != 0:
         raise ValueError
 
-    return ciphertext.raw
+    return result.raw
+
+
+def crypto_sign_detached(message: Buffer, secret_key: bytes) -> bytes:
+    """Gives access to libsodium function of the same name."""
+
+    if len(secret_key) != _SECRET_KEY_SIZE:
+        raise ValueError("incorrect secret key size")
+
+    message_pointer, message_length = _input_pointer(message)
+    signature = ctypes.create_string_buffer(_SIGNATURE_SIZE)
+    exit_code: int = _crypto_sign_detached(
+        signature, None, message_pointer, message_length, secret_key
+    )
+    if exit_code != 0:
+        raise ValueError
+
+    return signature.raw
+
+
+def crypto_sign_verify_detached(
+    signature: bytes, message: Buffer, public_key: bytes
+) -> None:
+    """Gives access to libsodium function of the same name.
+
+    Raises ValueError when signature is not valid.
+    """
+
+    if len(signature) != _SIGNATURE_SIZE:
+        raise ValueError("incorrect signature size")
+    if len(public_key) != _PUBLIC_KEY_SIZE:
+        raise ValueError("incorrect public key size")
+
+    message_pointer, message_length = _input_pointer(message)
+    exit_code: int = _crypto_sign_verify_detached(
+        signature, message_pointer, message_length, public_key
+    )
+    if exit_code != 0:
+        raise ValueError
+
+
+def crypto_generichash(
+    message: Buffer, key: bytes = b"", digest_size: int = 32
+) -> bytes:
+    """Gives access to libsodium function of the same name, BLAKE2b."""
+
+    if not _GENERICHASH_MIN_SIZE <= digest_size <= _GENERICHASH_MAX_SIZE:
+        raise ValueError("incorrect digest size")
+    if len(key) > _GENERICHASH_KEY_MAX_SIZE:
+        raise ValueError("incorrect key size")
+
+    message_pointer, message_length = _input_pointer(message)
+    digest = ctypes.create_string_buffer(digest_size)
+    exit_code: int = _crypto_generichash(
+        digest, digest_size, message_pointer, message_length, key, len(key)
+    )
+    if exit_code != 0:
+        raise ValueError
+
+    return digest.raw
+
+
+def sodium_version_string() -> str:
+    """Return version of the loaded libsodium library."""
+    version: bytes = _sodium_version_string()
+    return version.decode()
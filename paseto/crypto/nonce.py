@@ -0,0 +1,77 @@
+"""This module provides sources of random bytes for nonces.
+
+A nonce source is a callable returning the given number of random bytes, such as
+os.urandom(). Encryption functions accept one as nonce_source, so nonces can come
+from a NoncePool, or from a fixed sequence in tests and reproducible benchmarks.
+"""
+
+import os
+import threading
+import weakref
+from collections.abc import Callable
+
+NonceSource = Callable[[int], bytes]
+
+DEFAULT_POOL_SIZE = 16384
+
+
+class NoncePool:
+    """Random bytes read from os.urandom() in large blocks and handed out in slices.
+
+    A pool is safe to share between threads. Bytes are overwritten with zeros as
+    soon as they are handed out, and every pool is emptied in the child process
+    after fork(), so parent and child never hand out the same bytes.
+    """
+
+    __slots__ = ("__weakref__", "_buffer", "_lock", "_position", "_size", "_view")
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE) -> None:
+        """Create empty pool refilled with size random bytes at a time."""
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self._size = size
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._lock = threading.Lock()
+        # empty until first use
+        self._position = size
+        _pools.add(self)
+
+    def __call__(self, size: int) -> bytes:
+        """Return size random bytes."""
+        with self._lock:
+            start = self._position
+            end = start + size
+            if end > self._size:
+                if size > self._size:
+                    return os.urandom(size)
+                self._view[:] = os.urandom(self._size)
+                start, end = 0, size
+            self._position = end
+            view = self._view[start:end]
+            nonce = view.tobytes()
+            view[:] = bytes(size)
+        return nonce
+
+    def reset(self) -> None:
+        """Discard remaining bytes, the pool is refilled at next use."""
+        with self._lock:
+            self._view[:] = bytes(self._size)
+            self._position = self._size
+
+    def _after_fork(self) -> None:
+        # the lock may have been held by a thread which does not exist in the child
+        self._lock = threading.Lock()
+        self.reset()
+
+
+_pools: "weakref.WeakSet[NoncePool]" = weakref.WeakSet()
+
+
+def _reset_pools_after_fork() -> None:
+    for pool in list(_pools):
+        pool._after_fork()  # pylint: disable=protected-access
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
@@ -1,12 +1,511 @@
-"""This module exports third party primitives."""
+"""This module exports third party primitives.
 
-# from nacl.bindings import crypto_aead_xchacha20poly1305_ietf_decrypt as decrypt
-# from nacl.bindings import crypto_aead_xchacha20poly1305_ietf_encrypt as encrypt
-from pysodium import crypto_aead_xchacha20poly1305_ietf_decrypt as decrypt
-from pysodium import crypto_aead_xchacha20poly1305_ietf_encrypt as encrypt
-from pysodium import crypto_sign_detached as sign
-from pysodium import crypto_sign_verify_detached as verify
+Primitives are provided by backends, one library each, kept in a registry.
+A backend is selected once per process with use_backend() and use_hash_backend(),
+or with the PASETO_CRYPTO_BACKEND and PASETO_HASH_BACKEND environment variables.
+Selecting "auto" times every available backend at first use and caches the winner
+on disk, keyed by library versions. Modules binding primitives call subscribe()
+to be notified when the selection changes.
+"""
 
-# from libsodium import sign, verify, decrypt, encrypt
+import hashlib
+import json
+import os
+import platform
+import timeit
+from collections.abc import Callable
+from importlib import metadata
+from pathlib import Path
+from typing import Generic, NamedTuple, TypeVar
 
-__all__ = ["decrypt", "encrypt", "sign", "verify"]
+EncryptFunction = Callable[[bytes, bytes | None, bytes, bytes], bytes]
+DecryptFunction = Callable[[bytes, bytes | None, bytes, bytes], bytes]
+SignFunction = Callable[[bytes, bytes], bytes]
+VerifyFunction = Callable[[bytes, bytes, bytes], None]
+HashFunction = Callable[[bytes, bytes, int], bytes]
+
+
+class Backend(NamedTuple):
+    """Authenticated encryption and signature primitives of one library.
+
+    decrypt and verify raise ValueError when authentication fails.
+    """
+
+    name: str
+    encrypt: EncryptFunction
+    decrypt: DecryptFunction
+    sign: SignFunction
+    verify: VerifyFunction
+
+
+class HashBackend(NamedTuple):
+    """BLAKE2b primitive of one library, called with data, key and digest size."""
+
+    name: str
+    blake2b: HashFunction
+
+
+AUTO = "auto"
+DEFAULT_BACKEND = "pysodium"
+DEFAULT_HASH_BACKEND = "hashlib"
+ENV_BACKEND = "PASETO_CRYPTO_BACKEND"
+ENV_HASH_BACKEND = "PASETO_HASH_BACKEND"
+ENV_CACHE_DIR = "PASETO_CACHE_DIR"
+CACHE_FILE_NAME = "backends.json"
+
+# libraries may be missing, a loader raises one of these when its backend is unavailable
+_LOAD_ERRORS = (ImportError, OSError, ValueError)
+# number of calls and repeats when timing backends in auto mode
+_TIMING_NUMBER = 200
+_TIMING_REPEAT = 3
+
+_BackendT = TypeVar("_BackendT", Backend, HashBackend)
+
+
+class _Registry(Generic[_BackendT]):
+    """Backends of one kind, loaded lazily, and the currently selected one."""
+
+    __slots__ = ("backends", "kind", "loaders", "selected", "subscribers")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.loaders: dict[str, Callable[[], _BackendT]] = {}
+        self.backends: dict[str, _BackendT] = {}
+        self.selected: _BackendT | None = None
+        self.subscribers: list[Callable[[_BackendT], None]] = []
+
+    def register(self, name: str, loader: Callable[[], _BackendT]) -> None:
+        """Register loader of a backend, replacing any previous one of the same name."""
+        if name == AUTO:
+            raise ValueError(f"{AUTO!r} is a reserved backend name")
+        self.loaders[name] = loader
+        self.backends.pop(name, None)
+
+    def load(self, name: str) -> _BackendT:
+        """Return backend, raise ValueError when it is not registered or not available."""
+        backend = self.backends.get(name)
+        if backend is None:
+            loader = self.loaders.get(name)
+            if loader is None:
+                raise ValueError(f"Unknown {self.kind} backend {name!r}")
+            try:
+                backend = loader()
+            except _LOAD_ERRORS as error:
+                raise ValueError(
+                    f"{self.kind} backend {name!r} is not available"
+                ) from error
+            self.backends[name] = backend
+        return backend
+
+    def available(self) -> list[str]:
+        """Return names of backends that can be loaded."""
+        names = []
+        for name in self.loaders:
+            try:
+                self.load(name)
+            except ValueError:
+                continue
+            names.append(name)
+        return names
+
+    def select(self, backend: _BackendT) -> None:
+        """Make backend current and notify subscribers."""
+        self.selected = backend
+        for callback in self.subscribers:
+            callback(backend)
+
+    def current(self) -> _BackendT:
+        """Return selected backend."""
+        assert self.selected is not None
+        return self.selected
+
+
+_backends: _Registry[Backend] = _Registry("crypto")
+_hash_backends: _Registry[HashBackend] = _Registry("hash")
+
+
+def register_backend(name: str, loader: Callable[[], Backend]) -> None:
+    """Register crypto backend, loader is called once when the backend is first used."""
+    _backends.register(name, loader)
+
+
+def register_hash_backend(name: str, loader: Callable[[], HashBackend]) -> None:
+    """Register hash backend, loader is called once when the backend is first used."""
+    _hash_backends.register(name, loader)
+
+
+def available_backends() -> list[str]:
+    """Return names of crypto backends usable in this environment."""
+    return _backends.available()
+
+
+def available_hash_backends() -> list[str]:
+    """Return names of hash backends usable in this environment."""
+    return _hash_backends.available()
+
+
+def get_backend() -> Backend:
+    """Return selected crypto backend."""
+    return _backends.current()
+
+
+def get_hash_backend() -> HashBackend:
+    """Return selected hash backend."""
+    return _hash_backends.current()
+
+
+def use_backend(name: str) -> Backend:
+    """Select crypto backend by name, or "auto" to select the fastest at first use."""
+    backend = _auto_backend() if name == AUTO else _backends.load(name)
+    _backends.select(backend)
+    _export(backend)
+    return backend
+
+
+def use_hash_backend(name: str) -> HashBackend:
+    """Select hash backend by name, or "auto" to select the fastest at first use."""
+    backend = _auto_hash_backend() if name == AUTO else _hash_backends.load(name)
+    _hash_backends.select(backend)
+    _export_hash(backend)
+    return backend
+
+
+def subscribe(
+    on_backend: Callable[[Backend], None],
+    on_hash_backend: Callable[[HashBackend], None],
+) -> None:
+    """Call back with the selected backends now and whenever the selection changes."""
+    _backends.subscribers.append(on_backend)
+    _hash_backends.subscribers.append(on_hash_backend)
+    on_backend(_backends.current())
+    on_hash_backend(_hash_backends.current())
+
+
+# module attributes for backwards compatibility, they follow the selected backends
+encrypt: EncryptFunction
+decrypt: DecryptFunction
+sign: SignFunction
+verify: VerifyFunction
+blake2b: HashFunction
+
+
+def _export(backend: Backend) -> None:
+    """Update module attributes to primitives of backend."""
+    # pylint: disable=global-statement
+    global encrypt, decrypt, sign, verify
+    encrypt, decrypt, sign, verify = (
+        backend.encrypt,
+        backend.decrypt,
+        backend.sign,
+        backend.verify,
+    )
+
+
+def _export_hash(backend: HashBackend) -> None:
+    """Update module attributes to primitives of hash backend."""
+    # pylint: disable=global-statement
+    global blake2b
+    blake2b = backend.blake2b
+
+
+def _load_pysodium() -> Backend:
+    # pylint: disable=import-outside-toplevel
+    import pysodium
+
+    return Backend(
+        "pysodium",
+        pysodium.crypto_aead_xchacha20poly1305_ietf_encrypt,
+        pysodium.crypto_aead_xchacha20poly1305_ietf_decrypt,
+        pysodium.crypto_sign_detached,
+        pysodium.crypto_sign_verify_detached,
+    )
+
+
+def _load_pynacl() -> Backend:
+    # pylint: disable=import-outside-toplevel
+    from nacl import bindings
+    from nacl.exceptions import CryptoError
+
+    aead_encrypt = bindings.crypto_aead_xchacha20poly1305_ietf_encrypt
+    aead_decrypt = bindings.crypto_aead_xchacha20poly1305_ietf_decrypt
+    crypto_sign = bindings.crypto_sign
+    crypto_sign_open = bindings.crypto_sign_open
+    signature_size: int = bindings.crypto_sign_BYTES
+    secret_key_size: int = bindings.crypto_sign_SECRETKEYBYTES
+    public_key_size: int = bindings.crypto_sign_PUBLICKEYBYTES
+
+    def pynacl_encrypt(
+        message: bytes, aad: bytes | None, nonce: bytes, key: bytes
+    ) -> bytes:
+        try:
+            return aead_encrypt(message, aad, nonce, key)
+        except CryptoError as error:
+            raise ValueError(str(error)) from error
+
+    def pynacl_decrypt(
+        ciphertext: bytes, aad: bytes | None, nonce: bytes, key: bytes
+    ) -> bytes:
+        try:
+            return aead_decrypt(ciphertext, aad, nonce, key)
+        except CryptoError as error:
+            raise ValueError(str(error)) from error
+
+    # PyNaCl does not check sizes of signing keys, libsodium would read past them
+    def pynacl_sign(message: bytes, secret_key: bytes) -> bytes:
+        if len(secret_key) != secret_key_size:
+            raise ValueError("invalid secret key size")
+        # combined mode prepends the signature to the message
+        return crypto_sign(message, secret_key)[:signature_size]
+
+    def pynacl_verify(signature: bytes, message: bytes, public_key: bytes) -> None:
+        if len(signature) != signature_size:
+            raise ValueError("invalid signature size")
+        if len(public_key) != public_key_size:
+            raise ValueError("invalid public key size")
+        try:
+            crypto_sign_open(signature + message, public_key)
+        except CryptoError as error:
+            raise ValueError(str(error)) from error
+
+    return Backend("pynacl", pynacl_encrypt, pynacl_decrypt, pynacl_sign, pynacl_verify)
+
+
+def _load_ctypes() -> Backend:
+    # pylint: disable=import-outside-toplevel
+    from paseto.crypto import libsodium_wrapper
+
+    return Backend(
+        "ctypes",
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt,
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_decrypt,
+        libsodium_wrapper.crypto_sign_detached,
+        libsodium_wrapper.crypto_sign_verify_detached,
+    )
+
+
+def _load_hashlib() -> HashBackend:
+    new = hashlib.blake2b
+
+    def hashlib_blake2b(data: bytes, key: bytes, digest_size: int) -> bytes:
+        return new(data, key=key, digest_size=digest_size).digest()
+
+    return HashBackend("hashlib", hashlib_blake2b)
+
+
+def _load_pysodium_hash() -> HashBackend:
+    # pylint: disable=import-outside-toplevel
+    import pysodium
+
+    generichash = pysodium.crypto_generichash
+
+    def pysodium_blake2b(data: bytes, key: bytes, digest_size: int) -> bytes:
+        return generichash(data, key, digest_size)
+
+    return HashBackend("pysodium", pysodium_blake2b)
+
+
+def _load_pynacl_hash() -> HashBackend:
+    # pylint: disable=import-outside-toplevel
+    from nacl import bindings
+
+    generichash = bindings.crypto_generichash_blake2b_salt_personal
+
+    def pynacl_blake2b(data: bytes, key: bytes, digest_size: int) -> bytes:
+        return generichash(data, digest_size=digest_size, key=key)
+
+    return HashBackend("pynacl", pynacl_blake2b)
+
+
+def _load_ctypes_hash() -> HashBackend:
+    # pylint: disable=import-outside-toplevel
+    from paseto.crypto import libsodium_wrapper
+
+    return HashBackend("ctypes", libsodium_wrapper.crypto_generichash)
+
+
+register_backend("pysodium", _load_pysodium)
+register_backend("pynacl", _load_pynacl)
+register_backend("ctypes", _load_ctypes)
+register_hash_backend("hashlib", _load_hashlib)
+register_hash_backend("pysodium", _load_pysodium_hash)
+register_hash_backend("pynacl", _load_pynacl_hash)
+register_hash_backend("ctypes", _load_ctypes_hash)
+
+
+def _auto_backend() -> Backend:
+    """Return backend that selects the fastest crypto backend when first called."""
+
+    def select() -> Backend:
+        return use_backend(_fastest(_backends, _time_backend))
+
+    def auto_encrypt(
+        message: bytes, aad: bytes | None, nonce: bytes, key: bytes
+    ) -> bytes:
+        return select().encrypt(message, aad, nonce, key)
+
+    def auto_decrypt(
+        ciphertext: bytes, aad: bytes | None, nonce: bytes, key: bytes
+    ) -> bytes:
+        return select().decrypt(ciphertext, aad, nonce, key)
+
+    def auto_sign(message: bytes, secret_key: bytes) -> bytes:
+        return select().sign(message, secret_key)
+
+    def auto_verify(signature: bytes, message: bytes, public_key: bytes) -> None:
+        select().verify(signature, message, public_key)
+
+    return Backend(AUTO, auto_encrypt, auto_decrypt, auto_sign, auto_verify)
+
+
+def _auto_hash_backend() -> HashBackend:
+    """Return backend that selects the fastest hash backend when first called."""
+
+    def auto_blake2b(data: bytes, key: bytes, digest_size: int) -> bytes:
+        backend = use_hash_backend(_fastest(_hash_backends, _time_hash_backend))
+        return backend.blake2b(data, key, digest_size)
+
+    return HashBackend(AUTO, auto_blake2b)
+
+
+def _fastest(
+    registry: _Registry[_BackendT], timer: Callable[[_BackendT], float]
+) -> str:
+    """Return name of fastest available backend, timing backends unless cached."""
+    candidates = registry.available()
+    if not candidates:
+        names = ", ".join(repr(name) for name in registry.loaders)
+        raise ValueError(f"No {registry.kind} backend is available, tried {names}")
+    cache_key = _cache_key(candidates)
+    cache = _read_cache()
+    cached = cache.get(cache_key, {}).get(registry.kind)
+    if cached is not None and cached in candidates:
+        return cached
+
+    winner = min(candidates, key=lambda name: timer(registry.load(name)))
+    cache.setdefault(cache_key, {})[registry.kind] = winner
+    _write_cache(cache)
+    return winner
+
+
+# representative inputs for timing, a short token payload
+_TIMING_KEY = bytes(range(32))
+_TIMING_NONCE = bytes(range(24))
+_TIMING_MESSAGE = (
+    b'{"data":"this is a signed message","exp":"2022-01-01T00:00:00+00:00"}'
+)
+_TIMING_AAD = b"\x03" + bytes(7) + b"v2.local." + bytes(64)
+# Ed25519 key pair of seed _TIMING_KEY, so that timing needs no other library
+_TIMING_PUBLIC_KEY = bytes.fromhex(
+    "03a107bff3ce10be1d70dd18e74bc09967e4d6309ba50d5f1ddc8664125531b8"
+)
+_TIMING_SECRET_KEY = _TIMING_KEY + _TIMING_PUBLIC_KEY
+
+
+def _time_backend(backend: Backend) -> float:
+    """Return seconds taken by the fastest repeat of all backend primitives."""
+
+    def run() -> None:
+        ciphertext = backend.encrypt(
+            _TIMING_MESSAGE, _TIMING_AAD, _TIMING_NONCE, _TIMING_KEY
+        )
+        backend.decrypt(ciphertext, _TIMING_AAD, _TIMING_NONCE, _TIMING_KEY)
+        signature = backend.sign(_TIMING_MESSAGE, _TIMING_SECRET_KEY)
+        backend.verify(signature, _TIMING_MESSAGE, _TIMING_PUBLIC_KEY)
+
+    return min(timeit.repeat(run, number=_TIMING_NUMBER, repeat=_TIMING_REPEAT))
+
+
+def _time_hash_backend(backend: HashBackend) -> float:
+    """Return seconds taken by the fastest repeat of backend BLAKE2b."""
+
+    def run() -> None:
+        backend.blake2b(_TIMING_MESSAGE, _TIMING_NONCE, 24)
+
+    return min(timeit.repeat(run, number=_TIMING_NUMBER, repeat=_TIMING_REPEAT))
+
+
+def _library_version(distribution: str) -> str | None:
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _libsodium_version() -> str | None:
+    # pylint: disable=import-outside-toplevel
+    try:
+        from paseto.crypto import libsodium_wrapper
+    except _LOAD_ERRORS:
+        return None
+    return libsodium_wrapper.sodium_version_string()
+
+
+def _cache_key(candidates: list[str]) -> str:
+    """Return key identifying library versions and candidates of a timing result."""
+    return json.dumps(
+        {
+            "python": f"{platform.python_implementation()} {platform.python_version()}",
+            "pysodium": _library_version("pysodium"),
+            "pynacl": _library_version("pynacl"),
+            "libsodium": _libsodium_version(),
+            "candidates": sorted(candidates),
+        },
+        sort_keys=True,
+    )
+
+
+def cache_path() -> Path:
+    """Return path of the file caching auto selected backends."""
+    cache_dir = os.environ.get(ENV_CACHE_DIR)
+    if cache_dir:
+        return Path(cache_dir) / CACHE_FILE_NAME
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache_home) / "python-paseto" / CACHE_FILE_NAME
+
+
+def _read_cache() -> dict[str, dict[str, str]]:
+    """Return cached selections, or nothing when the cache is missing or corrupt."""
+    try:
+        cache = json.loads(cache_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_cache(cache: dict[str, dict[str, str]]) -> None:
+    """Write cached selections, a read only cache only costs timing on next start."""
+    path = cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(
+            json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8"
+        )
+        temporary.replace(path)
+    except OSError:
+        pass
+
+
+use_backend(os.environ.get(ENV_BACKEND) or DEFAULT_BACKEND)
+use_hash_backend(os.environ.get(ENV_HASH_BACKEND) or DEFAULT_HASH_BACKEND)
+
+__all__ = [
+    "AUTO",
+    "Backend",
+    "HashBackend",
+    "available_backends",
+    "available_hash_backends",
+    "blake2b",
+    "cache_path",
+    "decrypt",
+    "encrypt",
+    "get_backend",
+    "get_hash_backend",
+    "register_backend",
+    "register_hash_backend",
+    "sign",
+    "subscribe",
+    "use_backend",
+    "use_hash_backend",
+    "verify",
+]
@@ -0,0 +1,93 @@
+"""This module derives keys of many tenants from a single master key.
+
+Keys are derived deterministically with BLAKE2b keyed with the master key, the
+tenant ID is the message and the purpose is the personalization string, so keys
+of different purposes and tenants are independent. Only the master key needs to
+be stored, it should not be used for anything but derivation.
+"""
+
+import hashlib
+from collections.abc import Callable
+
+import pysodium
+
+from paseto.cache import LRUCache
+from paseto.paserk.keys import Key, PublicKey, SecretKey, SymmetricKey
+from paseto.protocol.version4 import PUBLIC_KEY_SIZE
+
+DEFAULT_CACHE_SIZE = 4096
+
+# BLAKE2b personalization strings, at most 16 bytes
+_PERSON_LOCAL = b"paseto-v4.local"
+_PERSON_PUBLIC = b"paseto-v4.public"
+
+_DERIVED_KEY_SIZE = 32
+
+# purpose and tenant ID of a derived key
+CacheKey = tuple[str, bytes]
+
+
+class KeyDeriver:
+    """Derives v4 keys of tenants from a master key and caches the newest ones.
+
+    Derived keys are returned as key objects ready for use with the functions of
+    paseto.protocol.version4. Cache hits, misses and evictions are counted in cache.
+    """
+
+    __slots__ = ("_local_state", "_public_state", "cache")
+
+    def __init__(
+        self,
+        master_key: bytes | SymmetricKey,
+        *,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        on_evict: Callable[[CacheKey, Key], None] | None = None,
+    ) -> None:
+        """Derive keys from master_key, a v4.local key.
+
+        At most cache_size derived keys are kept, on_evict is called with the
+        purpose and tenant ID and the key object of every key dropped from cache.
+        """
+        raw_key = (
+            master_key
+            if isinstance(master_key, SymmetricKey)
+            else SymmetricKey(master_key)
+        ).raw
+        self._local_state = hashlib.blake2b(
+            key=raw_key, digest_size=_DERIVED_KEY_SIZE, person=_PERSON_LOCAL
+        )
+        self._public_state = hashlib.blake2b(
+            key=raw_key, digest_size=_DERIVED_KEY_SIZE, person=_PERSON_PUBLIC
+        )
+        self.cache: LRUCache[CacheKey, Key] = LRUCache(cache_size, on_evict)
+
+    def local_key(self, tenant: str | bytes) -> SymmetricKey:
+        """Return v4.local key of tenant."""
+        key = self.cache.get_or_create(("v4.local", _tenant_id(tenant)), self._derive)
+        assert isinstance(key, SymmetricKey)
+        return key
+
+    def secret_key(self, tenant: str | bytes) -> SecretKey:
+        """Return v4.public secret key of tenant."""
+        key = self.cache.get_or_create(("v4.public", _tenant_id(tenant)), self._derive)
+        assert isinstance(key, SecretKey)
+        return key
+
+    def public_key(self, tenant: str | bytes) -> PublicKey:
+        """Return v4.public public key of tenant."""
+        return PublicKey.from_raw(self.secret_key(tenant).raw[-PUBLIC_KEY_SIZE:])
+
+    def _derive(self, cache_key: CacheKey) -> Key:
+        purpose, tenant = cache_key
+        if purpose == "v4.local":
+            state = self._local_state.copy()
+            state.update(tenant)
+            return SymmetricKey.from_raw(state.digest())
+        state = self._public_state.copy()
+        state.update(tenant)
+        _, secret_key = pysodium.crypto_sign_seed_keypair(state.digest())
+        return SecretKey.from_raw(secret_key)
+
+
+def _tenant_id(tenant: str | bytes) -> bytes:
+    return tenant.encode() if isinstance(tenant, str) else tenant
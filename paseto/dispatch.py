@@ -0,0 +1,179 @@
+"""This module decodes tokens of any supported version and purpose.
+
+The header of a token selects the implementation with a single table lookup,
+and the token is parsed once for both routing and decoding. Keys are taken from
+a keyring, a mapping of purposes such as "v4.public" to keys.
+"""
+
+import functools
+import threading
+from collections import Counter
+from collections.abc import Callable, Mapping
+from typing import Any, NamedTuple
+
+from paseto.exceptions import InvalidHeader, InvalidKey
+from paseto.paserk.keys import Key
+from paseto.protocol import version2, version4
+from paseto.protocol.common import ParsedToken, parse_token
+
+PurposeKeys = Mapping[str, bytes | Key]
+
+UNKNOWN_PURPOSE = "unknown"
+
+_DecodeFunction = Callable[[ParsedToken], bytes]
+
+
+class _Route(NamedTuple):
+    """Purpose of a token header and the codec decoding such tokens."""
+
+    purpose: str
+    # called with key, footer and implicit assertion
+    codec: Callable[[Any, bytes, bytes], Any]
+
+
+# looked up with headers of parsed tokens copied to bytes, as memoryviews of
+# writable buffers such as bytearray tokens can not be hashed
+_ROUTES: dict[bytes, _Route] = {
+    version2.HEADER_LOCAL: _Route(
+        "v2.local", lambda key, footer, _: version2.LocalCodec(key, footer)
+    ),
+    version2.HEADER_PUBLIC: _Route(
+        "v2.public", lambda key, footer, _: version2.PublicCodec(key, footer)
+    ),
+    version4.HEADER_LOCAL: _Route("v4.local", version4.LocalCodec),
+    version4.HEADER_PUBLIC: _Route("v4.public", version4.PublicCodec),
+}
+
+PURPOSES = [route.purpose for route in _ROUTES.values()]
+
+_CODECS = {route.purpose: route.codec for route in _ROUTES.values()}
+
+
+# pylint: disable=too-few-public-methods
+class DecodeStats:
+    """Number of tokens decoded and failed per purpose.
+
+    Tokens with a header of no supported purpose are counted as UNKNOWN_PURPOSE.
+    Counts are added under a lock, decoders are shared by the threads of executors.
+    """
+
+    __slots__ = ("_lock", "decoded", "failed")
+
+    def __init__(self) -> None:
+        self.decoded: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, purpose: str, failed: bool = False) -> None:
+        """Count a token of purpose as decoded, or as failed."""
+        counter = self.failed if failed else self.decoded
+        with self._lock:
+            counter[purpose] += 1
+
+
+class Decoder:
+    """Decoder of tokens of every purpose found in a keyring, set up once."""
+
+    __slots__ = ("_decoders", "stats")
+
+    def __init__(
+        self, keyring: PurposeKeys, footer: bytes = b"", implicit_assertion: bytes = b""
+    ) -> None:
+        """Create codecs of every purpose of keyring.
+
+        Version2 tokens have no implicit assertion, it only applies to version4.
+        """
+        unknown = set(keyring) - set(PURPOSES)
+        if unknown:
+            raise ValueError(f"Unknown purposes {sorted(unknown)}")
+        self._decoders: dict[bytes, tuple[str, _DecodeFunction]] = {
+            header: _decoder(route, keyring, footer, implicit_assertion)
+            for header, route in _ROUTES.items()
+        }
+        self.stats = DecodeStats()
+
+    def decode(self, token: bytes | bytearray) -> bytes:
+        """Return message of token, routed by its header."""
+        parsed = parse_token(token)
+        purpose, decode_parsed = self._decoders.get(
+            bytes(parsed.header), _UNKNOWN_HEADER
+        )
+        return _counted(self.stats, purpose, decode_parsed, parsed)
+
+
+stats = DecodeStats()
+
+
+def decode(
+    token: bytes | bytearray,
+    keyring: PurposeKeys,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+) -> bytes:
+    """Return message of a token of any supported version and purpose.
+
+    Only the codec of the purpose of token is created. Outcomes are counted in
+    the module level stats. Reuse a Decoder to decode many tokens.
+    """
+    parsed = parse_token(token)
+    route = _ROUTES.get(bytes(parsed.header))
+    purpose, decode_parsed = (
+        _UNKNOWN_HEADER
+        if route is None
+        else _decoder(route, keyring, footer, implicit_assertion)
+    )
+    return _counted(stats, purpose, decode_parsed, parsed)
+
+
+def token_purpose(token: ParsedToken) -> str:
+    """Return purpose of parsed token, raise InvalidHeader if it is not supported."""
+    route = _ROUTES.get(bytes(token.header))
+    if route is None:
+        raise InvalidHeader("Invalid message header")
+    return route.purpose
+
+
+def create_codec(
+    purpose: str, key: bytes | Key, footer: bytes = b"", implicit_assertion: bytes = b""
+) -> Any:
+    """Return codec of tokens of purpose, raise ValueError if it is not supported."""
+    if purpose not in _CODECS:
+        raise ValueError(f"Unknown purpose {purpose}")
+    return _CODECS[purpose](key, footer, implicit_assertion)
+
+
+def _decoder(
+    route: _Route, keyring: PurposeKeys, footer: bytes, implicit_assertion: bytes
+) -> tuple[str, _DecodeFunction]:
+    """Return purpose of route and function decoding its tokens with key of keyring."""
+    purpose, codec = route
+    if purpose not in keyring:
+        return purpose, functools.partial(_missing_key, purpose)
+    return purpose, codec(keyring[purpose], footer, implicit_assertion).decode_parsed
+
+
+def _counted(
+    decode_stats: DecodeStats,
+    purpose: str,
+    decode_parsed: _DecodeFunction,
+    parsed: ParsedToken,
+) -> bytes:
+    """Return message decoded by decode_parsed, counting success or failure."""
+    try:
+        message = decode_parsed(parsed)
+    except Exception:
+        decode_stats.count(purpose, failed=True)
+        raise
+    decode_stats.count(purpose)
+    return message
+
+
+def _missing_key(purpose: str, token: ParsedToken) -> bytes:
+    raise InvalidKey(f"No key for {purpose} tokens")
+
+
+def _invalid_header(token: ParsedToken) -> bytes:
+    raise InvalidHeader("Invalid message header")
+
+
+_UNKNOWN_HEADER: tuple[str, _DecodeFunction] = (UNKNOWN_PURPOSE, _invalid_header)
@@ -19,3 +19,19 @@ class InvalidMac(PasetoException):
 
 class InvalidKey(PasetoException):
     """Invalid key for this version of the protocol and method."""
+
+
+class InvalidToken(PasetoException):
+    """Token is too large, too short or not base64url encoded."""
+
+
+class InvalidClaims(PasetoException):
+    """Claims of a token failed validation."""
+
+
+class InvalidPayload(PasetoException):
+    """Payload can not be read by the payload codec named in the footer."""
+
+
+class RejectedToken(PasetoException):
+    """Token failed to decode before and is rejected by a negative cache."""
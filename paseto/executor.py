@@ -0,0 +1,373 @@
+"""This module processes token streams in parallel threads or processes.
+
+libsodium calls release the GIL, so Ed25519 verification and XChaCha20 run in
+parallel threads. Tokens are handed to workers in chunks processed by the batch
+functions, so per token Python overhead stays low. Results come back in input
+order, and only a bounded number of chunks is in flight at any time, so a long
+or endless input stream is consumed no faster than results are.
+
+Worker processes load the key once and exchange chunks through shared memory,
+one contiguous buffer preceded by an array of offsets, instead of pickling
+every item.
+"""
+
+import itertools
+import os
+from collections import deque
+from collections.abc import Callable, Generator, Iterable
+from concurrent import futures
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from paseto.paserk.keys import Key, PublicKey, SecretKey, SymmetricKey
+from paseto.protocol import version4
+from paseto.protocol.util import b64
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing_extensions import Self
+
+BatchFunction = Callable[..., list[bytes | Exception]]
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_PROCESS_CHUNK_SIZE = 1024
+
+
+class TokenExecutor:
+    """Thread pool processing tokens with batch functions, preserving order."""
+
+    __slots__ = ("_chunk_size", "_executor", "_max_pending")
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_pending: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """Start up to max_workers threads, by default one per CPU.
+
+        At most max_pending chunks of chunk_size tokens are queued or running,
+        by default twice the number of workers.
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        if chunk_size <= 0 or (max_pending is not None and max_pending <= 0):
+            raise ValueError("chunk_size and max_pending must be positive")
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="paseto"
+        )
+        self._max_pending: int = max_pending or 2 * max_workers
+        self._chunk_size = chunk_size
+
+    def map(
+        self, batch_function: BatchFunction, items: Iterable[bytes], *args: Any
+    ) -> Generator[bytes | Exception, None, None]:
+        """Yield result of batch_function(chunk, *args) for every item, in order.
+
+        batch_function is one of the *_many() functions of a protocol module,
+        args are its remaining arguments such as key and footer.
+        """
+        pending: deque[Future[list[bytes | Exception]]] = deque()
+        iterator = iter(items)
+        while True:
+            # backpressure, wait for the oldest chunk before reading more input
+            while len(pending) < self._max_pending:
+                chunk = list(itertools.islice(iterator, self._chunk_size))
+                if not chunk:
+                    break
+                pending.append(self._executor.submit(batch_function, chunk, *args))
+            if not pending:
+                return
+            try:
+                yield from pending.popleft().result()
+            except GeneratorExit:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def verify(
+        self,
+        tokens: Iterable[bytes],
+        public_key: bytes | PublicKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> Generator[bytes | Exception, None, None]:
+        """Yield message or exception for every v4.public token, in order."""
+        if not isinstance(public_key, PublicKey):
+            public_key = PublicKey(public_key)
+        return self.map(
+            version4.verify_many, tokens, public_key, footer, implicit_assertion
+        )
+
+    def decrypt(
+        self,
+        tokens: Iterable[bytes],
+        key: bytes | SymmetricKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> Generator[bytes | Exception, None, None]:
+        """Yield plaintext or exception for every v4.local token, in order."""
+        if not isinstance(key, SymmetricKey):
+            key = SymmetricKey(key)
+        return self.map(version4.decrypt_many, tokens, key, footer, implicit_assertion)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop worker threads, waiting for running chunks unless wait is False."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self) -> "Self":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.shutdown()
+
+
+class _Operation(NamedTuple):
+    """Batch function of an operation, its key type and the tokens it produces."""
+
+    batch_function: BatchFunction
+    key_class: type[Key]
+    # header and bytes encoded along with the message, empty for operations returning messages
+    token_header: bytes = b""
+    token_extra_size: int = 0
+
+
+_OPERATIONS: dict[str, _Operation] = {
+    "encrypt": _Operation(
+        version4.encrypt_many,
+        SymmetricKey,
+        version4.HEADER_LOCAL,
+        version4.NONCE_SIZE + version4.MAC_SIZE,
+    ),
+    "decrypt": _Operation(version4.decrypt_many, SymmetricKey),
+    "sign": _Operation(version4.sign_many, SecretKey, version4.HEADER_PUBLIC, 64),
+    "verify": _Operation(version4.verify_many, PublicKey),
+}
+
+_ITEM_SIZE = 8
+
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to a block created by the parent process, which also unlinks it."""
+    # children share the resource tracker of the parent, registering again is harmless
+    return SharedMemory(name)
+
+
+def _buffer(block: SharedMemory) -> memoryview:
+    buffer = block.buf
+    assert buffer is not None, "block is closed"
+    return buffer
+
+
+def _pack(items: list[bytes], block: SharedMemory) -> None:
+    """Write offsets of items followed by their contents into block."""
+    buffer = _buffer(block)
+    offsets = buffer[: (len(items) + 1) * _ITEM_SIZE].cast("Q")
+    position = len(offsets) * _ITEM_SIZE
+    offsets[0] = position
+    for index, item in enumerate(items):
+        buffer[position : position + len(item)] = item
+        position += len(item)
+        offsets[index + 1] = position
+    offsets.release()
+
+
+def _unpack(block: SharedMemory, count: int) -> list[bytes]:
+    """Return copies of items written into block by _pack()."""
+    buffer = _buffer(block)
+    offsets = buffer[: (count + 1) * _ITEM_SIZE].cast("Q")
+    items = [
+        bytes(buffer[offsets[index] : offsets[index + 1]]) for index in range(count)
+    ]
+    offsets.release()
+    return items
+
+
+def _block_size(item_count: int, content_size: int) -> int:
+    return (item_count + 1) * _ITEM_SIZE + max(content_size, 1)
+
+
+class _WorkerState(NamedTuple):
+    """Operation of a worker process with its key parsed once."""
+
+    batch_function: BatchFunction
+    arguments: tuple[Key, bytes, bytes]
+
+
+_worker_state: _WorkerState | None = None  # pylint: disable=invalid-name
+
+
+def _initialize_worker(
+    operation: str, serialized_key: bytes, footer: bytes, implicit_assertion: bytes
+) -> None:
+    """Parse key once for all chunks handled by this worker process."""
+    # pylint: disable=global-statement
+    global _worker_state
+    batch_function, key_class, _, _ = _OPERATIONS[operation]
+    _worker_state = _WorkerState(
+        batch_function, (key_class(serialized_key), footer, implicit_assertion)
+    )
+
+
+def _process_chunk(
+    input_name: str, output_name: str, count: int
+) -> dict[int, Exception]:
+    """Run operation on items of input block, write results into output block.
+
+    Returns exceptions raised by items, whose results are left empty.
+    """
+    assert _worker_state is not None
+    input_block, output_block = _attach(input_name), _attach(output_name)
+    try:
+        results = _worker_state.batch_function(
+            _unpack(input_block, count), *_worker_state.arguments
+        )
+        errors = {
+            index: result
+            for index, result in enumerate(results)
+            if isinstance(result, Exception)
+        }
+        _pack(
+            [b"" if isinstance(result, Exception) else result for result in results],
+            output_block,
+        )
+    finally:
+        input_block.close()
+        output_block.close()
+    return errors
+
+
+class _PendingChunk(NamedTuple):
+    future: "Future[dict[int, Exception]]"
+    input_block: SharedMemory
+    output_block: SharedMemory
+    item_count: int
+
+    def release(self) -> None:
+        """Cancel chunk or wait until it stops using shared memory, free both blocks."""
+        if not self.future.cancel():
+            futures.wait([self.future])
+        for block in (self.input_block, self.output_block):
+            block.close()
+            block.unlink()
+
+
+class ProcessTokenExecutor:
+    """Process pool running one version4 operation with a key loaded once per worker."""
+
+    __slots__ = ("_chunk_size", "_executor", "_max_pending", "_token_size")
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        operation: str,
+        key: bytes | Key,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+        *,
+        max_workers: int | None = None,
+        max_pending: int | None = None,
+        chunk_size: int = DEFAULT_PROCESS_CHUNK_SIZE,
+        mp_context: BaseContext | None = None,
+    ) -> None:
+        """Start worker processes for "encrypt", "decrypt", "sign" or "verify".
+
+        At most max_pending chunks of chunk_size items are queued or running,
+        by default twice the number of workers.
+        """
+        if operation not in _OPERATIONS:
+            raise ValueError(f"Unknown operation {operation!r}")
+        if chunk_size <= 0 or (max_pending is not None and max_pending <= 0):
+            raise ValueError("chunk_size and max_pending must be positive")
+        batch_function, _, token_header, token_extra_size = _OPERATIONS[operation]
+        # check key here rather than in every worker
+        batch_function([], key, footer, implicit_assertion)
+        max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=_initialize_worker,
+            initargs=(
+                operation,
+                bytes(key) if isinstance(key, Key) else key,
+                footer,
+                implicit_assertion,
+            ),
+        )
+        self._max_pending: int = max_pending or 2 * max_workers
+        self._chunk_size = chunk_size
+        self._token_size: tuple[int, int] | None = None
+        if token_header:
+            footer_size = len(b"." + b64(footer)) if footer else 0
+            self._token_size = (len(token_header) + footer_size, token_extra_size)
+
+    def _result_size(self, item: bytes) -> int:
+        """Return upper bound of result size of item."""
+        if self._token_size is None:
+            # messages are shorter than the tokens they are decoded from
+            return len(item)
+        fixed_size, extra_size = self._token_size
+        # unpadded base64 of message with extra bytes
+        return fixed_size + (4 * (len(item) + extra_size) + 2) // 3
+
+    def _submit(self, chunk: list[bytes]) -> _PendingChunk:
+        input_block = SharedMemory(
+            create=True, size=_block_size(len(chunk), sum(map(len, chunk)))
+        )
+        output_block = SharedMemory(
+            create=True,
+            size=_block_size(len(chunk), sum(map(self._result_size, chunk))),
+        )
+        _pack(chunk, input_block)
+        future = self._executor.submit(
+            _process_chunk, input_block.name, output_block.name, len(chunk)
+        )
+        return _PendingChunk(future, input_block, output_block, len(chunk))
+
+    def map(self, items: Iterable[bytes]) -> Generator[bytes | Exception, None, None]:
+        """Yield result or exception for every item, in order."""
+        pending: deque[_PendingChunk] = deque()
+        iterator = iter(items)
+        try:
+            while True:
+                while len(pending) < self._max_pending:
+                    chunk = list(itertools.islice(iterator, self._chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(self._submit(chunk))
+                if not pending:
+                    return
+                oldest = pending.popleft()
+                try:
+                    errors = oldest.future.result()
+                    results: list[bytes | Exception] = list(
+                        _unpack(oldest.output_block, oldest.item_count)
+                    )
+                finally:
+                    oldest.release()
+                for index, error in errors.items():
+                    results[index] = error
+                yield from results
+        finally:
+            for chunk_in_flight in pending:
+                chunk_in_flight.release()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop worker processes, waiting for running chunks unless wait is False."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self) -> "Self":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.shutdown()
@@ -0,0 +1,275 @@
+"""This module manages the keys of an application, including key rotation.
+
+Every key has a key ID, a purpose such as "v4.local" and a state. Tokens carry
+the key ID as "kid" of a JSON footer, which is not encrypted, so the key of a
+token is found with a single dictionary lookup before any cryptography runs.
+Only tokens without a key ID are tried against every usable key of their purpose.
+
+Keys are rotated by adding a new active key and moving the previous one to
+retiring, which still decodes tokens but no longer encodes, and later to retired,
+which rejects its tokens.
+"""
+
+import enum
+import json
+from typing import NamedTuple
+
+from paseto.cache import NegativeCache, TokenCache
+from paseto.dispatch import create_codec, token_purpose
+from paseto.exceptions import InvalidKey
+from paseto.paserk.keys import Key, PublicKey, SecretKey, SymmetricKey
+from paseto.protocol.common import BATCH_ITEM_ERRORS, ParsedToken, parse_token
+from paseto.protocol.util import le64
+from paseto.protocol.version4 import PUBLIC_KEY_SIZE
+
+
+class KeyState(enum.Enum):
+    """State of a key in its rotation."""
+
+    ACTIVE = "active"
+    RETIRING = "retiring"
+    RETIRED = "retired"
+
+
+class _Entry(NamedTuple):
+    """Key of a key ID with its purpose and state."""
+
+    purpose: str
+    key: bytes | Key
+    state: KeyState
+
+
+class Keyring:
+    """Keys indexed by key ID, for encoding with the newest active key and decoding
+    with the key named in the footer of a token.
+    """
+
+    __slots__ = ("_by_purpose", "_cache", "_entries", "_generation", "_negative_cache")
+
+    def __init__(
+        self,
+        cache: TokenCache | None = None,
+        negative_cache: NegativeCache | None = None,
+    ) -> None:
+        """Create empty keyring, caching payloads of tokens with a key ID in cache.
+
+        Tokens failing to decode are remembered in negative_cache until any key
+        is added, removed or changes state.
+        """
+        self._cache = cache
+        self._negative_cache = negative_cache
+        # changed with every key, part of the negative cache context
+        self._generation = 0
+        self._entries: dict[str, _Entry] = {}
+        # key IDs of every purpose in the order they were added
+        self._by_purpose: dict[str, dict[str, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, kid: object) -> bool:
+        return kid in self._entries
+
+    def add(
+        self,
+        kid: str,
+        purpose: str,
+        key: bytes | Key,
+        state: KeyState = KeyState.ACTIVE,
+    ) -> None:
+        """Add key of purpose with ID kid, raise ValueError if kid is already used.
+
+        Raises ValueError if purpose is not supported and InvalidKey if key can not
+        be used for purpose.
+        """
+        if kid in self._entries:
+            raise ValueError(f"Key ID {kid} already exists")
+        if purpose == "v4.local" and not isinstance(key, Key):
+            # parsed once instead of once per token
+            key = SymmetricKey(key)
+        create_codec(purpose, key)
+        self._entries[kid] = _Entry(purpose, key, state)
+        self._generation += 1
+        self._by_purpose.setdefault(purpose, {})[kid] = None
+
+    def add_key(self, key: Key, state: KeyState = KeyState.ACTIVE) -> str:
+        """Add key with its PASERK ID as key ID and return the ID.
+
+        Secret keys are added with the ID of their public key, which is what
+        v4.public tokens name in their footer.
+        """
+        if isinstance(key, SymmetricKey):
+            kid, purpose = key.paserk_id, f"v{key.version}.local"
+        else:
+            public_key = (
+                PublicKey.from_raw(key.raw[-PUBLIC_KEY_SIZE:], key.version)
+                if isinstance(key, SecretKey)
+                else key
+            )
+            kid, purpose = public_key.paserk_id, f"v{key.version}.public"
+        self.add(kid, purpose, key, state)
+        return kid
+
+    def set_state(self, kid: str, state: KeyState) -> None:
+        """Move key with ID kid to state, raise KeyError if it does not exist."""
+        self._entries[kid] = self._entries[kid]._replace(state=state)
+        self._generation += 1
+        if state is KeyState.RETIRED and self._cache is not None:
+            self._cache.invalidate(kid)
+
+    def remove(self, kid: str) -> None:
+        """Remove key with ID kid, raise KeyError if it does not exist."""
+        entry = self._entries.pop(kid)
+        self._generation += 1
+        del self._by_purpose[entry.purpose][kid]
+        if self._cache is not None:
+            self._cache.invalidate(kid)
+
+    def get(self, kid: str) -> bytes | Key:
+        """Return key with ID kid, raise KeyError if it does not exist."""
+        return self._entries[kid].key
+
+    def state(self, kid: str) -> KeyState:
+        """Return state of key with ID kid, raise KeyError if it does not exist."""
+        return self._entries[kid].state
+
+    def current(self, purpose: str) -> tuple[str, bytes | Key]:
+        """Return ID and key of the newest active key of purpose.
+
+        Raises InvalidKey if purpose has no active key.
+        """
+        for kid in reversed(self._by_purpose.get(purpose, {})):
+            entry = self._entries[kid]
+            if entry.state is KeyState.ACTIVE:
+                return kid, entry.key
+        raise InvalidKey(f"No active key for {purpose} tokens")
+
+    def candidates(self, token: bytes) -> list[tuple[str, bytes | Key]]:
+        """Return IDs and keys to decode token with, without decrypting it.
+
+        A token naming a key ID gets only that key. Raises InvalidKey if the ID
+        is unknown, retired or of another purpose. A token without a key ID gets
+        every active key of its purpose, newest first, followed by its retiring
+        keys.
+        """
+        parsed = parse_token(token)
+        return self._candidates(token_purpose(parsed), footer_kid(token_footer(parsed)))
+
+    def _candidates(
+        self, purpose: str, kid: str | None
+    ) -> list[tuple[str, bytes | Key]]:
+        if kid is not None:
+            entry = self._entries.get(kid)
+            if entry is None or entry.purpose != purpose:
+                raise InvalidKey(f"No {purpose} key with ID {kid}")
+            if entry.state is KeyState.RETIRED:
+                raise InvalidKey(f"Key {kid} is retired")
+            return [(kid, entry.key)]
+        kids = list(reversed(self._by_purpose.get(purpose, {})))
+        return [
+            (kid, self._entries[kid].key)
+            for state in (KeyState.ACTIVE, KeyState.RETIRING)
+            for kid in kids
+            if self._entries[kid].state is state
+        ]
+
+    def encode(
+        self, message: bytes, purpose: str, implicit_assertion: bytes = b""
+    ) -> bytes:
+        """Return token of message made with the newest active key of purpose.
+
+        The footer of the token is a JSON object with the key ID as "kid".
+        """
+        kid, key = self.current(purpose)
+        return create_codec(purpose, key, kid_footer(kid), implicit_assertion).encode(
+            message
+        )
+
+    def decode(self, token: bytes, implicit_assertion: bytes = b"") -> bytes:
+        """Return message of token, decoded with the key named in its footer.
+
+        Tokens without a key ID are tried with every candidate key, the
+        exception of the last attempt is raised if none of them succeeds.
+        Payloads of tokens with a key ID are looked up in and added to cache.
+        Tokens in negative cache raise RejectedToken.
+        """
+        if self._negative_cache is None:
+            return self._decode(token, implicit_assertion)
+        return self._negative_cache.decode(
+            token,
+            lambda _: self._decode(token, implicit_assertion),
+            le64(self._generation) + implicit_assertion,
+        )
+
+    def _decode(self, token: bytes, implicit_assertion: bytes) -> bytes:
+        parsed = parse_token(token)
+        purpose = token_purpose(parsed)
+        footer = token_footer(parsed)
+        kid = footer_kid(footer)
+        candidates = self._candidates(purpose, kid)
+        if kid is None or self._cache is None:
+            return _decode_first(
+                parsed, purpose, footer, implicit_assertion, candidates
+            )
+        return self._cache.decode(
+            token,
+            kid,
+            lambda _: _decode_first(
+                parsed, purpose, footer, implicit_assertion, candidates
+            ),
+            footer,
+            implicit_assertion,
+        )
+
+
+def _decode_first(
+    parsed: ParsedToken,
+    purpose: str,
+    footer: bytes,
+    implicit_assertion: bytes,
+    candidates: list[tuple[str, bytes | Key]],
+) -> bytes:
+    """Return message of token decoded with the first candidate key that succeeds."""
+    error: Exception = InvalidKey(f"No key for {purpose} tokens")
+    for _, key in candidates:
+        codec = create_codec(purpose, key, footer, implicit_assertion)
+        try:
+            return codec.decode_parsed(parsed)
+        except BATCH_ITEM_ERRORS as exception:
+            error = exception
+    raise error
+
+
+def kid_footer(kid: str) -> bytes:
+    """Return JSON footer naming key ID kid."""
+    return json.dumps({"kid": kid}, separators=(",", ":")).encode()
+
+
+def footer_kid(footer: bytes) -> str | None:
+    """Return key ID of a JSON footer, None if footer has no key ID."""
+    return footer_claim(footer, "kid")
+
+
+def footer_claim(footer: bytes, name: str) -> str | None:
+    """Return string claim name of a JSON footer, None if footer has no such claim.
+
+    Footers are read before the token is verified, footers that are not JSON
+    objects or nest too deep to be parsed have no claims.
+    """
+    if not footer.startswith(b"{"):
+        return None
+    try:
+        claims = json.loads(footer)
+    except (ValueError, RecursionError):
+        return None
+    value = claims.get(name)
+    return value if isinstance(value, str) else None
+
+
+def token_footer(token: ParsedToken) -> bytes:
+    """Return decoded footer of token, checking size limits first.
+
+    Raises InvalidToken if the footer is not base64url encoded.
+    """
+    token.check_structure()
+    return token.decode_footer()
@@ -1 +1,4 @@
-"""This module is a placeholder for a possible future PASERK implementation."""
+"""This module contains parts of PASERK, serialized keys and key IDs.
+
+https://github.com/paseto-standard/paserk
+"""
@@ -8,11 +8,20 @@ A PASERK implementation may supersede this module in the future.
 https://github.com/paseto-standard/paserk
 """
 
+import hashlib
 import os
 from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, ClassVar
 
 import pysodium
 
+from paseto.exceptions import InvalidKey
+from paseto.protocol.util import b64
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing_extensions import Self
+
 _KEY_PREFIX = b"k"
 _KEY_LENGHT = 32
 
@@ -20,6 +29,16 @@ _TYPE_LOCAL = b".local."
 _TYPE_PUBLIC = b".public."
 _TYPE_SECRET = b".secret."
 
+_ID_LOCAL = b".lid."
+_ID_PUBLIC = b".pid."
+_ID_SECRET = b".sid."
+# https://github.com/paseto-standard/paserk/blob/master/operations/ID.md
+_ID_DIGEST_SIZE = 33
+
+# digest sizes of the keyed BLAKE2b states used to split a symmetric key
+_ENCRYPTION_DIGEST_SIZE = 56
+_AUTHENTICATION_DIGEST_SIZE = 32
+
 
 def _create_symmetric_key(version: int, raw_key_material: bytes = b"") -> bytes:
     """Return a new symmetric key."""
@@ -72,3 +91,150 @@ def _get_key_prefix(version: int, key_type: bytes) -> bytes:
 def _verify_key(key: bytes, version: int, key_type: bytes) -> bool:
     """Verify that key contains correct prefix."""
     return key.startswith(_get_key_prefix(version, key_type))
+
+
+def _paserk_id(version: int, id_type: bytes, key_type: bytes, raw_key: bytes) -> str:
+    """Return PASERK ID of raw key bytes."""
+    prefix = _get_key_prefix(version, id_type)
+    paserk = _get_key_prefix(version, key_type) + b64(raw_key)
+    digest = hashlib.blake2b(prefix + paserk, digest_size=_ID_DIGEST_SIZE).digest()
+    return (prefix + b64(digest)).decode()
+
+
+class Key:
+    """Base class for keys that are parsed once and reused across many calls."""
+
+    __slots__ = ("_paserk_id", "raw", "version")
+
+    key_type: ClassVar[bytes] = b""
+    id_type: ClassVar[bytes] = b""
+
+    version: int
+    raw: bytes
+
+    def __init__(self, key: bytes, version: int = 4) -> None:
+        """Parse serialized key, raise InvalidKey if it is not of the expected type."""
+        if not _validate_version(version) or not _verify_key(
+            key, version, self.key_type
+        ):
+            raise InvalidKey
+        self._load(version, _deserialize_key(key))
+
+    @classmethod
+    def from_raw(cls, raw_key: bytes, version: int = 4) -> "Self":
+        """Return key object created from raw key bytes."""
+        if not _validate_version(version):
+            raise InvalidKey
+        key = cls.__new__(cls)
+        key._load(version, raw_key)
+        return key
+
+    def _load(self, version: int, raw_key: bytes) -> None:
+        self.version = version
+        self.raw = raw_key
+        self._paserk_id: str | None = None
+
+    def __bytes__(self) -> bytes:
+        """Return serialized key."""
+        return _serialize_key(self.version, self.key_type, self.raw)
+
+    @property
+    def paserk_id(self) -> str:
+        """PASERK ID of key, such as "k4.lid.…", computed once per key object."""
+        if self._paserk_id is None:
+            self._paserk_id = _paserk_id(
+                self.version, self.id_type, self.key_type, self.raw
+            )
+        return self._paserk_id
+
+
+class SymmetricKey(Key):
+    """Parsed symmetric key with precomputed key derivation state."""
+
+    __slots__ = ("authentication_state", "encryption_state")
+
+    key_type = _TYPE_LOCAL
+    id_type = _ID_LOCAL
+
+    # keyed BLAKE2b states, use copy() before updating
+    encryption_state: hashlib.blake2b
+    authentication_state: hashlib.blake2b
+
+    def _load(self, version: int, raw_key: bytes) -> None:
+        super()._load(version, raw_key)
+        self.encryption_state = hashlib.blake2b(
+            key=raw_key, digest_size=_ENCRYPTION_DIGEST_SIZE
+        )
+        self.authentication_state = hashlib.blake2b(
+            key=raw_key, digest_size=_AUTHENTICATION_DIGEST_SIZE
+        )
+
+
+class PublicKey(Key):
+    """Parsed public key."""
+
+    __slots__ = ()
+
+    key_type = _TYPE_PUBLIC
+    id_type = _ID_PUBLIC
+
+
+class SecretKey(Key):
+    """Parsed secret key."""
+
+    __slots__ = ()
+
+    key_type = _TYPE_SECRET
+    id_type = _ID_SECRET
+
+
+def paserk_ids(keys: Iterable[Key]) -> list[str]:
+    """Return PASERK ID of every key, computed in bulk.
+
+    Hash states are seeded once with the ID prefix of each key type and copied for
+    every key. IDs are memoized on the key objects like Key.paserk_id.
+    """
+    states: dict[tuple[type[Key], int], tuple[bytes, hashlib.blake2b]] = {}
+    ids: list[str] = []
+    append = ids.append
+    for key in keys:
+        if key._paserk_id is None:  # pylint: disable=protected-access
+            seeded = states.get((type(key), key.version))
+            if seeded is None:
+                prefix = _get_key_prefix(key.version, key.id_type)
+                state = hashlib.blake2b(prefix, digest_size=_ID_DIGEST_SIZE)
+                state.update(_get_key_prefix(key.version, key.key_type))
+                seeded = states[type(key), key.version] = (prefix, state)
+            prefix, state = seeded
+            state = state.copy()
+            state.update(b64(key.raw))
+            paserk_id = (prefix + b64(state.digest())).decode()
+            key._paserk_id = paserk_id  # pylint: disable=protected-access
+        append(key.paserk_id)
+    return ids
+
+
+class KeyIndex:
+    """Keys indexed by PASERK ID, for finding the key of an ID in a token footer."""
+
+    __slots__ = ("_keys",)
+
+    def __init__(self, keys: Iterable[Key] = ()) -> None:
+        """Index keys, computing their IDs in bulk."""
+        keys = list(keys)
+        self._keys: dict[str, Key] = dict(zip(paserk_ids(keys), keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, paserk_id: object) -> bool:
+        return paserk_id in self._keys
+
+    def add(self, key: Key) -> str:
+        """Index key and return its PASERK ID."""
+        self._keys[key.paserk_id] = key
+        return key.paserk_id
+
+    def get(self, paserk_id: str) -> Key | None:
+        """Return key of PASERK ID, None if it is not indexed."""
+        return self._keys.get(paserk_id)
@@ -0,0 +1,431 @@
+"""This module serializes claims to token payloads with pluggable payload codecs.
+
+Payload codecs are kept in a registry by name. The name is recorded as "cty" of
+a JSON footer, which is authenticated but not encrypted, so the receiver picks
+the payload codec of a token before decrypting or verifying it, without trial.
+
+"json" is the default, it uses orjson when installed and the json module
+otherwise, both read the output of each other. "binary" is a compact encoding
+of the same values, for tokens exchanged between internal services.
+"""
+
+import functools
+import json
+import struct
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from paseto.claims import TIME_MEMO_SIZE, encode_claims, format_time, parse_time
+from paseto.dispatch import create_codec
+from paseto.exceptions import InvalidFooter, InvalidPayload
+from paseto.keyring import footer_claim, token_footer
+from paseto.paserk.keys import Key, SymmetricKey
+from paseto.protocol.common import parse_token
+
+
+class PayloadCodec(NamedTuple):
+    """Serialization of claims to payloads and back.
+
+    decode raises ValueError for payloads it can not read.
+    """
+
+    name: str
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+DEFAULT_CODEC = "json"
+
+# libraries may be missing, a loader raises this when its codec is unavailable
+_LOAD_ERRORS = (ImportError,)
+
+_loaders: dict[str, Callable[[], PayloadCodec]] = {}
+_codecs: dict[str, PayloadCodec] = {}
+
+
+def register_codec(name: str, loader: Callable[[], PayloadCodec]) -> None:
+    """Register payload codec, loader is called once when the codec is first used.
+
+    Replaces any previous codec of the same name.
+    """
+    _loaders[name] = loader
+    _codecs.pop(name, None)
+
+
+def get_codec(name: str) -> PayloadCodec:
+    """Return payload codec, raise ValueError when it is unknown or not available."""
+    codec = _codecs.get(name)
+    if codec is None:
+        loader = _loaders.get(name)
+        if loader is None:
+            raise ValueError(f"Unknown payload codec {name!r}")
+        try:
+            codec = loader()
+        except _LOAD_ERRORS as error:
+            raise ValueError(f"Payload codec {name!r} is not available") from error
+        _codecs[name] = codec
+    return codec
+
+
+def available_codecs() -> list[str]:
+    """Return names of payload codecs that can be loaded."""
+    names = []
+    for name in _loaders:
+        try:
+            get_codec(name)
+        except ValueError:
+            continue
+        names.append(name)
+    return names
+
+
+def codec_footer(name: str) -> bytes:
+    """Return JSON footer naming payload codec name."""
+    return json.dumps({"cty": name}, separators=(",", ":")).encode()
+
+
+def footer_codec(footer: bytes) -> str:
+    """Return payload codec named in a JSON footer, the default if it names none."""
+    name = footer_claim(footer, "cty")
+    return DEFAULT_CODEC if name is None else name
+
+
+class ClaimsCodec:
+    """Encodes claims to tokens of one purpose and key, and decodes them back.
+
+    Tokens are encoded with one payload codec named in their footer and decoded
+    with the payload codec their footer names. Claims codecs can be shared
+    between threads.
+    """
+
+    __slots__ = (
+        "_decoders",
+        "_encoder",
+        "_implicit_assertion",
+        "_key",
+        "_payload",
+        "_purpose",
+    )
+
+    def __init__(
+        self,
+        purpose: str,
+        key: bytes | Key,
+        codec: str = DEFAULT_CODEC,
+        implicit_assertion: bytes = b"",
+    ) -> None:
+        """Encode with key of purpose, such as "v4.local", and payload codec codec.
+
+        Raises ValueError if purpose or codec are unknown.
+        """
+        if purpose == "v4.local" and not isinstance(key, Key):
+            key = SymmetricKey(key)
+        self._purpose = purpose
+        self._key = key
+        self._implicit_assertion = implicit_assertion
+        self._payload = get_codec(codec)
+        self._encoder = create_codec(
+            purpose, key, codec_footer(codec), implicit_assertion
+        )
+        # token codec and payload codec of every encoded footer naming a codec
+        self._decoders: dict[bytes, tuple[Any, PayloadCodec]] = {}
+
+    def encode(self, claims: Any) -> bytes:
+        """Return token of claims."""
+        return self._encoder.encode(self._payload.encode(claims))
+
+    def decode(self, token: bytes) -> Any:
+        """Return claims of token.
+
+        Raises InvalidFooter if the footer names an unknown payload codec and
+        InvalidPayload if the payload codec can not read the payload.
+        """
+        parsed = parse_token(token)
+        decoders = self._decoders.get(bytes(parsed.footer))
+        if decoders is None:
+            footer = token_footer(parsed)
+            name = footer_codec(footer)
+            try:
+                payload_codec = get_codec(name)
+            except ValueError as error:
+                raise InvalidFooter(str(error)) from error
+            decoders = (
+                create_codec(
+                    self._purpose, self._key, footer, self._implicit_assertion
+                ),
+                payload_codec,
+            )
+            if footer == codec_footer(name):
+                # bounded by the number of codecs, other footers are not kept
+                self._decoders[bytes(parsed.footer)] = decoders
+        token_codec, payload_codec = decoders
+        payload = token_codec.decode_parsed(parsed)
+        try:
+            return payload_codec.decode(payload)
+        except ValueError as error:
+            raise InvalidPayload(
+                f"Payload is not valid {payload_codec.name}"
+            ) from error
+
+
+def _load_json() -> PayloadCodec:
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return PayloadCodec("json", encode_claims, json.loads)
+    # orjson writes aware datetimes like format_time()
+    return PayloadCodec(
+        "json",
+        orjson.dumps,  # pylint: disable=no-member
+        orjson.loads,  # pylint: disable=no-member
+    )
+
+
+def _load_binary() -> PayloadCodec:
+    return PayloadCodec("binary", encode_binary, decode_binary)
+
+
+# type tags of the binary encoding
+_NULL = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_LIST = 6
+_DICT = 7
+# a time format_time() writes, as in claims "exp", "nbf" and "iat"
+_TIME = 8
+
+_UTC_TIME_SIZE = len("1970-01-01T00:00:00+00:00")
+
+_DOUBLE = struct.Struct(">d")
+
+# integers are limited to 64 bits, so varints take at most 10 bytes
+_MIN_INT = -(2**63)
+_MAX_INT = 2**64 - 1
+_MAX_VARINT_SIZE = 10
+# lists and dicts nested deeper are rejected instead of exhausting the stack
+_MAX_DEPTH = 255
+
+
+def encode_binary(value: Any) -> bytes:
+    """Return compact binary encoding of a JSON value.
+
+    Integers and lengths are varints, floats are 8 bytes and strings UTF-8.
+    Strings of UTC times as written by format_time() are varints of epoch
+    seconds. Datetimes are encoded as strings, like in JSON, tuples as lists.
+    Raises ValueError for integers beyond 64 bits and lists and dicts nested
+    more than 255 deep.
+    """
+    buffer = bytearray()
+    _encode(value, buffer, 0)
+    return bytes(buffer)
+
+
+def _encode(value: Any, buffer: bytearray, depth: int) -> None:
+    value_type = type(value)
+    if value_type is str:
+        _encode_str(value, buffer)
+    elif value_type is int:
+        if not _MIN_INT <= value <= _MAX_INT:
+            raise ValueError(f"Integer {value} does not fit into 64 bits")
+        buffer.append(_INT)
+        _encode_varint(_zigzag(value), buffer)
+    elif value is None:
+        buffer.append(_NULL)
+    elif value_type is bool:
+        buffer.append(_TRUE if value else _FALSE)
+    elif value_type is float:
+        buffer.append(_FLOAT)
+        buffer += _DOUBLE.pack(value)
+    elif isinstance(value, dict):
+        _encode_dict(value, buffer, _nested(depth))
+    elif isinstance(value, list | tuple):
+        depth = _nested(depth)
+        buffer.append(_LIST)
+        _encode_varint(len(value), buffer)
+        for item in value:
+            _encode(item, buffer, depth)
+    else:
+        _encode_str(_binary_default(value), buffer)
+
+
+def _encode_str(value: str, buffer: bytearray) -> None:
+    seconds = _utc_seconds(value) if len(value) == _UTC_TIME_SIZE else None
+    if seconds is None:
+        data = value.encode()
+        buffer.append(_STR)
+        _encode_varint(len(data), buffer)
+        buffer += data
+    else:
+        buffer.append(_TIME)
+        _encode_varint(_zigzag(seconds), buffer)
+
+
+def _encode_dict(value: dict[Any, Any], buffer: bytearray, depth: int) -> None:
+    buffer.append(_DICT)
+    _encode_varint(len(value), buffer)
+    for key, item in value.items():
+        if not isinstance(key, str):
+            raise TypeError(f"Keys must be str, not {type(key).__name__}")
+        data = key.encode()
+        _encode_varint(len(data), buffer)
+        buffer += data
+        _encode(item, buffer, depth)
+
+
+def _nested(depth: int) -> int:
+    """Return depth of the items of a list or dict at depth."""
+    if depth == _MAX_DEPTH:
+        raise ValueError(f"Lists and dicts are nested more than {_MAX_DEPTH} deep")
+    return depth + 1
+
+
+def _zigzag(number: int) -> int:
+    # small negative numbers stay short
+    return number * 2 if number >= 0 else -number * 2 - 1
+
+
+def _unzigzag(number: int) -> int:
+    return number >> 1 if not number & 1 else -(number >> 1) - 1
+
+
+@functools.lru_cache(maxsize=TIME_MEMO_SIZE)
+def _utc_seconds(value: str) -> int | None:
+    """Return epoch seconds of a time string format_time() writes, else None."""
+    try:
+        seconds = parse_time(value)
+    except ValueError:
+        return None
+    return seconds if format_time(seconds) == value else None
+
+
+@functools.lru_cache(maxsize=TIME_MEMO_SIZE)
+def _utc_time(seconds: int) -> str:
+    return format_time(seconds)
+
+
+def _binary_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return format_time(value)
+    raise TypeError(f"Object of type {type(value).__name__} can not be encoded")
+
+
+def _encode_varint(number: int, buffer: bytearray) -> None:
+    while number > 0x7F:
+        buffer.append(number & 0x7F | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def decode_binary(data: bytes) -> Any:
+    """Return value of a binary encoding, raise ValueError if it is malformed."""
+    try:
+        value, position = _decode(data, 0, 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as error:
+        raise ValueError("Truncated or malformed binary payload") from error
+    except (OverflowError, OSError) as error:
+        raise ValueError("Time out of range in binary payload") from error
+    except RecursionError as error:
+        # nesting within the limit can still exhaust a stack that was almost full
+        raise ValueError("Binary payload nests too deep") from error
+    if position != len(data):
+        raise ValueError("Trailing data in binary payload")
+    return value
+
+
+def _decode(data: bytes, position: int, depth: int) -> tuple[Any, int]:
+    tag = data[position]
+    if tag >= len(_DECODERS):
+        raise ValueError(f"Unknown type tag {tag} in binary payload")
+    return _DECODERS[tag](data, position + 1, depth)
+
+
+def _decode_null(_: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    return None, position
+
+
+def _decode_false(_: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    return False, position
+
+
+def _decode_true(_: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    return True, position
+
+
+def _decode_int(data: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    number, position = _decode_varint(data, position)
+    return _unzigzag(number), position
+
+
+def _decode_float(data: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    return _DOUBLE.unpack_from(data, position)[0], position + _DOUBLE.size
+
+
+def _decode_str(data: bytes, position: int, _depth: int = 0) -> tuple[Any, int]:
+    size = data[position]
+    # lengths of most strings fit into one byte
+    if size < 0x80:
+        position += 1
+    else:
+        size, position = _decode_varint(data, position)
+    end = position + size
+    if end > len(data):
+        raise IndexError(end)
+    return data[position:end].decode(), end
+
+
+def _decode_list(data: bytes, position: int, depth: int) -> tuple[Any, int]:
+    depth = _nested(depth)
+    count, position = _decode_varint(data, position)
+    items = []
+    for _ in range(count):
+        item, position = _decode(data, position, depth)
+        items.append(item)
+    return items, position
+
+
+def _decode_dict(data: bytes, position: int, depth: int) -> tuple[Any, int]:
+    depth = _nested(depth)
+    count, position = _decode_varint(data, position)
+    result = {}
+    for _ in range(count):
+        key, position = _decode_str(data, position)
+        result[key], position = _decode(data, position, depth)
+    return result, position
+
+
+def _decode_time(data: bytes, position: int, _depth: int) -> tuple[Any, int]:
+    number, position = _decode_varint(data, position)
+    return _utc_time(_unzigzag(number)), position
+
+
+# decoders of the values after each type tag, in order of the tags
+_DECODERS: tuple[Callable[[bytes, int, int], tuple[Any, int]], ...] = (
+    _decode_null,
+    _decode_false,
+    _decode_true,
+    _decode_int,
+    _decode_float,
+    _decode_str,
+    _decode_list,
+    _decode_dict,
+    _decode_time,
+)
+
+
+def _decode_varint(data: bytes, position: int) -> tuple[int, int]:
+    number = shift = 0
+    for index in range(position, position + _MAX_VARINT_SIZE):
+        byte = data[index]
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return number, index + 1
+        shift += 7
+    raise ValueError("Varint longer than 10 bytes in binary payload")
+
+
+register_codec("json", _load_json)
+register_codec("binary", _load_binary)
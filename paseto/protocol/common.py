@@ -1,9 +1,54 @@
 """This module contains common building blocks used in several protocol versions."""
 
 import hmac
+import string
+from base64 import urlsafe_b64decode
+from collections.abc import Callable, Iterable
+from typing import NamedTuple
 
-from paseto.exceptions import InvalidFooter, InvalidHeader
-from paseto.protocol.util import b64, b64decode
+from paseto.exceptions import (
+    InvalidFooter,
+    InvalidHeader,
+    InvalidToken,
+    PasetoException,
+)
+from paseto.protocol.util import b64, b64decode, padding_size
+
+DEFAULT_MAX_TOKEN_SIZE = 32 * 1024 * 1024
+DEFAULT_MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_FOOTER_SIZE = 8 * 1024
+
+_BASE64URL_ALPHABET = (string.ascii_letters + string.digits + "-_").encode()
+
+
+class SizeLimits(NamedTuple):
+    """Largest token, decoded payload and decoded footer accepted, in bytes."""
+
+    token: int = DEFAULT_MAX_TOKEN_SIZE
+    payload: int = DEFAULT_MAX_PAYLOAD_SIZE
+    footer: int = DEFAULT_MAX_FOOTER_SIZE
+
+
+_size_limits = SizeLimits()
+
+
+def get_size_limits() -> SizeLimits:
+    """Return size limits of tokens accepted for decoding."""
+    return _size_limits
+
+
+def set_size_limits(limits: SizeLimits) -> SizeLimits:
+    """Set size limits of tokens accepted for decoding, per process, and return the
+    previous limits.
+    """
+    global _size_limits  # pylint: disable=global-statement
+    previous, _size_limits = _size_limits, limits
+    return previous
+
+
+def encoded_size(size: int) -> int:
+    """Return length of base64url encoding of size bytes, without padding."""
+    return (4 * size + 2) // 3
 
 
 def check_footer(message: bytes, footer: bytes) -> None:
@@ -24,3 +69,106 @@ def decode_message(message: bytes, header_length: int) -> bytes:
         # strip header and remove any footer
         message[header_length:].split(b".")[0]
     )
+
+
+class ParsedToken:
+    """Header, payload and footer of a token, as memoryview slices of the token."""
+
+    __slots__ = ("footer", "header", "payload")
+
+    def __init__(self, header: memoryview, payload: memoryview, footer: memoryview):
+        self.header = header
+        self.payload = payload
+        self.footer = footer
+
+    def check_footer(self, encoded_footer: bytes) -> None:
+        """Check that token carries a valid, already base64 encoded, footer."""
+        if encoded_footer and not hmac.compare_digest(encoded_footer, self.footer):
+            raise InvalidFooter("Invalid message footer")
+
+    def check_header(self, header: bytes) -> None:
+        """Check that token begins with a valid header."""
+        if self.header != header:
+            raise InvalidHeader("Invalid message header")
+
+    def check_structure(self, min_payload_size: int = 0) -> None:
+        """Check token against size limits, before any copy or cryptography.
+
+        Payloads must decode to at least min_payload_size bytes, such as nonce
+        and MAC of local tokens or the signature of public tokens.
+        """
+        limits = _size_limits
+        payload_size = len(self.payload)
+        if len(self.footer) > encoded_size(limits.footer):
+            raise InvalidToken("Footer is too large")
+        if (
+            not encoded_size(min_payload_size)
+            <= payload_size
+            <= encoded_size(limits.payload)
+            or payload_size % 4 == 1
+        ):
+            raise InvalidToken("Invalid payload size")
+
+    def decode_footer(self) -> bytes:
+        """Returns footer decoded into raw binary, raise InvalidToken if it is not
+        base64url encoded.
+        """
+        if len(self.footer) % 4 == 1:
+            raise InvalidToken("Footer is not base64url encoded")
+        return _decode_base64url(self.footer, "Footer")
+
+    def decode_payload(self) -> bytes:
+        """Returns payload decoded into raw binary, raise InvalidToken if it is not
+        base64url encoded.
+        """
+        return _decode_base64url(self.payload, "Payload")
+
+
+def _decode_base64url(data: memoryview, part: str) -> bytes:
+    """Return unpadded base64url data decoded, data must not be 1 more than a
+    multiple of 4 characters long.
+    """
+    padding = b"=" * padding_size(len(data))
+    padded = b"".join((data, padding))
+    # only padding is left after removing every character of the alphabet
+    if padded.translate(None, _BASE64URL_ALPHABET) != padding:
+        raise InvalidToken(f"{part} is not base64url encoded")
+    return urlsafe_b64decode(padded)
+
+
+def parse_token(token: bytes | bytearray) -> ParsedToken:
+    """Split token into header, payload and footer in a single scan, without copies.
+
+    Header runs up to and including the second ".", footer is everything after the
+    next one. Any further "." belongs to the footer, where it fails footer checks.
+    Raises InvalidToken if token exceeds the size limit, before scanning it.
+    """
+    if len(token) > _size_limits.token:
+        raise InvalidToken("Token is too large")
+    view = memoryview(token)
+    version_end: int = token.find(b".") + 1
+    header_end: int = token.find(b".", version_end) + 1 if version_end else 0
+    separator: int = token.find(b".", header_end) if header_end else -1
+    if separator == -1:
+        return ParsedToken(view[:header_end], view[header_end:], view[:0])
+    return ParsedToken(
+        view[:header_end], view[header_end:separator], view[separator + 1 :]
+    )
+
+
+# errors caused by a single item of a batch, reported in place of its result
+BATCH_ITEM_ERRORS = (PasetoException, ValueError, TypeError)
+
+
+def map_batch(
+    function: Callable[[bytes], bytes], items: Iterable[bytes]
+) -> list[bytes | Exception]:
+    """Return result of function for each item, or the exception it raised."""
+    results: list[bytes | Exception] = []
+    append = results.append
+    for item in items:
+        try:
+            append(function(item))
+        except BATCH_ITEM_ERRORS as error:
+            append(error)
+    return results
@@ -1,7 +1,18 @@
 """This module contains utility functions necessary for protocol implementation."""
 
 from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Iterable, Iterator
 from struct import pack
+from typing import Protocol
+
+BytesLike = bytes | bytearray | memoryview
+
+
+class SupportsUpdate(Protocol):  # pylint: disable=too-few-public-methods
+    """Incremental hash object, such as one returned by hashlib.blake2b()."""
+
+    def update(self, data: BytesLike, /) -> None:
+        """Feed data into the hash object."""
 
 
 # specification: https://tools.ietf.org/html/draft-paragon-paseto-rfc-00#section-2.2.1
@@ -11,11 +22,27 @@ def pae(pieces: list[bytes]) -> bytes:
     if not isinstance(pieces, list):
         raise TypeError("Expecting a list of bytes-like objects")
 
-    ret = le64(len(pieces))
+    ret = [le64(len(pieces))]
     for piece in pieces:
-        ret += le64(len(piece)) + piece
+        ret.append(le64(len(piece)))
+        ret.append(piece)
 
-    return ret
+    return b"".join(ret)
+
+
+def pae_update(hash_object: SupportsUpdate, pieces: list[BytesLike]) -> None:
+    """Applies Pre-Authentication Encoding (PAE) to input, feeding it into hash_object.
+
+    Produces the same byte stream as pae() without materializing it in memory.
+    """
+
+    if not isinstance(pieces, list):
+        raise TypeError("Expecting a list of bytes-like objects")
+
+    hash_object.update(le64(len(pieces)))
+    for piece in pieces:
+        hash_object.update(le64(len(piece)))
+        hash_object.update(piece)
 
 
 def le64(num: int) -> bytes:
@@ -23,7 +50,7 @@ def le64(num: int) -> bytes:
     return pack("<Q", num)
 
 
-def b64(input_bytes: bytes) -> bytes:
+def b64(input_bytes: BytesLike) -> bytes:
     """Returns base64 encoding.
 
     Input is encoded using base64url as defined in RFC4648, without "=" padding.
@@ -33,9 +60,29 @@ def b64(input_bytes: bytes) -> bytes:
     return urlsafe_b64encode(input_bytes).rstrip(b"=")
 
 
-def b64decode(input_bytes: bytes) -> bytes:
+def b64_chunks(chunks: Iterable[BytesLike]) -> Iterator[bytes]:
+    """Yields base64 encoding of concatenated chunks, as produced by b64().
+
+    Only whole 3 byte groups are encoded until input is exhausted,
+    so memory use is bounded by the size of a single chunk. Chunks are encoded
+    before the next one is read, so they may reuse one buffer.
+    """
+    remainder = b""
+    for chunk in chunks:
+        data = remainder + chunk if remainder else chunk
+        cut = len(data) - len(data) % 3
+        remainder = bytes(data[cut:])
+        if cut:
+            yield b64(data[:cut])
+    if remainder:
+        yield b64(remainder)
+
+
+def b64decode(input_bytes: BytesLike) -> bytes:
     """Returns base64 decoding by reversing b64()."""
-    return urlsafe_b64decode(input_bytes + b"=" * padding_size(len(input_bytes)))
+    return urlsafe_b64decode(
+        b"".join((input_bytes, b"=" * padding_size(len(input_bytes))))
+    )
 
 
 def padding_size(num: int) -> int:
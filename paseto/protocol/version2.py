@@ -1,20 +1,59 @@
 """This module contains Version2 implementation of the Paseto protocol."""
 
-import hashlib
 import os
+from collections.abc import Iterable
 
 from paseto.crypto import primitives
-from paseto.protocol.common import check_footer, check_header, decode_message
-
-from .util import b64, pae
+from paseto.crypto.nonce import NonceSource
+from paseto.exceptions import InvalidKey
+from paseto.protocol.common import (
+    ParsedToken,
+    check_footer,
+    check_header,
+    decode_message,
+    map_batch,
+    parse_token,
+)
+
+from .util import b64, le64, pae
 
 HEADER_LOCAL = b"v2.local."
 HEADER_PUBLIC = b"v2.public."
 NONCE_SIZE = 24
-
-
-def encrypt(message: bytes, key: bytes, footer: bytes = b"") -> bytes:
-    """https://tools.ietf.org/html/draft-paragon-paseto-rfc-00#section-5.3.1"""
+PUBLIC_KEY_SIZE = 32
+SECRET_KEY_SIZE = 64
+SIGNATURE_SIZE = 64
+TAG_SIZE = 16
+
+# smallest payloads: nonce and Poly1305 tag of local, signature of public tokens
+_MIN_LOCAL_PAYLOAD_SIZE = NONCE_SIZE + TAG_SIZE
+_MIN_PUBLIC_PAYLOAD_SIZE = SIGNATURE_SIZE
+
+# PAE pieces preceding the nonce of v2.local and the message of v2.public tokens
+_LOCAL_PRE_AUTH_PREFIX = (
+    le64(3) + le64(len(HEADER_LOCAL)) + HEADER_LOCAL + le64(NONCE_SIZE)
+)
+_PUBLIC_PRE_AUTH_PREFIX = le64(3) + le64(len(HEADER_PUBLIC)) + HEADER_PUBLIC
+
+# primitives of the selected backends, bound once by _bind_backend() and _bind_hash_backend()
+_encrypt: primitives.EncryptFunction
+_decrypt: primitives.DecryptFunction
+_sign: primitives.SignFunction
+_verify: primitives.VerifyFunction
+_blake2b: primitives.HashFunction
+
+
+def encrypt(
+    message: bytes,
+    key: bytes,
+    footer: bytes = b"",
+    *,
+    nonce_source: NonceSource | None = None,
+) -> bytes:
+    """https://tools.ietf.org/html/draft-paragon-paseto-rfc-00#section-5.3.1
+
+    Random bytes are read from nonce_source, os.urandom() unless given.
+    """
 
     # Given a message "m", key "k", and optional footer "f".
 
@@ -22,7 +61,7 @@ def encrypt(message: bytes, key: bytes, footer: bytes = b"") -> bytes:
     header = HEADER_LOCAL
 
     # 2.  Generate 24 random bytes from the OS's CSPRNG.
-    random_bytes = os.urandom(NONCE_SIZE)
+    random_bytes = (nonce_source or os.urandom)(NONCE_SIZE)
 
     # 3.  Calculate BLAKE2b of the message "m" with the output of step 2 as
     #        the key, with an output length of 24.  This will be our nonce,
@@ -38,7 +77,7 @@ def encrypt(message: bytes, key: bytes, footer: bytes = b"") -> bytes:
 
     # 5.  Encrypt the message using XChaCha20-Poly1305, using an AEAD
     #        interface such as the one provided in libsodium.
-    cipher_text = primitives.encrypt(message, pre_auth, nonce, key)
+    cipher_text = _encrypt(message, pre_auth, nonce, key)
 
     #    6.  If "f" is:
     #
@@ -62,19 +101,21 @@ def decrypt(message: bytes, key: bytes, footer: bytes = b"") -> bytes:
     #    1.  If "f" is not empty, implementations MAY verify that the value
     #        appended to the token matches some expected string "f", provided
     #        they do so using a constant-time string compare function.
-    check_footer(message, footer)
+    token = parse_token(message)
+    token.check_footer(b64(footer))
 
     # 2.  Verify that the message begins with "v2.local.", otherwise throw
     #        an exception.  This constant will be referred to as "h".
     header = HEADER_LOCAL
-    check_header(message, header)
+    token.check_header(header)
+    token.check_structure(_MIN_LOCAL_PAYLOAD_SIZE)
 
     # 3.  Decode the payload ("m" sans "h", "f", and the optional trailing
     #        period between "m" and "f") from base64url to raw binary.  Set:
     #
     #        *  "n" to the leftmost 24 bytes
     #        *  "c" to the middle remainder of the payload, excluding "n".
-    raw_inner_message = decode_message(message, len(header))
+    raw_inner_message = token.decode_payload()
 
     nonce = raw_inner_message[:NONCE_SIZE]
     cipher_text = raw_inner_message[NONCE_SIZE:]
@@ -85,7 +126,7 @@ def decrypt(message: bytes, key: bytes, footer: bytes = b"") -> bytes:
 
     # 5.  Decrypt "c" using "XChaCha20-Poly1305", store the result in "p".
     # 6.  If decryption failed, throw an exception.  Otherwise, return "p".
-    return primitives.decrypt(cipher_text, pre_auth, nonce, key)
+    return _decrypt(cipher_text, pre_auth, nonce, key)
 
 
 def sign(message: bytes, secret_key: bytes, footer: bytes = b"") -> bytes:
@@ -101,7 +142,7 @@ def sign(message: bytes, secret_key: bytes, footer: bytes = b"") -> bytes:
     message2 = pae([header, message, footer])
 
     # 3.  Sign "m2" using Ed25519 "sk".  We'll call this "sig".
-    signature = primitives.sign(message2, secret_key)
+    signature = _sign(message2, secret_key)
 
     # 4.  If "f" is:
     #
@@ -126,12 +167,14 @@ def verify(signed_message: bytes, public_key: bytes, footer: bytes = b"") -> byt
     # 1.  If "f" is not empty, implementations MAY verify that the value
     #        appended to the token matches some expected string "f", provided
     #        they do so using a constant-time string compare function.
-    check_footer(signed_message, footer)
+    token = parse_token(signed_message)
+    token.check_footer(b64(footer))
 
     # 2.  Verify that the message begins with "v2.public.", otherwise throw
     #        an exception.  This constant will be referred to as "h".
     header = HEADER_PUBLIC
-    check_header(signed_message, header)
+    token.check_header(header)
+    token.check_structure(_MIN_PUBLIC_PAYLOAD_SIZE)
 
     # 3.  Decode the payload ("sm" sans "h", "f", and the optional trailing
     #        period between "m" and "f") from base64url to raw binary.  Set:
@@ -139,7 +182,7 @@ def verify(signed_message: bytes, public_key: bytes, footer: bytes = b"") -> byt
     #        *  "s" to the rightmost 64 bytes
     #
     #        *  "m" to the leftmost remainder of the payload, excluding "s"
-    raw_inner_message = decode_message(signed_message, len(header))
+    raw_inner_message = token.decode_payload()
 
     signature = raw_inner_message[-64:]
     message = raw_inner_message[:-64]
@@ -149,13 +192,207 @@ def verify(signed_message: bytes, public_key: bytes, footer: bytes = b"") -> byt
 
     # 5.  Use Ed25519 to verify that the signature is valid for the message
     # 6.  If the signature is valid, return "m".  Otherwise, throw an exception.
-    primitives.verify(signature, message2, public_key)
+    _verify(signature, message2, public_key)
     return message
 
 
+class LocalCodec:
+    """v2.local tokens of one key and footer, with everything else computed once.
+
+    Instances are not modified after creation and can be shared between threads.
+    """
+
+    __slots__ = (
+        "_encoded_footer",
+        "_nonce_source",
+        "_pre_auth_suffix",
+        "_symmetric_key",
+        "_token_suffix",
+    )
+
+    def __init__(
+        self,
+        key: bytes,
+        footer: bytes = b"",
+        *,
+        nonce_source: NonceSource | None = None,
+    ) -> None:
+        self._symmetric_key = key
+        self._nonce_source = nonce_source
+        self._pre_auth_suffix = le64(len(footer)) + footer
+        self._encoded_footer = b64(footer)
+        self._token_suffix = b"." + self._encoded_footer if footer else b""
+
+    def encode(self, message: bytes) -> bytes:
+        """Return token of encrypted message, same as encrypt()."""
+        random_bytes = (self._nonce_source or os.urandom)(NONCE_SIZE)
+        nonce = _blake2b(message, random_bytes, NONCE_SIZE)
+        pre_auth = b"".join((_LOCAL_PRE_AUTH_PREFIX, nonce, self._pre_auth_suffix))
+        cipher_text = _encrypt(message, pre_auth, nonce, self._symmetric_key)
+        return HEADER_LOCAL + b64(nonce + cipher_text) + self._token_suffix
+
+    def decode(self, message: bytes) -> bytes:
+        """Return plaintext of token, same as decrypt()."""
+        return self.decode_parsed(parse_token(message))
+
+    def decode_parsed(self, token: ParsedToken) -> bytes:
+        """Return plaintext of token already split by parse_token()."""
+        token.check_footer(self._encoded_footer)
+        token.check_header(HEADER_LOCAL)
+        token.check_structure(_MIN_LOCAL_PAYLOAD_SIZE)
+        raw_inner_message = token.decode_payload()
+        nonce = raw_inner_message[:NONCE_SIZE]
+        cipher_text = raw_inner_message[NONCE_SIZE:]
+        pre_auth = b"".join((_LOCAL_PRE_AUTH_PREFIX, nonce, self._pre_auth_suffix))
+        return _decrypt(cipher_text, pre_auth, nonce, self._symmetric_key)
+
+
+class PublicCodec:
+    """v2.public tokens of one key pair and footer.
+
+    Created with a 64 byte secret key it signs and verifies, created with a public
+    key it only verifies. Instances can be shared between threads.
+    """
+
+    __slots__ = (
+        "_encoded_footer",
+        "_pre_auth_suffix",
+        "_public_key",
+        "_secret_key",
+        "_token_suffix",
+    )
+
+    def __init__(self, key: bytes, footer: bytes = b"") -> None:
+        self._secret_key: bytes | None = None
+        self._public_key = key
+        if len(key) == SECRET_KEY_SIZE:
+            # libsodium secret keys end with their public key
+            self._secret_key, self._public_key = key, key[-PUBLIC_KEY_SIZE:]
+        self._pre_auth_suffix = le64(len(footer)) + footer
+        self._encoded_footer = b64(footer)
+        self._token_suffix = b"." + self._encoded_footer if footer else b""
+
+    def encode(self, message: bytes) -> bytes:
+        """Return signed token of message, same as sign()."""
+        if self._secret_key is None:
+            raise ValueError("Signing requires a secret key")
+        message2 = b"".join(
+            (
+                _PUBLIC_PRE_AUTH_PREFIX,
+                le64(len(message)),
+                message,
+                self._pre_auth_suffix,
+            )
+        )
+        signature = _sign(message2, self._secret_key)
+        return HEADER_PUBLIC + b64(message + signature) + self._token_suffix
+
+    def decode(self, signed_message: bytes) -> bytes:
+        """Return message of token with a valid signature, same as verify()."""
+        return self.decode_parsed(parse_token(signed_message))
+
+    def decode_parsed(self, token: ParsedToken) -> bytes:
+        """Return message of token already split by parse_token()."""
+        token.check_footer(self._encoded_footer)
+        token.check_header(HEADER_PUBLIC)
+        token.check_structure(_MIN_PUBLIC_PAYLOAD_SIZE)
+        raw_inner_message = token.decode_payload()
+        signature = raw_inner_message[-SIGNATURE_SIZE:]
+        message = raw_inner_message[:-SIGNATURE_SIZE]
+        message2 = b"".join(
+            (
+                _PUBLIC_PRE_AUTH_PREFIX,
+                le64(len(message)),
+                message,
+                self._pre_auth_suffix,
+            )
+        )
+        _verify(signature, message2, self._public_key)
+        return message
+
+
+def local_codec(
+    key: bytes, footer: bytes = b"", *, nonce_source: NonceSource | None = None
+) -> LocalCodec:
+    """Return reusable encoder and decoder of v2.local tokens."""
+    return LocalCodec(key, footer, nonce_source=nonce_source)
+
+
+def public_codec(key: bytes, footer: bytes = b"") -> PublicCodec:
+    """Return reusable signer and verifier of v2.public tokens."""
+    return PublicCodec(key, footer)
+
+
+def encrypt_many(
+    messages: Iterable[bytes],
+    key: bytes,
+    footer: bytes = b"",
+    *,
+    nonce_source: NonceSource | None = None,
+) -> list[bytes | Exception]:
+    """Encrypt each message with shared key and footer, return token or exception."""
+    return map_batch(
+        LocalCodec(key, footer, nonce_source=nonce_source).encode, messages
+    )
+
+
+def decrypt_many(
+    messages: Iterable[bytes], key: bytes, footer: bytes = b""
+) -> list[bytes | Exception]:
+    """Decrypt each token with shared key and footer, return plaintext or exception."""
+    return map_batch(LocalCodec(key, footer).decode, messages)
+
+
+def sign_many(
+    messages: Iterable[bytes], secret_key: bytes, footer: bytes = b""
+) -> list[bytes | Exception]:
+    """Sign each message with shared key and footer, return token or exception.
+
+    Key is checked once for the whole batch, InvalidKey unless it is a secret key.
+    """
+    _check_key_size(secret_key, SECRET_KEY_SIZE)
+    return map_batch(PublicCodec(secret_key, footer).encode, messages)
+
+
+def verify_many(
+    signed_messages: Iterable[bytes], public_key: bytes, footer: bytes = b""
+) -> list[bytes | Exception]:
+    """Verify each token with shared key and footer, return message or exception.
+
+    Key is checked once for the whole batch, InvalidKey unless it is a public key.
+    """
+    _check_key_size(public_key, PUBLIC_KEY_SIZE)
+    return map_batch(PublicCodec(public_key, footer).decode, signed_messages)
+
+
+def _check_key_size(key: bytes, size: int) -> None:
+    if len(key) != size:
+        raise InvalidKey
+
+
 def get_nonce(message: bytes, random_bytes: bytes) -> bytes:
     """Return nonce per Version2 specification."""
-    return hashlib.blake2b(message, key=random_bytes, digest_size=NONCE_SIZE).digest()
+    return _blake2b(message, random_bytes, NONCE_SIZE)
+
+
+def _bind_backend(backend: primitives.Backend) -> None:
+    # pylint: disable=global-statement
+    global _encrypt, _decrypt, _sign, _verify
+    _encrypt, _decrypt, _sign, _verify = (
+        backend.encrypt,
+        backend.decrypt,
+        backend.sign,
+        backend.verify,
+    )
+
+
+def _bind_hash_backend(backend: primitives.HashBackend) -> None:
+    # pylint: disable=global-statement
+    global _blake2b
+    _blake2b = backend.blake2b
+
+
+primitives.subscribe(_bind_backend, _bind_hash_backend)
 
 
 # backwards compatibility, do not use this class
@@ -6,21 +6,35 @@ https://github.com/paseto-standard/paseto-spec/blob/master/docs/01-Protocol-Vers
 
 import hashlib
 import hmac
+import itertools
+import mmap
 import os
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO, TypeVar
 
 from paseto.crypto import libsodium_wrapper, primitives
-from paseto.exceptions import InvalidKey, InvalidMac
+from paseto.crypto.nonce import NonceSource
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidKey, InvalidMac
 from paseto.paserk.keys import (
-    _TYPE_LOCAL,
-    _TYPE_PUBLIC,
-    _TYPE_SECRET,
+    Key,
+    PublicKey,
+    SecretKey,
+    SymmetricKey,
     _create_asymmetric_key,
     _create_symmetric_key,
-    _deserialize_key,
 )
 from paseto.paserk.keys import _verify_key as _generic_verify_key
-from paseto.protocol.common import check_footer, check_header, decode_message
-from paseto.protocol.util import b64, pae
+from paseto.protocol.common import ParsedToken, map_batch, parse_token
+from paseto.protocol.util import (
+    BytesLike,
+    b64,
+    b64_chunks,
+    b64decode,
+    le64,
+    padding_size,
+    pae,
+    pae_update,
+)
 
 HEADER_LOCAL = b"v4.local."
 HEADER_PUBLIC = b"v4.public."
@@ -29,106 +43,135 @@ NONCE_SIZE = 32
 ENCRYPTION_KEY_LENGTH = 32
 AUTHENTICATION_KEY_LENGTH = 32
 MAC_SIZE = 32
+PUBLIC_KEY_SIZE = 32
+SIGNATURE_SIZE = 64
 
 INFO_ENCRYPTION = b"paseto-encryption-key"
 INFO_AUTHENTICATION = b"paseto-auth-key-for-aead"
 
+# stream chunks keep XChaCha20 blocks (64 bytes) and base64 groups (3 bytes) aligned
+STREAM_CHUNK_ALIGNMENT = 192
+STREAM_CHUNK_SIZE = 1024 * STREAM_CHUNK_ALIGNMENT
+_XCHACHA20_BLOCK_SIZE = 64
+# first decoded chunk holds the nonce and leaves the ciphertext that follows block aligned
+_FIRST_DECODED_CHUNK_SIZE = 96
+
+# PAE pieces preceding the nonce of v4.local and the message of v4.public tokens
+_LOCAL_PAE_PREFIX = le64(5) + le64(len(HEADER_LOCAL)) + HEADER_LOCAL + le64(NONCE_SIZE)
+_PUBLIC_PAE_PREFIX = le64(4) + le64(len(HEADER_PUBLIC)) + HEADER_PUBLIC
+
+_KeyT = TypeVar("_KeyT", bound=Key)
+
+# primitives of the selected backend, bound once by _bind_backend()
+_sign: primitives.SignFunction
+_verify: primitives.VerifyFunction
+
 
 def encrypt(
-    message: bytes, key: bytes, footer: bytes = b"", implicit_assertion: bytes = b""
+    message: bytes,
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+    *,
+    nonce_source: NonceSource | None = None,
 ) -> bytes:
-    """PASETO Version4 encrypt function."""
+    """PASETO Version4 encrypt function.
+
+    Nonce is read from nonce_source, os.urandom() unless given.
+    """
 
     # verify that key is intended for use with this function
-    _verify_key(key, _TYPE_LOCAL)
-    raw_key: bytes = _deserialize_key(key)
+    parsed_key: SymmetricKey = _parse_key(key, SymmetricKey)
 
     # Step 1
     header: bytes = HEADER_LOCAL
 
     # Step 2
-    nonce: bytes = os.urandom(NONCE_SIZE)
+    nonce: bytes = (nonce_source or os.urandom)(NONCE_SIZE)
 
     # Step 3
     encryption_key: bytes
     authentication_key: bytes
     nonce2: bytes
-    encryption_key, authentication_key, nonce2 = _split_key(raw_key, nonce)
-
-    # Step 4
-    ciphertext: bytes = libsodium_wrapper.crypto_stream_xchacha20_xor(
-        message=message, nonce=nonce2, key=encryption_key
+    encryption_key, authentication_key, nonce2 = _split_key(parsed_key, nonce)
+
+    # Step 4, token payload n || c || t is assembled in place
+    payload = bytearray(NONCE_SIZE + len(message) + MAC_SIZE)
+    payload[:NONCE_SIZE] = nonce
+    ciphertext: memoryview = libsodium_wrapper.crypto_stream_xchacha20_xor(
+        message=message,
+        nonce=nonce2,
+        key=encryption_key,
+        out=memoryview(payload)[NONCE_SIZE:-MAC_SIZE],
     )
 
-    # Step 5
-    pre_auth: bytes = pae([header, nonce, ciphertext, footer, implicit_assertion])
-
-    # Step 6
-    message_authentication_code: bytes = hashlib.blake2b(
-        pre_auth, key=authentication_key, digest_size=32
-    ).digest()
+    # Steps 5 and 6
+    payload[-MAC_SIZE:] = _mac(
+        authentication_key, [header, nonce, ciphertext, footer, implicit_assertion]
+    )
 
     # Step 7
-    ret: bytes = header + b64(nonce + ciphertext + message_authentication_code)
+    ret: bytes = header + b64(payload)
     if footer:
         ret += b"." + b64(footer)
     return ret
 
 
 def decrypt(
-    message: bytes, key: bytes, footer: bytes = b"", implicit_assertion: bytes = b""
+    message: bytes,
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
 ) -> bytes:
     """PASETO Version4 decrypt function."""
 
     # verify that key is intended for use with this function
-    _verify_key(key, _TYPE_LOCAL)
-    raw_key: bytes = _deserialize_key(key)
+    parsed_key: SymmetricKey = _parse_key(key, SymmetricKey)
 
     # Step 1
-    check_footer(message, footer)
+    token = parse_token(message)
+    token.check_footer(b64(footer))
 
     # Step 2
     header: bytes = HEADER_LOCAL
-    check_header(message, header)
+    token.check_header(header)
+    token.check_structure(NONCE_SIZE + MAC_SIZE)
 
-    # Step 3
-    decoded: bytes = decode_message(message, len(header))
-    nonce: bytes = decoded[:NONCE_SIZE]
-    ciphertext: bytes = decoded[NONCE_SIZE:-MAC_SIZE]
+    # Step 3, writable so the ciphertext is decrypted in place
+    decoded = bytearray(token.decode_payload())
+    nonce: bytes = bytes(decoded[:NONCE_SIZE])
+    ciphertext = memoryview(decoded)[NONCE_SIZE:-MAC_SIZE]
 
     # Step 4
-    encryption_key, authentication_key, nonce2 = _split_key(raw_key, nonce)
-
-    # Step 5
-    pre_auth: bytes = pae([header, nonce, ciphertext, footer, implicit_assertion])
+    encryption_key, authentication_key, nonce2 = _split_key(parsed_key, nonce)
 
-    # Step 6
-    computed_mac: bytes = hashlib.blake2b(
-        pre_auth, key=authentication_key, digest_size=MAC_SIZE
-    ).digest()
+    # Steps 5 and 6
+    computed_mac: bytes = _mac(
+        authentication_key, [header, nonce, ciphertext, footer, implicit_assertion]
+    )
 
     # Step 7
-    mac_in_message: bytes = decoded[-MAC_SIZE:]
+    mac_in_message = decoded[-MAC_SIZE:]
     if not hmac.compare_digest(mac_in_message, computed_mac):
         raise InvalidMac("Invalid MAC for given ciphertext")
 
     # Steps 8 and 9
-    return libsodium_wrapper.crypto_stream_xchacha20_xor(
-        message=ciphertext, nonce=nonce2, key=encryption_key
+    libsodium_wrapper.crypto_stream_xchacha20_xor(
+        message=ciphertext, nonce=nonce2, key=encryption_key, out=ciphertext
     )
+    return bytes(ciphertext)
 
 
 def sign(
     message: bytes,
-    secret_key: bytes,
+    secret_key: bytes | SecretKey,
     footer: bytes = b"",
     implicit_assertion: bytes = b"",
 ) -> bytes:
     """Sign message and return token which can then be used with verify()."""
 
     # verify that key is intended for use with this function
-    _verify_key(secret_key, _TYPE_SECRET)
-    raw_secret_key: bytes = _deserialize_key(secret_key)
+    raw_secret_key: bytes = _parse_key(secret_key, SecretKey).raw
 
     # Step 1
     header = HEADER_PUBLIC
@@ -137,7 +180,7 @@ def sign(
     message2 = pae([header, message, footer, implicit_assertion])
 
     # Step 3
-    signature = primitives.sign(message2, raw_secret_key)
+    signature = _sign(message2, raw_secret_key)
 
     # Step 4
     ret = header + b64(message + signature)
@@ -149,25 +192,26 @@ def sign(
 
 def verify(
     signed_message: bytes,
-    public_key: bytes,
+    public_key: bytes | PublicKey,
     footer: bytes = b"",
     implicit_assertion: bytes = b"",
 ) -> bytes:
     """Verify signature and return message. Raises exception if signature is invalid."""
 
     # verify that key is intended for use with this function
-    _verify_key(public_key, _TYPE_PUBLIC)
-    raw_public_key: bytes = _deserialize_key(public_key)
+    raw_public_key: bytes = _parse_key(public_key, PublicKey).raw
 
     # Step 1
-    check_footer(signed_message, footer)
+    token = parse_token(signed_message)
+    token.check_footer(b64(footer))
 
     # Step 2
     header = HEADER_PUBLIC
-    check_header(signed_message, header)
+    token.check_header(header)
+    token.check_structure(SIGNATURE_SIZE)
 
     # Step 3
-    raw_inner_message: bytes = decode_message(signed_message, len(header))
+    raw_inner_message: bytes = token.decode_payload()
     signature = raw_inner_message[-64:]
     message = raw_inner_message[:-64]
 
@@ -175,28 +219,512 @@ def verify(
     message2 = pae([header, message, footer, implicit_assertion])
 
     # Steps 5 and 6
-    primitives.verify(signature, message2, raw_public_key)
+    _verify(signature, message2, raw_public_key)
     return message
 
 
-def _split_key(key: bytes, nonce: bytes) -> tuple[bytes, bytes, bytes]:
-    hashed: bytes = hashlib.blake2b(
-        INFO_ENCRYPTION + nonce, key=key, digest_size=56
-    ).digest()
+class LocalCodec:
+    """v4.local tokens of one key, footer and implicit assertion.
+
+    Everything that does not depend on the message is computed once. Instances are
+    not modified after creation and can be shared between threads.
+    """
+
+    __slots__ = (
+        "_encoded_footer",
+        "_key",
+        "_nonce_source",
+        "_pae_suffix",
+        "_token_suffix",
+    )
+
+    def __init__(
+        self,
+        key: bytes | SymmetricKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+        *,
+        nonce_source: NonceSource | None = None,
+    ) -> None:
+        self._key: SymmetricKey = _parse_key(key, SymmetricKey)
+        self._nonce_source = nonce_source
+        self._pae_suffix: bytes = _pae_suffix(footer, implicit_assertion)
+        self._encoded_footer: bytes = b64(footer)
+        self._token_suffix: bytes = b"." + self._encoded_footer if footer else b""
+
+    def encode(self, message: bytes) -> bytes:
+        """Return token of encrypted message, same as encrypt()."""
+        nonce: bytes = (self._nonce_source or os.urandom)(NONCE_SIZE)
+        encryption_key, authentication_key, nonce2 = _split_key(self._key, nonce)
+        payload = bytearray(NONCE_SIZE + len(message) + MAC_SIZE)
+        payload[:NONCE_SIZE] = nonce
+        ciphertext: memoryview = libsodium_wrapper.crypto_stream_xchacha20_xor(
+            message, nonce2, encryption_key, memoryview(payload)[NONCE_SIZE:-MAC_SIZE]
+        )
+        payload[-MAC_SIZE:] = _mac_affixed(
+            authentication_key,
+            _LOCAL_PAE_PREFIX + nonce + le64(len(ciphertext)),
+            ciphertext,
+            self._pae_suffix,
+        )
+        return HEADER_LOCAL + b64(payload) + self._token_suffix
+
+    def decode(self, message: bytes) -> bytes:
+        """Return plaintext of token, same as decrypt()."""
+        return self.decode_parsed(parse_token(message))
+
+    def decode_parsed(self, token: ParsedToken) -> bytes:
+        """Return plaintext of token already split by parse_token()."""
+        token.check_footer(self._encoded_footer)
+        token.check_header(HEADER_LOCAL)
+        token.check_structure(NONCE_SIZE + MAC_SIZE)
+        decoded = bytearray(token.decode_payload())
+        nonce: bytes = bytes(decoded[:NONCE_SIZE])
+        ciphertext = memoryview(decoded)[NONCE_SIZE:-MAC_SIZE]
+        encryption_key, authentication_key, nonce2 = _split_key(self._key, nonce)
+        computed_mac: bytes = _mac_affixed(
+            authentication_key,
+            _LOCAL_PAE_PREFIX + nonce + le64(len(ciphertext)),
+            ciphertext,
+            self._pae_suffix,
+        )
+        if not hmac.compare_digest(decoded[-MAC_SIZE:], computed_mac):
+            raise InvalidMac("Invalid MAC for given ciphertext")
+        libsodium_wrapper.crypto_stream_xchacha20_xor(
+            ciphertext, nonce2, encryption_key, ciphertext
+        )
+        return bytes(ciphertext)
+
+
+class PublicCodec:
+    """v4.public tokens of one key pair, footer and implicit assertion.
+
+    Created with a secret key it signs and verifies, created with a public key it
+    only verifies. Instances can be shared between threads.
+    """
+
+    __slots__ = (
+        "_encoded_footer",
+        "_pae_suffix",
+        "_public_key",
+        "_secret_key",
+        "_token_suffix",
+    )
+
+    def __init__(
+        self,
+        key: bytes | SecretKey | PublicKey,
+        footer: bytes = b"",
+        implicit_assertion: bytes = b"",
+    ) -> None:
+        self._secret_key: bytes | None
+        self._public_key: bytes
+        if isinstance(key, PublicKey) or (
+            not isinstance(key, Key) and _is_public_key(key)
+        ):
+            self._secret_key = None
+            self._public_key = _parse_key(key, PublicKey).raw
+        else:
+            self._secret_key = _parse_key(key, SecretKey).raw
+            # libsodium secret keys end with their public key
+            self._public_key = self._secret_key[-PUBLIC_KEY_SIZE:]
+        self._pae_suffix: bytes = _pae_suffix(footer, implicit_assertion)
+        self._encoded_footer: bytes = b64(footer)
+        self._token_suffix: bytes = b"." + self._encoded_footer if footer else b""
+
+    def encode(self, message: bytes) -> bytes:
+        """Return signed token of message, same as sign()."""
+        if self._secret_key is None:
+            raise InvalidKey
+        message2 = b"".join(
+            (_PUBLIC_PAE_PREFIX, le64(len(message)), message, self._pae_suffix)
+        )
+        signature: bytes = _sign(message2, self._secret_key)
+        return HEADER_PUBLIC + b64(message + signature) + self._token_suffix
+
+    def decode(self, signed_message: bytes) -> bytes:
+        """Return message of token with a valid signature, same as verify()."""
+        return self.decode_parsed(parse_token(signed_message))
+
+    def decode_parsed(self, token: ParsedToken) -> bytes:
+        """Return message of token already split by parse_token()."""
+        token.check_footer(self._encoded_footer)
+        token.check_header(HEADER_PUBLIC)
+        token.check_structure(SIGNATURE_SIZE)
+        raw_inner_message: bytes = token.decode_payload()
+        signature = raw_inner_message[-SIGNATURE_SIZE:]
+        message = raw_inner_message[:-SIGNATURE_SIZE]
+        message2 = b"".join(
+            (_PUBLIC_PAE_PREFIX, le64(len(message)), message, self._pae_suffix)
+        )
+        _verify(signature, message2, self._public_key)
+        return message
+
+
+def local_codec(
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+    *,
+    nonce_source: NonceSource | None = None,
+) -> LocalCodec:
+    """Return reusable encoder and decoder of v4.local tokens."""
+    return LocalCodec(key, footer, implicit_assertion, nonce_source=nonce_source)
+
+
+def public_codec(
+    key: bytes | SecretKey | PublicKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+) -> PublicCodec:
+    """Return reusable signer and verifier of v4.public tokens."""
+    return PublicCodec(key, footer, implicit_assertion)
+
+
+def encrypt_many(
+    messages: Iterable[bytes],
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+    *,
+    nonce_source: NonceSource | None = None,
+) -> list[bytes | Exception]:
+    """Encrypt each message with shared key, footer and implicit assertion.
+
+    Returns token or exception per message, key is checked once for the whole batch.
+    """
+    codec = LocalCodec(key, footer, implicit_assertion, nonce_source=nonce_source)
+    return map_batch(codec.encode, messages)
+
+
+def decrypt_many(
+    messages: Iterable[bytes],
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+) -> list[bytes | Exception]:
+    """Decrypt each token with shared key, footer and implicit assertion.
+
+    Returns plaintext or exception per token, key is checked once for the whole batch.
+    """
+    return map_batch(LocalCodec(key, footer, implicit_assertion).decode, messages)
+
+
+def sign_many(
+    messages: Iterable[bytes],
+    secret_key: bytes | SecretKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+) -> list[bytes | Exception]:
+    """Sign each message with shared key, footer and implicit assertion.
+
+    Returns token or exception per message, key is checked once for the whole batch.
+    """
+    codec = PublicCodec(_parse_key(secret_key, SecretKey), footer, implicit_assertion)
+    return map_batch(codec.encode, messages)
+
+
+def verify_many(
+    signed_messages: Iterable[bytes],
+    public_key: bytes | PublicKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+) -> list[bytes | Exception]:
+    """Verify each token with shared key, footer and implicit assertion.
+
+    Returns message or exception per token, key is checked once for the whole batch.
+    """
+    codec = PublicCodec(_parse_key(public_key, PublicKey), footer, implicit_assertion)
+    return map_batch(codec.decode, signed_messages)
+
+
+def encrypt_stream(
+    source: BinaryIO | mmap.mmap,
+    destination: BinaryIO,
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+    *,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    nonce_source: NonceSource | None = None,
+) -> None:
+    """PASETO Version4 encrypt function for messages too large to hold in memory.
+
+    Reads the message from the current position to the end of source, a binary file
+    or mmap, and writes the token to destination one chunk at a time. Produces the
+    same token as encrypt(). chunk_size must be a multiple of STREAM_CHUNK_ALIGNMENT.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+
+    # verify that key is intended for use with this function
+    parsed_key: SymmetricKey = _parse_key(key, SymmetricKey)
+    _check_chunk_size(chunk_size)
+    message_length: int = _remaining_size(source)
+
+    # Step 1
+    header: bytes = HEADER_LOCAL
+
+    # Step 2
+    nonce: bytes = (nonce_source or os.urandom)(NONCE_SIZE)
+
+    # Step 3
+    encryption_key, authentication_key, nonce2 = _split_key(parsed_key, nonce)
+
+    # Steps 4, 5 and 6, lengths of all PAE pieces are known before the ciphertext
+    mac_state = hashlib.blake2b(key=authentication_key, digest_size=MAC_SIZE)
+    mac_state.update(_pae_prefix(header, nonce, message_length))
+
+    def payload() -> Iterator[bytes | memoryview]:
+        yield nonce
+        # every chunk is encoded before the next one overwrites its ciphertext
+        buffer = bytearray(chunk_size)
+        position: int = 0
+        while chunk := _read(source, chunk_size):
+            ciphertext = libsodium_wrapper.crypto_stream_xchacha20_xor_ic(
+                chunk,
+                nonce2,
+                position // _XCHACHA20_BLOCK_SIZE,
+                encryption_key,
+                memoryview(buffer)[: len(chunk)],
+            )
+            mac_state.update(ciphertext)
+            position += len(chunk)
+            yield ciphertext
+        if position != message_length:
+            raise ValueError("Message size changed during encryption")
+        mac_state.update(_pae_suffix(footer, implicit_assertion))
+        yield mac_state.digest()
+
+    # Step 7
+    destination.write(header)
+    destination.writelines(b64_chunks(payload()))
+    if footer:
+        destination.write(b"." + b64(footer))
+
+
+def decrypt_stream(
+    source: BinaryIO | mmap.mmap,
+    destination: BinaryIO,
+    key: bytes | SymmetricKey,
+    footer: bytes = b"",
+    implicit_assertion: bytes = b"",
+    *,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> None:
+    """PASETO Version4 decrypt function for tokens too large to hold in memory.
+
+    Reads the token from the current position to the end of source, a binary file
+    or mmap, in two passes. The first pass checks the MAC, only then the second pass
+    writes plaintext to destination. Source must not change between the two passes.
+    chunk_size must be a multiple of STREAM_CHUNK_ALIGNMENT.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+
+    # verify that key is intended for use with this function
+    parsed_key: SymmetricKey = _parse_key(key, SymmetricKey)
+    _check_chunk_size(chunk_size)
+    start: int = source.tell()
+    end: int = start + _remaining_size(source)
+    header: bytes = HEADER_LOCAL
+    payload_start: int = start + len(header)
+
+    # Step 1
+    payload_end: int = _find_payload_end(source, payload_start, end, footer, chunk_size)
+
+    # Step 2
+    source.seek(start)
+    if _read(source, len(header)) != header:
+        raise InvalidHeader("Invalid message header")
+
+    # Step 3
+    payload_length: int = max(payload_end - payload_start, 0)
+    padding: int = padding_size(payload_length)
+    decoded_length: int = (payload_length + padding) // 4 * 3 - padding
+    if decoded_length < NONCE_SIZE + MAC_SIZE:
+        raise InvalidMac("Invalid MAC for given ciphertext")
+    ciphertext_end: int = decoded_length - MAC_SIZE
+
+    def decoded_chunks() -> Iterator[tuple[int, bytes]]:
+        return _decoded_chunks(source, payload_start, payload_length, chunk_size)
+
+    # first chunk always holds the whole nonce, payload is at least NONCE_SIZE + MAC_SIZE
+    chunks = decoded_chunks()
+    first_chunk: bytes = next(chunks)[1]
+    nonce: bytes = first_chunk[:NONCE_SIZE]
+
+    # Step 4
+    encryption_key, authentication_key, nonce2 = _split_key(parsed_key, nonce)
+
+    # Steps 5 and 6
+    mac_state = hashlib.blake2b(key=authentication_key, digest_size=MAC_SIZE)
+    mac_state.update(_pae_prefix(header, nonce, ciphertext_end - NONCE_SIZE))
+    mac_in_message: bytes = b""
+    for offset, chunk in itertools.chain([(0, first_chunk)], chunks):
+        mac_state.update(_ciphertext_slice(memoryview(chunk), offset, ciphertext_end))
+        mac_in_message += chunk[max(ciphertext_end - offset, 0) :]
+    mac_state.update(_pae_suffix(footer, implicit_assertion))
+
+    # Step 7
+    if not hmac.compare_digest(mac_in_message, mac_state.digest()):
+        raise InvalidMac("Invalid MAC for given ciphertext")
+
+    # Steps 8 and 9, decoded chunks and so their plaintext fit into chunk_size
+    buffer = bytearray(chunk_size)
+    for offset, chunk in decoded_chunks():
+        ciphertext = _ciphertext_slice(memoryview(chunk), offset, ciphertext_end)
+        if ciphertext:
+            destination.write(
+                libsodium_wrapper.crypto_stream_xchacha20_xor_ic(
+                    ciphertext,
+                    nonce2,
+                    (max(offset, NONCE_SIZE) - NONCE_SIZE) // _XCHACHA20_BLOCK_SIZE,
+                    encryption_key,
+                    memoryview(buffer)[: len(ciphertext)],
+                )
+            )
+
+
+def _split_key(key: SymmetricKey, nonce: bytes) -> tuple[bytes, bytes, bytes]:
+    # start from copies of the keyed states cached on the key object
+    encryption_state = key.encryption_state.copy()
+    encryption_state.update(INFO_ENCRYPTION + nonce)
+    hashed: bytes = encryption_state.digest()
     encryption_key: bytes = hashed[:ENCRYPTION_KEY_LENGTH]
     nonce2: bytes = hashed[ENCRYPTION_KEY_LENGTH:]
-    authentication_key: bytes = hashlib.blake2b(
-        INFO_AUTHENTICATION + nonce, key=key, digest_size=AUTHENTICATION_KEY_LENGTH
-    ).digest()
+    authentication_state = key.authentication_state.copy()
+    authentication_state.update(INFO_AUTHENTICATION + nonce)
+    authentication_key: bytes = authentication_state.digest()
 
     return encryption_key, authentication_key, nonce2
 
 
+def _mac(authentication_key: bytes, pieces: list[BytesLike]) -> bytes:
+    """Return keyed BLAKE2b of PAE encoded pieces, streamed straight into the hash."""
+    mac_state = hashlib.blake2b(key=authentication_key, digest_size=MAC_SIZE)
+    pae_update(mac_state, pieces)
+    return mac_state.digest()
+
+
+def _mac_affixed(
+    authentication_key: bytes, prefix: bytes, ciphertext: BytesLike, suffix: bytes
+) -> bytes:
+    """Return keyed BLAKE2b of PAE already split around the ciphertext."""
+    mac_state = hashlib.blake2b(prefix, key=authentication_key, digest_size=MAC_SIZE)
+    mac_state.update(ciphertext)
+    mac_state.update(suffix)
+    return mac_state.digest()
+
+
+def _pae_prefix(header: bytes, nonce: bytes, ciphertext_length: int) -> bytes:
+    """Return PAE of [header, nonce, ciphertext, footer, implicit_assertion] up to
+    the ciphertext itself."""
+    return b"".join(
+        (le64(5), le64(len(header)), header, le64(len(nonce)), nonce),
+    ) + le64(ciphertext_length)
+
+
+def _pae_suffix(footer: bytes, implicit_assertion: bytes) -> bytes:
+    """Return remainder of the PAE that follows the ciphertext."""
+    return b"".join(
+        (le64(len(footer)), footer, le64(len(implicit_assertion)), implicit_assertion)
+    )
+
+
+def _ciphertext_slice(
+    chunk: memoryview, offset: int, ciphertext_end: int
+) -> memoryview:
+    """Return part of decoded chunk found at offset that belongs to the ciphertext."""
+    return chunk[max(NONCE_SIZE - offset, 0) : max(ciphertext_end - offset, 0)]
+
+
+def _decoded_chunks(
+    source: BinaryIO | mmap.mmap, start: int, length: int, chunk_size: int
+) -> Iterator[tuple[int, bytes]]:
+    """Yield offset and content of base64 decoded payload, one chunk at a time."""
+    source.seek(start)
+    offset: int = 0
+    # read whole 4 character groups, which decode to 3 bytes each
+    read_size: int = _FIRST_DECODED_CHUNK_SIZE // 3 * 4
+    remaining: int = length
+    while remaining > 0:
+        encoded: bytes = _read(source, min(read_size, remaining))
+        remaining -= read_size
+        decoded: bytes = b64decode(encoded)
+        yield offset, decoded
+        offset += len(decoded)
+        read_size = chunk_size // 3 * 4
+
+
+def _find_payload_end(
+    source: BinaryIO | mmap.mmap,
+    payload_start: int,
+    end: int,
+    footer: bytes,
+    chunk_size: int,
+) -> int:
+    """Check footer at the end of source and return position where payload ends."""
+    if footer:
+        suffix: bytes = b"." + b64(footer)
+        position: int = end - len(suffix)
+        source.seek(max(position, payload_start))
+        if position < payload_start or not hmac.compare_digest(
+            suffix, _read(source, len(suffix))
+        ):
+            raise InvalidFooter("Invalid message footer")
+        return position
+
+    # footer is not verified, but it is still not a part of the payload
+    position = max(payload_start, end - chunk_size)
+    source.seek(position)
+    separator: int = _read(source, end - position).rfind(b".")
+    return end if separator == -1 else position + separator
+
+
+def _read(source: BinaryIO | mmap.mmap, size: int) -> bytes:
+    """Read size bytes, unless end of source is reached first."""
+    data: bytes = source.read(size)
+    while 0 < len(data) < size:
+        more: bytes = source.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _remaining_size(source: BinaryIO | mmap.mmap) -> int:
+    """Return number of bytes between current position and the end of source."""
+    position: int = source.tell()
+    source.seek(0, os.SEEK_END)
+    size: int = source.tell() - position
+    source.seek(position)
+    return size
+
+
+def _check_chunk_size(chunk_size: int) -> None:
+    if chunk_size <= 0 or chunk_size % STREAM_CHUNK_ALIGNMENT:
+        raise ValueError(
+            f"chunk_size must be a positive multiple of {STREAM_CHUNK_ALIGNMENT}"
+        )
+
+
 def _verify_key(key: bytes, key_type: bytes) -> None:
     if not _generic_verify_key(key, 4, key_type):
         raise InvalidKey
 
 
+def _is_public_key(key: bytes) -> bool:
+    return _generic_verify_key(key, 4, PublicKey.key_type)
+
+
+def _parse_key(key: bytes | _KeyT, key_class: type[_KeyT]) -> _KeyT:
+    """Return key object, parsing serialized keys on the fly."""
+    if isinstance(key, key_class) and key.version == 4:
+        return key
+    if isinstance(key, Key):
+        raise InvalidKey
+    return key_class(key)
+
+
 def create_symmetric_key() -> bytes:
     """Return key for use with encrypt() and decrypt()."""
     return _create_symmetric_key(4)
@@ -205,3 +733,13 @@ def create_symmetric_key() -> bytes:
 def create_asymmetric_key() -> tuple[bytes, bytes]:
     """Return key pair for use with sign() and verify()."""
     return _create_asymmetric_key(4)
+
+
+def _bind_backend(backend: primitives.Backend) -> None:
+    # pylint: disable=global-statement
+    global _sign, _verify
+    _sign, _verify = backend.sign, backend.verify
+
+
+# v4.local uses XChaCha20 and keyed BLAKE2b states directly, only signatures are pluggable
+primitives.subscribe(_bind_backend, lambda _: None)
@@ -0,0 +1,14 @@
+"""Benchmark suite, run with `make benchmark-json` and compare with `make benchmark-compare`."""
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+FOOTER = b'{"kid":"k4.lid.iVtYQDjr5gEijCSjJC3fQaJm7nCeQSeaty0Jixy8dbsk"}'
+IMPLICIT_ASSERTION = b'{"user_id":"2a6f8f6a-8d02-4d5b-9e8c-1b0c7a9d3e41"}'
+# realistic token contents, a claims set signed for an API and a larger encrypted session
+CLAIMS = b'{"sub":"user","scope":"' + b"read:items " * 40 + b'"}'
+SESSION = b'{"session":"' + b"x" * 4000 + b'"}'
+
+
+def set_group(benchmark: BenchmarkFixture, operation: str, payload: bytes) -> None:
+    """Group results of the same operation and payload size together."""
+    benchmark.group = f"{operation} {len(payload)}B"
@@ -0,0 +1,108 @@
+"""Compare benchmark results against the checked in baseline and report regressions.
+
+Results are pytest-benchmark JSON files, written with --benchmark-json.
+Baselines keep one statistic per benchmark and are written with --update.
+
+    python -m tests.benchmarks.compare BASELINE RESULTS [--threshold 0.25]
+    python -m tests.benchmarks.compare --update BASELINE RESULTS
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+DEFAULT_METRIC = "median"
+DEFAULT_THRESHOLD = 0.25
+
+
+class Change(NamedTuple):
+    """Change of one benchmark statistic relative to baseline."""
+
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """Return current time relative to baseline time."""
+        return self.current / self.baseline
+
+
+def load_results(path: Path, metric: str) -> dict[str, float]:
+    """Return statistic of every benchmark in a pytest-benchmark JSON file or baseline."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if "results" in data:
+        if data["metric"] != metric:
+            raise ValueError(f"{path} records {data['metric']}, not {metric}")
+        return dict(data["results"])
+    return {
+        benchmark["fullname"]: benchmark["stats"][metric]
+        for benchmark in data["benchmarks"]
+    }
+
+
+def save_baseline(path: Path, results: dict[str, float], metric: str) -> None:
+    """Write baseline, sorted so that updates produce readable diffs."""
+    data = {"metric": metric, "results": dict(sorted(results.items()))}
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(
+    baseline: dict[str, float], current: dict[str, float], threshold: float
+) -> list[Change]:
+    """Return benchmarks slower than baseline by more than threshold, worst first."""
+    regressions = [
+        Change(name, baseline[name], current[name])
+        for name in baseline.keys() & current.keys()
+        if current[name] > baseline[name] * (1 + threshold)
+    ]
+    return sorted(regressions, key=lambda change: change.ratio, reverse=True)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run command line interface, return exit code 1 when there are regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("results", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed slowdown as a fraction of baseline time, default %(default)s",
+    )
+    parser.add_argument("--metric", default=DEFAULT_METRIC)
+    parser.add_argument(
+        "--update", action="store_true", help="replace baseline with results"
+    )
+    args = parser.parse_args(argv)
+
+    current = load_results(args.results, args.metric)
+    if args.update:
+        save_baseline(args.baseline, current, args.metric)
+        print(f"Saved {len(current)} results to {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline, args.metric)
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"missing: {name}")
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f"new: {name}")
+    regressions = compare(baseline, current, args.threshold)
+    for change in regressions:
+        print(
+            f"regression: {change.name} {args.metric} "
+            f"{change.baseline * 1e6:.2f}us -> {change.current * 1e6:.2f}us "
+            f"({change.ratio - 1:+.0%})"
+        )
+    print(
+        f"{len(regressions)} of {len(baseline.keys() & current.keys())} benchmarks "
+        f"slower than baseline by more than {args.threshold:.0%}"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""This module contains fixtures for the benchmark suite."""
+
+import pytest
+
+from paseto.crypto import primitives
+from tests.benchmarks import FOOTER, IMPLICIT_ASSERTION
+
+# payload sizes from 16 B to 1 MiB in steps of 16x
+SIZES = [16, 256, 4096, 65536, 1048576]
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}B")
+def payload(request: pytest.FixtureRequest) -> bytes:
+    """Return JSON like payload of every benchmarked size."""
+    size: int = request.param
+    return (b'{"data":"0123456789abcdef"}' * (size // 27 + 1))[:size]
+
+
+@pytest.fixture(params=[b"", FOOTER], ids=["no-footer", "footer"])
+def footer(request: pytest.FixtureRequest) -> bytes:
+    """Return footer, empty or not."""
+    return request.param
+
+
+@pytest.fixture(
+    params=[(b"", b""), (FOOTER, b""), (FOOTER, IMPLICIT_ASSERTION)],
+    ids=["no-footer", "footer", "footer-assertion"],
+)
+def footer_and_assertion(request: pytest.FixtureRequest) -> tuple[bytes, bytes]:
+    """Return footer and implicit assertion of a Version4 token."""
+    return request.param
+
+
+@pytest.fixture(params=primitives.available_backends())
+def backend(request: pytest.FixtureRequest) -> primitives.Backend:
+    """Select every available crypto backend, restoring the previous one afterwards."""
+    request.getfixturevalue("restore_backends")
+    return primitives.use_backend(request.param)
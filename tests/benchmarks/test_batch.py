@@ -0,0 +1,194 @@
+"""This module contains benchmarks of batch functions, token executors and the asyncio client."""
+
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.aio import AsyncTokenClient
+from paseto.executor import ProcessTokenExecutor, TokenExecutor
+from paseto.protocol import version2, version4
+from tests.benchmarks import CLAIMS, FOOTER, SESSION
+
+KEY = b"0" * 32
+MESSAGE = b"foo"
+
+BATCH_SIZES = [1, 10, 100, 10000]
+
+
+def loop(
+    function: Callable[[bytes, bytes, bytes], bytes],
+    items: list[bytes],
+    key: bytes,
+    footer: bytes,
+) -> list[bytes]:
+    """Call single token function in a loop, as done before batch functions."""
+    return [function(item, key, footer) for item in items]
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v4_decrypt_loop(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v4.local decryption of a batch one token at a time."""
+    benchmark.group = f"v4_decrypt_many {size}"
+    key = version4.create_symmetric_key()
+    tokens = [version4.encrypt(MESSAGE, key, FOOTER)] * size
+    assert benchmark(loop, version4.decrypt, tokens, key, FOOTER) == [MESSAGE] * size
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v4_decrypt_many(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v4.local decryption of a batch with setup done once."""
+    benchmark.group = f"v4_decrypt_many {size}"
+    key = version4.create_symmetric_key()
+    tokens = [version4.encrypt(MESSAGE, key, FOOTER)] * size
+    results = benchmark(version4.decrypt_many, tokens, key, FOOTER)
+    assert results == [MESSAGE] * size
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v4_verify_loop(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v4.public verification of a batch one token at a time."""
+    benchmark.group = f"v4_verify_many {size}"
+    public_key, secret_key = version4.create_asymmetric_key()
+    tokens = [version4.sign(MESSAGE, secret_key, FOOTER)] * size
+    results = benchmark(loop, version4.verify, tokens, public_key, FOOTER)
+    assert results == [MESSAGE] * size
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v4_verify_many(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v4.public verification of a batch with setup done once."""
+    benchmark.group = f"v4_verify_many {size}"
+    public_key, secret_key = version4.create_asymmetric_key()
+    tokens = [version4.sign(MESSAGE, secret_key, FOOTER)] * size
+    results = benchmark(version4.verify_many, tokens, public_key, FOOTER)
+    assert results == [MESSAGE] * size
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v2_decrypt_loop(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v2.local decryption of a batch one token at a time."""
+    benchmark.group = f"v2_decrypt_many {size}"
+    tokens = [version2.encrypt(MESSAGE, KEY, FOOTER)] * size
+    assert benchmark(loop, version2.decrypt, tokens, KEY, FOOTER) == [MESSAGE] * size
+
+
+@pytest.mark.parametrize("size", BATCH_SIZES)
+def test_v2_decrypt_many(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark v2.local decryption of a batch with setup done once."""
+    benchmark.group = f"v2_decrypt_many {size}"
+    tokens = [version2.encrypt(MESSAGE, KEY, FOOTER)] * size
+    results = benchmark(version2.decrypt_many, tokens, KEY, FOOTER)
+    assert results == [MESSAGE] * size
+
+
+WORKERS = sorted({1, 2, 4, os.cpu_count() or 1})
+EXECUTOR_TOKENS = 2000
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+@pytest.mark.benchmark(group="executor_verify")
+def test_executor_verify(benchmark: BenchmarkFixture, workers: int) -> None:
+    """Benchmark v4.public verification scaling with worker threads."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    tokens = [version4.sign(CLAIMS, secret_key, FOOTER)] * EXECUTOR_TOKENS
+
+    with TokenExecutor(max_workers=workers) as executor:
+        results = benchmark(lambda: list(executor.verify(tokens, public_key, FOOTER)))
+    assert results == [CLAIMS] * EXECUTOR_TOKENS
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+@pytest.mark.benchmark(group="executor_decrypt")
+def test_executor_decrypt(benchmark: BenchmarkFixture, workers: int) -> None:
+    """Benchmark v4.local decryption scaling with worker threads."""
+    key = version4.create_symmetric_key()
+    tokens = [version4.encrypt(SESSION, key, FOOTER)] * EXECUTOR_TOKENS
+
+    with TokenExecutor(max_workers=workers) as executor:
+        results = benchmark(lambda: list(executor.decrypt(tokens, key, FOOTER)))
+    assert results == [SESSION] * EXECUTOR_TOKENS
+
+
+@pytest.mark.benchmark(group="process_sign")
+def test_sign_many_single_process(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.public signing in this process, baseline for worker processes."""
+    _, secret_key = version4.create_asymmetric_key()
+    messages = [CLAIMS] * EXECUTOR_TOKENS
+    results = benchmark(version4.sign_many, messages, secret_key, FOOTER)
+    assert len(results) == EXECUTOR_TOKENS
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+@pytest.mark.benchmark(group="process_sign")
+def test_process_executor_sign(benchmark: BenchmarkFixture, workers: int) -> None:
+    """Benchmark v4.public signing scaling with worker processes."""
+    _, secret_key = version4.create_asymmetric_key()
+    messages = [CLAIMS] * EXECUTOR_TOKENS
+
+    with ProcessTokenExecutor(
+        "sign", secret_key, FOOTER, max_workers=workers, chunk_size=256
+    ) as executor:
+        results = benchmark(lambda: list(executor.map(messages)))
+    assert all(isinstance(result, bytes) for result in results)
+
+
+LAG_REQUESTS = 500
+LAG_TICK = 0.001
+
+
+def measure_loop_lag(
+    benchmark: BenchmarkFixture, request: Callable[[], Awaitable[bytes]]
+) -> None:
+    """Benchmark a burst of requests while a ticker records how late the loop wakes it.
+
+    p99 of the lag is reported in extra_info of the benchmark.
+    """
+    lags: list[float] = []
+
+    async def burst() -> None:
+        event_loop = asyncio.get_running_loop()
+        done = False
+
+        async def ticker() -> None:
+            while not done:
+                start = event_loop.time()
+                await asyncio.sleep(LAG_TICK)
+                lags.append(event_loop.time() - start - LAG_TICK)
+
+        ticks = asyncio.ensure_future(ticker())
+        await asyncio.gather(*(request() for _ in range(LAG_REQUESTS)))
+        done = True
+        await ticks
+
+    benchmark(lambda: asyncio.run(burst()))
+    lags.sort()
+    benchmark.extra_info["loop_lag_p99_ms"] = 1000 * lags[int(0.99 * (len(lags) - 1))]
+
+
+@pytest.mark.benchmark(group="loop_lag")
+def test_loop_lag_inline(benchmark: BenchmarkFixture) -> None:
+    """Benchmark event loop lag with v4.public verification on the loop."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    token = version4.sign(CLAIMS, secret_key, FOOTER)
+
+    async def request() -> bytes:
+        await asyncio.sleep(0)
+        return version4.verify(token, public_key, FOOTER)
+
+    measure_loop_lag(benchmark, request)
+
+
+@pytest.mark.benchmark(group="loop_lag")
+def test_loop_lag_offloaded(benchmark: BenchmarkFixture) -> None:
+    """Benchmark event loop lag with v4.public verification offloaded in batches."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    token = version4.sign(CLAIMS, secret_key, FOOTER)
+    client = AsyncTokenClient(max_batch_size=32)
+
+    async def request() -> bytes:
+        return await client.verify(token, public_key, FOOTER)
+
+    measure_loop_lag(benchmark, request)
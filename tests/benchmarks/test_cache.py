@@ -0,0 +1,94 @@
+"""This module contains benchmarks of the token caches and of rejecting invalid tokens."""
+
+from collections.abc import Callable
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.cache import NegativeCache, TokenCache
+from paseto.exceptions import PasetoException
+from paseto.paserk.keys import PublicKey
+from paseto.protocol import version4
+from tests.benchmarks import CLAIMS, FOOTER
+
+
+@pytest.mark.benchmark(group="token_cache")
+def test_verify_uncached(benchmark: BenchmarkFixture) -> None:
+    """Benchmark verifying the same token again and again."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    key = PublicKey(public_key)
+    token = version4.sign(CLAIMS, secret_key, FOOTER)
+    assert benchmark(version4.verify, token, key, FOOTER) == CLAIMS
+
+
+@pytest.mark.benchmark(group="token_cache")
+def test_verify_cached(benchmark: BenchmarkFixture) -> None:
+    """Benchmark verifying the same token with its payload cached."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    key = PublicKey(public_key)
+    token = version4.sign(CLAIMS, secret_key, FOOTER)
+    cache = TokenCache()
+
+    def verify(token: bytes) -> bytes:
+        return version4.verify(token, key, FOOTER)
+
+    assert benchmark(cache.decode, token, "kid", verify, FOOTER) == CLAIMS
+    assert cache.misses == 1
+
+
+def forged_token() -> tuple[bytes, PublicKey]:
+    """Return v4.public token with an invalid signature and the key to verify it."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    token = bytearray(version4.sign(CLAIMS, secret_key, FOOTER))
+    token[20] = ord("B") if token[20] == ord("A") else ord("A")
+    return bytes(token), PublicKey(public_key)
+
+
+def replay(decode: Callable[[bytes], bytes], token: bytes) -> None:
+    """Decode token expecting it to be rejected."""
+    try:
+        decode(token)
+    except (PasetoException, ValueError):
+        return
+    raise AssertionError("forged token accepted")
+
+
+@pytest.mark.benchmark(group="negative_cache")
+def test_replay_uncached(benchmark: BenchmarkFixture) -> None:
+    """Benchmark rejecting a replayed forged token by verifying it."""
+    token, key = forged_token()
+    benchmark(replay, lambda token: version4.verify(token, key, FOOTER), token)
+
+
+@pytest.mark.parametrize("approximate", [False, True], ids=["exact", "bloom"])
+@pytest.mark.benchmark(group="negative_cache")
+def test_replay_cached(benchmark: BenchmarkFixture, approximate: bool) -> None:
+    """Benchmark rejecting a replayed forged token found in a negative cache."""
+    token, key = forged_token()
+    cache = NegativeCache(approximate=approximate)
+
+    def decode(token: bytes) -> bytes:
+        return cache.decode(token, lambda token: version4.verify(token, key, FOOTER))
+
+    benchmark(replay, decode, token)
+    assert cache.additions == 1
+
+
+ADVERSARIAL_TOKENS = {
+    "short": b"v4.public." + b"A" * 40,
+    "malformed": b"v4.public." + b"!" * 200,
+    "dot_flood": b"v4.public." + b"." * 1_000_000,
+    "oversized": b"v4.public." + b"A" * (33 * 1024 * 1024),
+}
+
+
+@pytest.mark.parametrize("name", list(ADVERSARIAL_TOKENS))
+@pytest.mark.benchmark(group="reject")
+def test_reject(benchmark: BenchmarkFixture, name: str) -> None:
+    """Benchmark rejecting a malformed, oversized or dot flooded token."""
+    public_key = PublicKey(version4.create_asymmetric_key()[0])
+    benchmark(
+        replay,
+        lambda token: version4.verify(token, public_key),
+        ADVERSARIAL_TOKENS[name],
+    )
@@ -0,0 +1,229 @@
+"""This module contains benchmarks of claims validation, claim times and claims encoding."""
+
+import itertools
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto import payload
+from paseto.claims import (
+    TIME_MEMO_SIZE,
+    ClaimsTemplate,
+    ClaimsValidator,
+    CoarseClock,
+    LazyClaims,
+    encode_claims,
+    format_time,
+    parse_time,
+)
+from paseto.exceptions import InvalidClaims
+from paseto.payload import ClaimsCodec, PayloadCodec
+from paseto.protocol import version4
+
+CLAIMS_RULES: dict[str, Any] = {
+    "issuer": "issuer",
+    "audience": ["a", "b"],
+    "required": ["jti"],
+    "leeway": 30,
+    "max_age": 3600,
+}
+NOW = datetime.now(timezone.utc)
+CLAIMS_SET = {
+    "iss": "issuer",
+    "sub": "subject",
+    "aud": "b",
+    "exp": (NOW + timedelta(hours=1)).isoformat(),
+    "nbf": NOW.isoformat(),
+    "iat": NOW.isoformat(),
+    "jti": "id",
+    "scope": "read write",
+}
+
+
+def naive_validate(claims: dict[str, Any], rules: dict[str, Any]) -> None:
+    """Validate claims by walking rules and claims as dictionaries on every call."""
+    now = datetime.now(timezone.utc)
+    leeway = timedelta(seconds=rules.get("leeway", 0))
+    required = list(rules.get("required", []))
+    for rule, claim in (("issuer", "iss"), ("audience", "aud"), ("max_age", "iat")):
+        if rule in rules:
+            required.append(claim)
+    for claim in required:
+        if claim not in claims:
+            raise InvalidClaims(f"Missing claim {claim}")
+    for claim, value in claims.items():
+        if claim == "iss" and "issuer" in rules and value != rules["issuer"]:
+            raise InvalidClaims("Invalid iss claim")
+        if claim == "aud" and "audience" in rules and value not in rules["audience"]:
+            raise InvalidClaims("Invalid aud claim")
+        if claim in ("exp", "nbf", "iat"):
+            claim_time = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if claim == "exp" and claim_time <= now - leeway:
+                raise InvalidClaims("Token has expired")
+            if claim == "nbf" and claim_time > now + leeway:
+                raise InvalidClaims("Token is not valid yet")
+            if (
+                claim == "iat"
+                and "max_age" in rules
+                and claim_time + timedelta(seconds=rules["max_age"]) < now - leeway
+            ):
+                raise InvalidClaims("Token is too old")
+
+
+@pytest.mark.benchmark(group="claims")
+def test_claims_naive(benchmark: BenchmarkFixture) -> None:
+    """Benchmark validating claims by walking the rules as dictionaries."""
+    benchmark(naive_validate, CLAIMS_SET, CLAIMS_RULES)
+
+
+@pytest.mark.benchmark(group="claims")
+def test_claims_validator(benchmark: BenchmarkFixture) -> None:
+    """Benchmark validating claims with rules compiled once."""
+    validator = ClaimsValidator(**CLAIMS_RULES)
+    benchmark(validator.validate, CLAIMS_SET)
+
+
+EXPIRATION = CLAIMS_SET["exp"]
+# more distinct times than are memoized, so that every parse misses
+EXPIRATIONS = [
+    (NOW + timedelta(seconds=second)).isoformat()
+    for second in range(2 * TIME_MEMO_SIZE)
+]
+
+
+@pytest.mark.benchmark(group="claim_time")
+def test_claim_time_datetime(benchmark: BenchmarkFixture) -> None:
+    """Benchmark checking expiration with datetime parsing and current time."""
+    benchmark(
+        lambda: (
+            datetime.fromisoformat(EXPIRATION.replace("Z", "+00:00"))
+            > datetime.now(timezone.utc)
+        )
+    )
+
+
+@pytest.mark.benchmark(group="claim_time")
+def test_claim_time_parsed(benchmark: BenchmarkFixture) -> None:
+    """Benchmark checking expiration of times that are not memoized."""
+    times = itertools.cycle(EXPIRATIONS)
+    benchmark(lambda: parse_time(next(times)) > time.time())
+
+
+@pytest.mark.benchmark(group="claim_time")
+def test_claim_time_memoized(benchmark: BenchmarkFixture) -> None:
+    """Benchmark checking expiration of a memoized time with a coarse clock."""
+    clock = CoarseClock()
+    benchmark(lambda: parse_time(EXPIRATION) > clock())
+
+
+SERVICE_CLAIMS = {
+    "iss": "https://auth.example.com",
+    "sub": "service:billing",
+    "aud": "https://api.example.com",
+    "scope": "read:invoices write:invoices read:customers",
+    "exp": None,
+    "iat": None,
+    "jti": None,
+    "tenant": "tenant-42",
+    "roles": ["billing", "reporting"],
+}
+TEMPLATE = ClaimsTemplate(SERVICE_CLAIMS, ["exp", "iat", "jti"])
+
+
+def dynamic_claims() -> dict[str, Any]:
+    """Return claims that differ between tokens of a service."""
+    now = int(time.time())
+    return {"exp": format_time(now + 300), "iat": format_time(now), "jti": "Z" * 22}
+
+
+@pytest.mark.benchmark(group="claims_encode")
+def test_claims_encode_dict(benchmark: BenchmarkFixture) -> None:
+    """Benchmark encoding claims by updating a dictionary and serializing all of it."""
+    values = dynamic_claims()
+    benchmark(
+        lambda: json.dumps({**SERVICE_CLAIMS, **values}, separators=(",", ":")).encode()
+    )
+
+
+@pytest.mark.benchmark(group="claims_encode")
+def test_claims_encode_template(benchmark: BenchmarkFixture) -> None:
+    """Benchmark encoding claims by splicing dynamic values into a template."""
+    benchmark(TEMPLATE.encode, dynamic_claims())
+
+
+@pytest.mark.benchmark(group="mint")
+def test_mint_dict(benchmark: BenchmarkFixture) -> None:
+    """Benchmark minting v4.local tokens of claims serialized with json.dumps()."""
+    codec = version4.local_codec(version4.create_symmetric_key())
+    values = dynamic_claims()
+    benchmark(
+        lambda: codec.encode(
+            json.dumps({**SERVICE_CLAIMS, **values}, separators=(",", ":")).encode()
+        )
+    )
+
+
+@pytest.mark.benchmark(group="mint")
+def test_mint_template(benchmark: BenchmarkFixture) -> None:
+    """Benchmark minting v4.local tokens of claims encoded with a template."""
+    codec = version4.local_codec(version4.create_symmetric_key())
+    values = dynamic_claims()
+    benchmark(lambda: codec.encode(TEMPLATE.encode(values)))
+
+
+@pytest.mark.parametrize("codec", ["json", "json-stdlib", "binary"])
+@pytest.mark.benchmark(group="payload_codec")
+def test_payload_codec(
+    benchmark: BenchmarkFixture, monkeypatch: pytest.MonkeyPatch, codec: str
+) -> None:
+    """Benchmark minting and decoding a v4.local token per payload codec.
+
+    "json" uses orjson when installed, "json-stdlib" always the json module.
+    The size of the token is reported in extra_info of the benchmark.
+    """
+    monkeypatch.setitem(
+        payload._loaders,  # pylint: disable=protected-access
+        "json-stdlib",
+        lambda: PayloadCodec("json", encode_claims, json.loads),
+    )
+    claims = {**SERVICE_CLAIMS, **dynamic_claims()}
+    claims_codec = ClaimsCodec("v4.local", version4.create_symmetric_key(), codec)
+    token = claims_codec.encode(claims)
+    benchmark.extra_info["token_size"] = len(token)
+    assert benchmark(lambda: claims_codec.decode(claims_codec.encode(claims))) == claims
+
+
+def permission_claims(size: int) -> bytes:
+    """Return JSON payload of about size bytes, mostly a nested permission map."""
+    permissions = {
+        f"resource-{index}": {"actions": ["read", "write"], "tenant": "acme"}
+        for index in range(size // 60)
+    }
+    claims = {"sub": "user", "scope": "read write", "permissions": permissions}
+    return json.dumps(claims, separators=(",", ":")).encode()
+
+
+@pytest.mark.parametrize("size", [512, 2048, 8192])
+@pytest.mark.benchmark(group="lazy_claims")
+def test_claims_loads(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark reading sub and scope after parsing every claim."""
+    claims_payload = permission_claims(size)
+
+    def read() -> tuple[str, str]:
+        claims = json.loads(claims_payload)
+        return claims["sub"], claims["scope"]
+
+    assert benchmark(read) == ("user", "read write")
+
+
+@pytest.mark.parametrize("size", [512, 2048, 8192])
+@pytest.mark.benchmark(group="lazy_claims")
+def test_claims_project(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark reading sub and scope with lazy claims."""
+    claims_payload = permission_claims(size)
+    claims = benchmark(lambda: LazyClaims(claims_payload).project(["sub", "scope"]))
+    assert claims == {"sub": "user", "scope": "read write"}
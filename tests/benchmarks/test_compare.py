@@ -0,0 +1,60 @@
+"""This module contains tests for the benchmark comparison command."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from tests.benchmarks import compare
+
+
+def write_results(path: Path, results: dict[str, float]) -> Path:
+    """Write results in pytest-benchmark JSON format."""
+    benchmarks = [
+        {"fullname": name, "stats": {"median": value, "mean": value * 2}}
+        for name, value in results.items()
+    ]
+    path.write_text(json.dumps({"benchmarks": benchmarks}))
+    return path
+
+
+def test_compare() -> None:
+    """Test that only slowdowns above threshold are reported, worst first."""
+    baseline = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0}
+    current = {"a": 1.2, "b": 1.5, "c": 0.5, "e": 9.0, "d": 2.0}
+    regressions = compare.compare(baseline, current, 0.25)
+    assert [change.name for change in regressions] == ["d", "b"]
+    assert regressions[0].ratio == 2.0
+
+
+def test_update_and_compare(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test baseline round trip and exit codes of the command."""
+    baseline = tmp_path / "baseline.json"
+    first = write_results(tmp_path / "first.json", {"a": 1e-6, "b": 2e-6})
+    assert compare.main(["--update", str(baseline), str(first)]) == 0
+    assert json.loads(baseline.read_text()) == {
+        "metric": "median",
+        "results": {"a": 1e-6, "b": 2e-6},
+    }
+    assert compare.main([str(baseline), str(first)]) == 0
+
+    second = write_results(tmp_path / "second.json", {"a": 2e-6, "c": 1e-6})
+    capsys.readouterr()
+    assert compare.main([str(baseline), str(second)]) == 1
+    assert capsys.readouterr().out.splitlines() == [
+        "missing: b",
+        "new: c",
+        "regression: a median 1.00us -> 2.00us (+100%)",
+        "1 of 1 benchmarks slower than baseline by more than 25%",
+    ]
+    assert compare.main([str(baseline), str(second), "--threshold", "1.5"]) == 0
+
+
+def test_metric_mismatch(tmp_path: Path) -> None:
+    """Test exception when baseline records a different statistic."""
+    baseline = tmp_path / "baseline.json"
+    compare.save_baseline(baseline, {"a": 1.0}, "median")
+    with pytest.raises(ValueError, match="median"):
+        compare.load_results(baseline, "mean")
+    results = write_results(tmp_path / "results.json", {"a": 1.0})
+    assert compare.load_results(results, "mean") == {"a": 2.0}
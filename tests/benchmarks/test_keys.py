@@ -0,0 +1,117 @@
+"""This module contains benchmarks of token dispatch, keyrings and derived keys."""
+
+import itertools
+from collections.abc import Callable
+
+import pysodium
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.derivation import KeyDeriver
+from paseto.dispatch import Decoder
+from paseto.exceptions import InvalidHeader, PasetoException
+from paseto.keyring import Keyring, kid_footer
+from paseto.paserk.keys import PublicKey, SymmetricKey
+from paseto.protocol import version2, version4
+from tests.benchmarks import CLAIMS, FOOTER
+
+KEY = b"0" * 32
+
+
+def mixed_tokens() -> tuple[dict[str, bytes | PublicKey | SymmetricKey], list[bytes]]:
+    """Return keyring and tokens of all four purposes, interleaved."""
+    v2_public_key, v2_secret_key = pysodium.crypto_sign_keypair()
+    v4_public_key, v4_secret_key = version4.create_asymmetric_key()
+    v4_key = version4.create_symmetric_key()
+    keyring: dict[str, bytes | PublicKey | SymmetricKey] = {
+        "v2.local": KEY,
+        "v2.public": v2_public_key,
+        "v4.local": SymmetricKey(v4_key),
+        "v4.public": PublicKey(v4_public_key),
+    }
+    tokens = [
+        version2.encrypt(CLAIMS, KEY, FOOTER),
+        version2.sign(CLAIMS, v2_secret_key, FOOTER),
+        version4.encrypt(CLAIMS, v4_key, FOOTER),
+        version4.sign(CLAIMS, v4_secret_key, FOOTER),
+    ] * 25
+    return keyring, tokens
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_dispatch_trial(benchmark: BenchmarkFixture) -> None:
+    """Benchmark a mixed workload decoded by trying every function in turn."""
+    keyring, tokens = mixed_tokens()
+    functions: list[tuple[Callable[..., bytes], object]] = [
+        (version2.decrypt, keyring["v2.local"]),
+        (version2.verify, keyring["v2.public"]),
+        (version4.decrypt, keyring["v4.local"]),
+        (version4.verify, keyring["v4.public"]),
+    ]
+
+    def decode(token: bytes) -> bytes:
+        for function, key in functions:
+            try:
+                return function(token, key, FOOTER)
+            except PasetoException:
+                continue
+        raise InvalidHeader
+
+    assert benchmark(lambda: [decode(token) for token in tokens]) == [CLAIMS] * 100
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_dispatch_decoder(benchmark: BenchmarkFixture) -> None:
+    """Benchmark a mixed workload routed by header."""
+    keyring, tokens = mixed_tokens()
+    decoder = Decoder(keyring, FOOTER)
+    assert benchmark(lambda: [decoder.decode(token) for token in tokens]) == (
+        [CLAIMS] * 100
+    )
+
+
+@pytest.mark.parametrize("size", [10, 1000, 100000])
+@pytest.mark.benchmark(group="keyring_lookup")
+def test_keyring_lookup(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark finding the key of a token by key ID among size keys."""
+    keyring = Keyring()
+    for index in range(size):
+        keyring.add(str(index), "v2.local", index.to_bytes(32, "big"))
+    kid = str(size // 2)
+    key = (size // 2).to_bytes(32, "big")
+    token = version2.encrypt(CLAIMS, key, kid_footer(kid))
+    assert benchmark(keyring.candidates, token) == [(kid, key)]
+
+
+@pytest.mark.benchmark(group="derived_key")
+def test_derived_key_hit(benchmark: BenchmarkFixture) -> None:
+    """Benchmark encrypting with the cached key of a tenant."""
+    deriver = KeyDeriver(version4.create_symmetric_key())
+    deriver.local_key("tenant")
+    assert benchmark(lambda: version4.encrypt(CLAIMS, deriver.local_key("tenant")))
+    assert deriver.cache.misses == 1
+
+
+@pytest.mark.benchmark(group="derived_key")
+def test_derived_key_miss(benchmark: BenchmarkFixture) -> None:
+    """Benchmark deriving the key of a new tenant and encrypting with it."""
+    deriver = KeyDeriver(version4.create_symmetric_key(), cache_size=1)
+    tenants = (str(index) for index in itertools.count())
+    assert benchmark(lambda: version4.encrypt(CLAIMS, deriver.local_key(next(tenants))))
+    assert not deriver.cache.hits
+
+
+@pytest.mark.benchmark(group="derived_key")
+def test_derived_public_key_hit(benchmark: BenchmarkFixture) -> None:
+    """Benchmark signing with the cached key of a tenant."""
+    deriver = KeyDeriver(version4.create_symmetric_key())
+    deriver.secret_key("tenant")
+    assert benchmark(lambda: version4.sign(CLAIMS, deriver.secret_key("tenant")))
+
+
+@pytest.mark.benchmark(group="derived_key")
+def test_derived_public_key_miss(benchmark: BenchmarkFixture) -> None:
+    """Benchmark deriving the key pair of a new tenant and signing with it."""
+    deriver = KeyDeriver(version4.create_symmetric_key(), cache_size=1)
+    tenants = (str(index) for index in itertools.count())
+    assert benchmark(lambda: version4.sign(CLAIMS, deriver.secret_key(next(tenants))))
@@ -0,0 +1,33 @@
+"""This module contains benchmarks of nonce sources of local tokens."""
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.crypto.nonce import NoncePool
+from paseto.protocol import version2, version4
+
+KEY = b"0" * 32
+MESSAGE = b"foo"
+
+# tokens per second are OPS times NONCE_TOKENS
+NONCE_TOKENS = 1000
+
+
+@pytest.mark.parametrize("pool", [False, True], ids=["urandom", "pool"])
+@pytest.mark.benchmark(group="nonce_source")
+def test_v4_encrypt_nonce_source(benchmark: BenchmarkFixture, pool: bool) -> None:
+    """Benchmark v4.local tokens per second with nonces from os.urandom() or a pool."""
+    codec = version4.local_codec(
+        version4.create_symmetric_key(), nonce_source=NoncePool() if pool else None
+    )
+    tokens = benchmark(lambda: [codec.encode(MESSAGE) for _ in range(NONCE_TOKENS)])
+    assert len(set(tokens)) == NONCE_TOKENS
+
+
+@pytest.mark.parametrize("pool", [False, True], ids=["urandom", "pool"])
+@pytest.mark.benchmark(group="nonce_source")
+def test_v2_encrypt_nonce_source(benchmark: BenchmarkFixture, pool: bool) -> None:
+    """Benchmark v2.local tokens per second with nonces from os.urandom() or a pool."""
+    codec = version2.local_codec(KEY, nonce_source=NoncePool() if pool else None)
+    tokens = benchmark(lambda: [codec.encode(MESSAGE) for _ in range(NONCE_TOKENS)])
+    assert len(set(tokens)) == NONCE_TOKENS
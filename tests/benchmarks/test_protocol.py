@@ -0,0 +1,232 @@
+"""This module contains benchmarks of every protocol operation over a payload size sweep."""
+
+import pysodium
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.crypto import primitives
+from paseto.paserk.keys import PublicKey, SecretKey, SymmetricKey, paserk_ids
+from paseto.protocol import version2, version4
+from tests.benchmarks import set_group
+
+V2_KEY = b"0" * 32
+V2_PUBLIC_KEY, V2_SECRET_KEY = pysodium.crypto_sign_seed_keypair(b"1" * 32)
+V4_KEY = version4.create_symmetric_key()
+V4_PUBLIC_KEY, V4_SECRET_KEY = version4.create_asymmetric_key()
+
+
+def test_v2_encrypt(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer: bytes,
+) -> None:
+    """Benchmark v2.local encryption."""
+    set_group(benchmark, "v2.local encrypt", payload)
+    token = benchmark(version2.encrypt, payload, V2_KEY, footer)
+    assert version2.decrypt(token, V2_KEY, footer) == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v2_decrypt(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer: bytes,
+) -> None:
+    """Benchmark v2.local decryption."""
+    set_group(benchmark, "v2.local decrypt", payload)
+    token = version2.encrypt(payload, V2_KEY, footer)
+    assert benchmark(version2.decrypt, token, V2_KEY, footer) == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v2_sign(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer: bytes,
+) -> None:
+    """Benchmark v2.public signing."""
+    set_group(benchmark, "v2.public sign", payload)
+    token = benchmark(version2.sign, payload, V2_SECRET_KEY, footer)
+    assert version2.verify(token, V2_PUBLIC_KEY, footer) == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v2_verify(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer: bytes,
+) -> None:
+    """Benchmark v2.public verification."""
+    set_group(benchmark, "v2.public verify", payload)
+    token = version2.sign(payload, V2_SECRET_KEY, footer)
+    assert benchmark(version2.verify, token, V2_PUBLIC_KEY, footer) == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v4_encrypt(
+    benchmark: BenchmarkFixture,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.local encryption, it does not depend on the crypto backend."""
+    set_group(benchmark, "v4.local encrypt", payload)
+    footer, implicit_assertion = footer_and_assertion
+    token = benchmark(version4.encrypt, payload, V4_KEY, footer, implicit_assertion)
+    assert version4.decrypt(token, V4_KEY, footer, implicit_assertion) == payload
+
+
+def test_v4_decrypt(
+    benchmark: BenchmarkFixture,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.local decryption, it does not depend on the crypto backend."""
+    set_group(benchmark, "v4.local decrypt", payload)
+    footer, implicit_assertion = footer_and_assertion
+    token = version4.encrypt(payload, V4_KEY, footer, implicit_assertion)
+    plain_text = benchmark(version4.decrypt, token, V4_KEY, footer, implicit_assertion)
+    assert plain_text == payload
+
+
+def test_v4_sign(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.public signing."""
+    set_group(benchmark, "v4.public sign", payload)
+    footer, implicit_assertion = footer_and_assertion
+    token = benchmark(version4.sign, payload, V4_SECRET_KEY, footer, implicit_assertion)
+    assert version4.verify(token, V4_PUBLIC_KEY, footer, implicit_assertion) == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v4_verify(
+    benchmark: BenchmarkFixture,
+    backend: primitives.Backend,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.public verification."""
+    set_group(benchmark, "v4.public verify", payload)
+    footer, implicit_assertion = footer_and_assertion
+    token = version4.sign(payload, V4_SECRET_KEY, footer, implicit_assertion)
+    message = benchmark(
+        version4.verify, token, V4_PUBLIC_KEY, footer, implicit_assertion
+    )
+    assert message == payload
+    assert primitives.get_backend() is backend
+
+
+def test_v2_local_codec_decode(
+    benchmark: BenchmarkFixture, payload: bytes, footer: bytes
+) -> None:
+    """Benchmark v2.local decryption with a codec set up once."""
+    set_group(benchmark, "v2.local decrypt", payload)
+    codec = version2.local_codec(V2_KEY, footer)
+    assert benchmark(codec.decode, codec.encode(payload)) == payload
+
+
+def test_v4_local_codec_encode(
+    benchmark: BenchmarkFixture,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.local encryption with a codec set up once."""
+    set_group(benchmark, "v4.local encrypt", payload)
+    codec = version4.local_codec(V4_KEY, *footer_and_assertion)
+    assert codec.decode(benchmark(codec.encode, payload)) == payload
+
+
+def test_v4_local_codec_decode(
+    benchmark: BenchmarkFixture,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.local decryption with a codec set up once."""
+    set_group(benchmark, "v4.local decrypt", payload)
+    codec = version4.local_codec(V4_KEY, *footer_and_assertion)
+    assert benchmark(codec.decode, codec.encode(payload)) == payload
+
+
+def test_v4_public_codec_decode(
+    benchmark: BenchmarkFixture,
+    payload: bytes,
+    footer_and_assertion: tuple[bytes, bytes],
+) -> None:
+    """Benchmark v4.public verification with a codec set up once."""
+    set_group(benchmark, "v4.public verify", payload)
+    token = version4.public_codec(V4_SECRET_KEY, *footer_and_assertion).encode(payload)
+    codec = version4.public_codec(V4_PUBLIC_KEY, *footer_and_assertion)
+    assert benchmark(codec.decode, token) == payload
+
+
+@pytest.mark.benchmark(group="key creation")
+def test_v4_create_symmetric_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.local key creation."""
+    assert len(benchmark(version4.create_symmetric_key)) > 32
+
+
+@pytest.mark.benchmark(group="key creation")
+def test_v4_create_asymmetric_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.public key pair creation."""
+    public_key, secret_key = benchmark(version4.create_asymmetric_key)
+    assert public_key != secret_key
+
+
+@pytest.mark.benchmark(group="key creation")
+def test_v2_create_asymmetric_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v2.public key pair creation, Version2 keys are raw libsodium keys."""
+    public_key, secret_key = benchmark(pysodium.crypto_sign_keypair)
+    assert secret_key.endswith(public_key)
+
+
+@pytest.mark.benchmark(group="key parsing")
+@pytest.mark.parametrize(
+    ("key_class", "key"),
+    [(SymmetricKey, V4_KEY), (PublicKey, V4_PUBLIC_KEY), (SecretKey, V4_SECRET_KEY)],
+    ids=["local", "public", "secret"],
+)
+def test_v4_parse_key(
+    benchmark: BenchmarkFixture, key_class: type[SymmetricKey], key: bytes
+) -> None:
+    """Benchmark parsing a serialized key into a reusable key object."""
+    assert bytes(benchmark(key_class, key)) == key
+
+
+def create_local_keys() -> list[SymmetricKey]:
+    """Return 1000 new key objects without memoized IDs."""
+    return [SymmetricKey.from_raw(index.to_bytes(32, "big")) for index in range(1000)]
+
+
+@pytest.mark.benchmark(group="paserk id")
+def test_v4_paserk_id(benchmark: BenchmarkFixture) -> None:
+    """Benchmark computing IDs of 1000 keys one at a time."""
+    ids = benchmark.pedantic(
+        lambda keys: [key.paserk_id for key in keys],
+        setup=lambda: ((create_local_keys(),), {}),
+        rounds=20,
+    )
+    assert len(set(ids)) == 1000
+
+
+@pytest.mark.benchmark(group="paserk id")
+def test_v4_paserk_ids(benchmark: BenchmarkFixture) -> None:
+    """Benchmark computing IDs of 1000 keys in bulk."""
+    ids = benchmark.pedantic(
+        paserk_ids, setup=lambda: ((create_local_keys(),), {}), rounds=20
+    )
+    assert len(set(ids)) == 1000
+
+
+@pytest.mark.benchmark(group="paserk id")
+def test_v4_paserk_id_memoized(benchmark: BenchmarkFixture) -> None:
+    """Benchmark reading memoized IDs of 1000 keys."""
+    keys = create_local_keys()
+    paserk_ids(keys)
+    assert len(set(benchmark(lambda: [key.paserk_id for key in keys]))) == 1000
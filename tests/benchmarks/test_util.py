@@ -0,0 +1,46 @@
+"""This module contains benchmarks of encoding functions over a payload size sweep."""
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from paseto.protocol.common import parse_token
+from paseto.protocol.util import b64, b64decode, pae
+from tests.benchmarks import set_group
+
+
+def test_pae(benchmark: BenchmarkFixture, payload: bytes, footer: bytes) -> None:
+    """Benchmark pre-authentication encoding of a token."""
+    set_group(benchmark, "pae", payload)
+    encoded = benchmark(pae, [b"v4.local.", b"n" * 32, payload, footer, b""])
+    assert len(encoded) == 8 * 6 + 9 + 32 + len(payload) + len(footer)
+
+
+def test_b64(benchmark: BenchmarkFixture, payload: bytes) -> None:
+    """Benchmark base64url encoding without padding."""
+    set_group(benchmark, "b64", payload)
+    encoded = benchmark(b64, payload)
+    assert b"=" not in encoded
+
+
+def test_b64decode(benchmark: BenchmarkFixture, payload: bytes) -> None:
+    """Benchmark base64url decoding without padding."""
+    set_group(benchmark, "b64decode", payload)
+    encoded = b64(payload)
+    assert benchmark(b64decode, encoded) == payload
+
+
+def test_parse_token(
+    benchmark: BenchmarkFixture, payload: bytes, footer: bytes
+) -> None:
+    """Benchmark splitting a token into header, payload and footer."""
+    set_group(benchmark, "parse_token", payload)
+    token = b"v4.local." + b64(payload) + (b"." + b64(footer) if footer else b"")
+    parsed = benchmark(parse_token, token)
+    assert parsed.footer == b64(footer)
+
+
+def test_parse_token_dots(benchmark: BenchmarkFixture, payload: bytes) -> None:
+    """Benchmark splitting an adversarial token made of dots."""
+    set_group(benchmark, "parse_token_dots", payload)
+    token = b"v4.local." + b"." * len(payload)
+    parsed = benchmark(parse_token, token)
+    assert len(parsed.footer) == len(payload) - 1
@@ -2,9 +2,12 @@
 
 import json
 import os
+from collections.abc import Iterator
 
 import pytest
 
+from paseto.crypto import primitives
+
 
 @pytest.fixture
 def get_all_test_vectors() -> dict:
@@ -15,6 +18,15 @@ def get_all_test_vectors() -> dict:
     }
 
 
+@pytest.fixture
+def restore_backends() -> Iterator[None]:
+    """Restore selected crypto and hash backends after a test."""
+    backend, hash_backend = primitives.get_backend(), primitives.get_hash_backend()
+    yield
+    primitives.use_backend(backend.name)
+    primitives.use_hash_backend(hash_backend.name)
+
+
 def get_test_vector(version: str) -> dict:
     """Return deserialised json."""
     with open(get_test_vector_path(version), encoding="utf-8") as json_file:
@@ -1,8 +1,13 @@
 """This module contains tests for libsodium wrapper."""
 
 import ctypes.util
+import hashlib
+import mmap
+import tempfile
+import tracemalloc
 from unittest.mock import MagicMock, patch
 
+import pysodium
 import pytest
 
 from paseto.crypto import libsodium_wrapper
@@ -32,8 +37,268 @@ def test_no_libsodium(mock: MagicMock) -> None:
         importlib.reload(paseto.crypto.libsodium_wrapper)
 
 
-@patch.object(libsodium_wrapper._sodium, "crypto_stream_xchacha20_xor")
+@patch.object(libsodium_wrapper, "_crypto_stream_xchacha20_xor_ic")
 def test_non_zero_exit_code(mock: MagicMock) -> None:
     mock.return_value = 1
     with pytest.raises(ValueError):
         libsodium_wrapper.crypto_stream_xchacha20_xor(b"", b"0" * 24, b"0" * 32)
+
+
+def test_xor_ic_matches_xor() -> None:
+    """Test that keystream can be started at any block."""
+    message = bytes(range(256))
+    nonce, key = b"0" * 24, b"0" * 32
+    ciphertext = libsodium_wrapper.crypto_stream_xchacha20_xor(message, nonce, key)
+    assert (
+        libsodium_wrapper.crypto_stream_xchacha20_xor_ic(message[128:], nonce, 2, key)
+        == ciphertext[128:]
+    )
+
+
+def test_xor_ic_sizes() -> None:
+    """Test exceptions when key or nonce size is incorrect."""
+    with pytest.raises(ValueError, match="key"):
+        libsodium_wrapper.crypto_stream_xchacha20_xor_ic(b"", b"0" * 24, 0, b"")
+    with pytest.raises(ValueError, match="nonce"):
+        libsodium_wrapper.crypto_stream_xchacha20_xor_ic(b"", b"", 0, b"0" * 32)
+
+
+@patch.object(libsodium_wrapper, "_crypto_stream_xchacha20_xor_ic")
+def test_xor_ic_non_zero_exit_code(mock: MagicMock) -> None:
+    mock.return_value = 1
+    with pytest.raises(ValueError):
+        libsodium_wrapper.crypto_stream_xchacha20_xor_ic(b"", b"0" * 24, 0, b"0" * 32)
+
+
+MESSAGE = bytes(range(256)) * 3
+NONCE = b"0" * 24
+KEY = b"0" * 32
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        bytearray(MESSAGE),
+        memoryview(MESSAGE),
+        memoryview(b"xx" + MESSAGE)[2:],
+        memoryview(b"xx" + MESSAGE * 8)[2 : 2 + len(MESSAGE)],
+        memoryview(bytearray(MESSAGE)),
+        # not contiguous, copied
+        memoryview(bytes(byte for char in MESSAGE for byte in (char, 0)))[::2],
+    ],
+)
+def test_buffer_protocol(message: libsodium_wrapper.Buffer) -> None:
+    """Test that any buffer can be used as input."""
+    expected = libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY)
+    ciphertext = libsodium_wrapper.crypto_stream_xchacha20_xor(message, NONCE, KEY)
+    assert isinstance(ciphertext, bytes)
+    assert ciphertext == expected
+
+
+def test_mmap() -> None:
+    """Test that memory maps can be used as input and output."""
+    expected = libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY)
+    with mmap.mmap(-1, len(MESSAGE)) as memory_map:
+        memory_map.write(MESSAGE)
+        assert (
+            libsodium_wrapper.crypto_stream_xchacha20_xor(memory_map, NONCE, KEY)
+            == expected
+        )
+        libsodium_wrapper.crypto_stream_xchacha20_xor(
+            MESSAGE, NONCE, KEY, out=memory_map
+        )
+        assert memory_map[:] == expected
+
+
+def test_mmap_read_only() -> None:
+    """Test that read only memory maps are used as input and released afterwards."""
+    expected = libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY)
+    with tempfile.TemporaryFile() as file:
+        file.write(MESSAGE)
+        file.flush()
+        memory_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert (
+            libsodium_wrapper.crypto_stream_xchacha20_xor(memory_map, NONCE, KEY)
+            == expected
+        )
+        # raises BufferError while exported
+        memory_map.close()
+
+
+def test_read_only_not_copied() -> None:
+    """Test that read only buffers are passed to libsodium without being copied."""
+    message = memoryview(b"x" * 2**20)
+    out = bytearray(len(message))
+    tracemalloc.start()
+    libsodium_wrapper.crypto_stream_xchacha20_xor(message[1:], NONCE, KEY, out)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # far less than the copy of a MiB, ctypes creates an array type per size
+    assert peak < 2**16
+    assert out[:-1] == libsodium_wrapper.crypto_stream_xchacha20_xor(
+        message[1:], NONCE, KEY
+    )
+
+
+def test_out() -> None:
+    """Test that result is written into a caller supplied buffer."""
+    expected = libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY)
+    buffer = bytearray(len(MESSAGE) + 2)
+    out = memoryview(buffer)[1:-1]
+
+    assert (
+        libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY, out) is out
+    )
+    assert buffer == b"\x00" + expected + b"\x00"
+
+
+def test_out_in_place() -> None:
+    """Test that message can be transformed in place."""
+    buffer = bytearray(MESSAGE)
+    libsodium_wrapper.crypto_stream_xchacha20_xor(buffer, NONCE, KEY, out=buffer)
+    assert buffer == libsodium_wrapper.crypto_stream_xchacha20_xor(MESSAGE, NONCE, KEY)
+
+
+def test_out_too_small() -> None:
+    """Test exception when output buffer can not hold the result."""
+    with pytest.raises(ValueError, match="too small"):
+        libsodium_wrapper.crypto_stream_xchacha20_xor(
+            MESSAGE, NONCE, KEY, out=bytearray(len(MESSAGE) - 1)
+        )
+
+
+def test_out_read_only() -> None:
+    """Test exception when output buffer is read only."""
+    with pytest.raises(TypeError):
+        libsodium_wrapper.crypto_stream_xchacha20_xor(
+            MESSAGE, NONCE, KEY, out=memoryview(bytes(len(MESSAGE)))
+        )
+
+
+@pytest.mark.parametrize("size", [0, 1, 2])
+def test_small_messages(size: int) -> None:
+    """Test that results for small messages are not shared objects."""
+    first = libsodium_wrapper.crypto_stream_xchacha20_xor(b"a" * size, NONCE, KEY)
+    second = libsodium_wrapper.crypto_stream_xchacha20_xor(b"b" * size, NONCE, KEY)
+    assert len(first) == len(second) == size
+    assert size == 0 or first != second
+    assert b"a" * size == libsodium_wrapper.crypto_stream_xchacha20_xor(
+        first, NONCE, KEY
+    )
+
+
+def test_aead() -> None:
+    """Test authenticated encryption against pysodium."""
+    aad = memoryview(b"a" * 5000)
+    ciphertext = libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt(
+        MESSAGE, aad, NONCE, KEY
+    )
+    assert ciphertext == pysodium.crypto_aead_xchacha20poly1305_ietf_encrypt(
+        MESSAGE, bytes(aad), NONCE, KEY
+    )
+    assert (
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_decrypt(
+            bytearray(ciphertext), aad, NONCE, KEY
+        )
+        == MESSAGE
+    )
+    ciphertext = libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt(
+        b"", None, NONCE, KEY
+    )
+    assert (
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_decrypt(
+            ciphertext, None, NONCE, KEY
+        )
+        == b""
+    )
+
+
+@pytest.mark.parametrize(
+    ("ciphertext", "aad", "nonce", "key", "match"),
+    [
+        (b"0" * 16, b"", NONCE, b"", "key"),
+        (b"0" * 16, b"", b"", KEY, "nonce"),
+        (b"0" * 15, b"", NONCE, KEY, "truncated"),
+        (memoryview(b"0" * 5000), b"", NONCE, KEY, None),
+        (b"0" * 16, b"", NONCE, KEY, None),
+    ],
+)
+def test_aead_decrypt_errors(
+    ciphertext: bytes, aad: bytes, nonce: bytes, key: bytes, match: str | None
+) -> None:
+    """Test exceptions when input is incorrect or forged."""
+    with pytest.raises(ValueError, match=match):
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_decrypt(
+            ciphertext, aad, nonce, key
+        )
+
+
+def test_aead_encrypt_errors() -> None:
+    """Test exceptions when key or nonce size is incorrect."""
+    with pytest.raises(ValueError, match="key"):
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt(
+            b"", b"", NONCE, b""
+        )
+    with pytest.raises(ValueError, match="nonce"):
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt(b"", b"", b"", KEY)
+
+
+@patch.object(libsodium_wrapper, "_crypto_aead_xchacha20poly1305_ietf_encrypt")
+def test_aead_encrypt_non_zero_exit_code(mock: MagicMock) -> None:
+    mock.return_value = -1
+    with pytest.raises(ValueError):
+        libsodium_wrapper.crypto_aead_xchacha20poly1305_ietf_encrypt(
+            b"", b"", NONCE, KEY
+        )
+
+
+def test_sign() -> None:
+    """Test detached signatures against pysodium."""
+    public_key, secret_key = pysodium.crypto_sign_keypair()
+    signature = libsodium_wrapper.crypto_sign_detached(memoryview(MESSAGE), secret_key)
+    assert signature == pysodium.crypto_sign_detached(MESSAGE, secret_key)
+    libsodium_wrapper.crypto_sign_verify_detached(signature, MESSAGE, public_key)
+    with pytest.raises(ValueError):
+        libsodium_wrapper.crypto_sign_verify_detached(signature, b"", public_key)
+    with pytest.raises(ValueError, match="signature"):
+        libsodium_wrapper.crypto_sign_verify_detached(b"", MESSAGE, public_key)
+    with pytest.raises(ValueError, match="public key"):
+        libsodium_wrapper.crypto_sign_verify_detached(signature, MESSAGE, b"")
+    with pytest.raises(ValueError, match="secret key"):
+        libsodium_wrapper.crypto_sign_detached(MESSAGE, public_key)
+
+
+@patch.object(libsodium_wrapper, "_crypto_sign_detached")
+def test_sign_non_zero_exit_code(mock: MagicMock) -> None:
+    mock.return_value = -1
+    with pytest.raises(ValueError):
+        libsodium_wrapper.crypto_sign_detached(MESSAGE, b"0" * 64)
+
+
+@pytest.mark.parametrize("digest_size", [16, 24, 32, 64])
+def test_generichash(digest_size: int) -> None:
+    """Test BLAKE2b against hashlib."""
+    assert (
+        libsodium_wrapper.crypto_generichash(MESSAGE, KEY, digest_size)
+        == hashlib.blake2b(MESSAGE, key=KEY, digest_size=digest_size).digest()
+    )
+
+
+def test_generichash_errors() -> None:
+    """Test exceptions when digest or key size is incorrect."""
+    with pytest.raises(ValueError, match="digest"):
+        libsodium_wrapper.crypto_generichash(MESSAGE, KEY, 65)
+    with pytest.raises(ValueError, match="key"):
+        libsodium_wrapper.crypto_generichash(MESSAGE, b"0" * 65)
+
+
+@patch.object(libsodium_wrapper, "_crypto_generichash")
+def test_generichash_non_zero_exit_code(mock: MagicMock) -> None:
+    mock.return_value = -1
+    with pytest.raises(ValueError):
+        libsodium_wrapper.crypto_generichash(MESSAGE)
+
+
+def test_sodium_version_string() -> None:
+    """Test that version of libsodium is reported."""
+    assert libsodium_wrapper.sodium_version_string().count(".") == 2
@@ -0,0 +1,121 @@
+"""This module contains tests for nonce sources."""
+
+import io
+import os
+import threading
+
+import pytest
+
+from paseto.crypto import nonce
+from paseto.crypto.nonce import NoncePool
+from paseto.protocol import version2, version4
+
+# pylint: disable=protected-access
+
+
+def test_pool() -> None:
+    """Test that bytes are handed out once and zeroed in the pool."""
+    pool = NoncePool(64)
+    assert not any(pool._buffer)
+    first = pool(24)
+    assert len(first) == 24
+    assert not any(pool._buffer[:24])
+    assert any(pool._buffer[24:])
+    second = pool(32)
+    assert second != first[: len(second)]
+    # 8 bytes left, refilled for the next 24
+    third = pool(24)
+    assert len(third) == 24
+    assert pool._position == 24
+    assert len(pool(100)) == 100
+    assert pool(0) == b""
+
+
+def test_pool_reset() -> None:
+    """Test that reset discards remaining bytes."""
+    pool = NoncePool(64)
+    pool(8)
+    pool.reset()
+    assert not any(pool._buffer)
+    assert len(pool(8)) == 8
+
+
+def test_pool_threads() -> None:
+    """Test that concurrent threads never get the same bytes."""
+    pool = NoncePool(256)
+    results: list[bytes] = []
+
+    def draw() -> None:
+        results.extend(pool(32) for _ in range(500))
+
+    threads = [threading.Thread(target=draw) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 2000
+
+
+def test_pool_after_fork_hook() -> None:
+    """Test that pools are emptied and unlocked by the fork hook."""
+    pool = NoncePool(64)
+    pool(8)
+    pool._lock.acquire()  # pylint: disable=consider-using-with
+    nonce._reset_pools_after_fork()
+    assert pool._position == 64
+    assert not any(pool._buffer)
+    assert len(pool(8)) == 8
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_pool_fork() -> None:
+    """Test that parent and child processes draw different bytes."""
+    pool = NoncePool(4096)
+    pool(8)
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        os.write(write_end, pool(32))
+        os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_end, "rb") as reader:
+        child = reader.read()
+    assert len(child) == 32
+    assert child != pool(32)
+
+
+def test_invalid_size() -> None:
+    """Test exception when pool can not hold any bytes."""
+    with pytest.raises(ValueError, match="positive"):
+        NoncePool(0)
+
+
+def fixed(size: int) -> bytes:
+    """Return deterministic nonce."""
+    return b"\x01" * size
+
+
+def test_nonce_source() -> None:
+    """Test that encryption functions use the given nonce source."""
+    key = version4.create_symmetric_key()
+    token = version4.encrypt(b"foo", key, nonce_source=fixed)
+    assert token == version4.encrypt(b"foo", key, nonce_source=fixed)
+    assert version4.local_codec(key, nonce_source=fixed).encode(b"foo") == token
+    assert version4.encrypt_many([b"foo"], key, nonce_source=fixed) == [token]
+    destination = io.BytesIO()
+    version4.encrypt_stream(io.BytesIO(b"foo"), destination, key, nonce_source=fixed)
+    assert destination.getvalue() == token
+    assert version4.decrypt(token, key) == b"foo"
+
+    key = b"0" * 32
+    token = version2.encrypt(b"foo", key, nonce_source=fixed)
+    assert token == version2.encrypt(b"foo", key, nonce_source=fixed)
+    assert version2.local_codec(key, nonce_source=fixed).encode(b"foo") == token
+    assert version2.encrypt_many([b"foo"], key, nonce_source=fixed) == [token]
+    assert version2.decrypt(token, key) == b"foo"
+
+    pool = NoncePool()
+    assert version4.encrypt(
+        b"foo", key=version4.create_symmetric_key(), nonce_source=pool
+    )
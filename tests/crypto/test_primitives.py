@@ -0,0 +1,285 @@
+"""This module contains tests for the crypto backend registry."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pysodium
+import pytest
+
+import paseto.crypto
+from paseto.crypto import primitives
+from paseto.protocol import version2, version4
+
+BACKENDS = ["pysodium", "pynacl", "ctypes"]
+HASH_BACKENDS = ["hashlib", "pysodium", "pynacl", "ctypes"]
+KEY = b"0" * 32
+MESSAGE = b"foo"
+FOOTER = b"sample_footer"
+
+pytestmark = pytest.mark.usefixtures("restore_backends")
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Keep auto selection cache out of the home directory."""
+    monkeypatch.setenv(primitives.ENV_CACHE_DIR, str(tmp_path))
+    return tmp_path
+
+
+def test_defaults() -> None:
+    """Test that backends default to pysodium and hashlib."""
+    assert primitives.get_backend().name == primitives.DEFAULT_BACKEND
+    assert primitives.get_hash_backend().name == primitives.DEFAULT_HASH_BACKEND
+
+
+def test_available() -> None:
+    """Test that all built in backends are available in test environment."""
+    assert primitives.available_backends() == BACKENDS
+    assert primitives.available_hash_backends() == HASH_BACKENDS
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_backend(name: str) -> None:
+    """Test that protocol functions work with every backend."""
+    backend = primitives.use_backend(name)
+    assert primitives.get_backend() is backend
+    assert primitives.encrypt is backend.encrypt
+    assert primitives.verify is backend.verify
+
+    token = version2.encrypt(MESSAGE, KEY, FOOTER)
+    assert version2.decrypt(token, KEY, FOOTER) == MESSAGE
+    with pytest.raises(ValueError):
+        version2.decrypt(token, b"1" * 32, FOOTER)
+
+    public_key, secret_key = pysodium.crypto_sign_keypair()
+    token = version2.sign(MESSAGE, secret_key, FOOTER)
+    assert version2.verify(token, public_key, FOOTER) == MESSAGE
+    with pytest.raises(ValueError):
+        version2.verify(token, pysodium.crypto_sign_keypair()[0], FOOTER)
+
+    v4_public_key, v4_secret_key = version4.create_asymmetric_key()
+    token = version4.sign(MESSAGE, v4_secret_key, FOOTER)
+    assert version4.verify(token, v4_public_key, FOOTER) == MESSAGE
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_backend_errors(name: str) -> None:
+    """Test that every backend raises ValueError on incorrect input."""
+    backend = primitives.use_backend(name)
+    public_key, secret_key = pysodium.crypto_sign_keypair()
+    signature = backend.sign(MESSAGE, secret_key)
+    with pytest.raises(ValueError):
+        backend.encrypt(MESSAGE, b"", b"0" * 24, b"")
+    with pytest.raises(ValueError):
+        backend.sign(MESSAGE, public_key)
+    with pytest.raises(ValueError):
+        backend.verify(signature[:-1], MESSAGE, public_key)
+    with pytest.raises(ValueError):
+        backend.verify(signature, MESSAGE, secret_key)
+
+
+@pytest.mark.parametrize("name", HASH_BACKENDS)
+def test_hash_backend(name: str) -> None:
+    """Test that every hash backend produces the same nonce."""
+    expected = version2.get_nonce(MESSAGE, KEY)
+    backend = primitives.use_hash_backend(name)
+    assert primitives.blake2b is backend.blake2b
+    assert version2.get_nonce(MESSAGE, KEY) == expected
+
+
+def test_unknown_backend() -> None:
+    """Test exception when backend is not registered."""
+    with pytest.raises(ValueError, match="Unknown crypto"):
+        primitives.use_backend("unknown")
+    with pytest.raises(ValueError, match="Unknown hash"):
+        primitives.use_hash_backend("unknown")
+
+
+def test_unavailable_backend() -> None:
+    """Test that backend failing to load is reported as not available."""
+    loader = MagicMock(side_effect=ImportError)
+    primitives.register_backend("missing", loader)
+    try:
+        assert "missing" not in primitives.available_backends()
+        with pytest.raises(ValueError, match="not available"):
+            primitives.use_backend("missing")
+    finally:
+        primitives._backends.loaders.pop("missing")  # pylint: disable=protected-access
+
+
+def test_register_backend() -> None:
+    """Test that third party backends can be registered and selected."""
+    pysodium_backend = primitives.use_backend("pysodium")
+    primitives.register_backend(
+        "custom", lambda: pysodium_backend._replace(name="custom")
+    )
+    try:
+        assert primitives.use_backend("custom").name == "custom"
+    finally:
+        primitives._backends.loaders.pop("custom")  # pylint: disable=protected-access
+    with pytest.raises(ValueError, match="reserved"):
+        primitives.register_hash_backend(primitives.AUTO, MagicMock())
+
+
+def test_subscribe() -> None:
+    """Test that subscribers are notified now and on every change."""
+    on_backend, on_hash_backend = MagicMock(), MagicMock()
+    primitives.subscribe(on_backend, on_hash_backend)
+    try:
+        on_backend.assert_called_once_with(primitives.get_backend())
+        on_hash_backend.assert_called_once_with(primitives.get_hash_backend())
+        backend = primitives.use_backend("pynacl")
+        on_backend.assert_called_with(backend)
+        hash_backend = primitives.use_hash_backend("ctypes")
+        on_hash_backend.assert_called_with(hash_backend)
+    finally:
+        # pylint: disable=protected-access
+        primitives._backends.subscribers.remove(on_backend)
+        primitives._hash_backends.subscribers.remove(on_hash_backend)
+
+
+def test_auto(cache_dir: Path) -> None:
+    """Test that fastest backend is selected at first use and cached."""
+    assert primitives.use_backend(primitives.AUTO).name == primitives.AUTO
+    assert primitives.use_hash_backend(primitives.AUTO).name == primitives.AUTO
+
+    token = version2.encrypt(MESSAGE, KEY, FOOTER)
+    backend, hash_backend = primitives.get_backend(), primitives.get_hash_backend()
+    assert backend.name in BACKENDS
+    assert hash_backend.name in HASH_BACKENDS
+    assert version2.decrypt(token, KEY, FOOTER) == MESSAGE
+
+    # results are keyed by library versions and candidates, which differ by kind
+    cache = json.loads((cache_dir / primitives.CACHE_FILE_NAME).read_text())
+    selected = {kind: name for entry in cache.values() for kind, name in entry.items()}
+    assert selected == {"crypto": backend.name, "hash": hash_backend.name}
+
+
+@pytest.mark.parametrize("primitive", ["encrypt", "decrypt", "sign", "verify"])
+def test_auto_any_primitive(primitive: str) -> None:
+    """Test that first call of any primitive selects a backend."""
+    public_key, secret_key = pysodium.crypto_sign_keypair()
+    nonce = b"0" * 24
+    ciphertext = pysodium.crypto_aead_xchacha20poly1305_ietf_encrypt(
+        MESSAGE, b"", nonce, KEY
+    )
+    signature = pysodium.crypto_sign_detached(MESSAGE, secret_key)
+    arguments = {
+        "encrypt": (MESSAGE, b"", nonce, KEY),
+        "decrypt": (ciphertext, b"", nonce, KEY),
+        "sign": (MESSAGE, secret_key),
+        "verify": (signature, MESSAGE, public_key),
+    }
+    with patch.object(primitives, "_fastest", return_value="ctypes"):
+        backend = primitives.use_backend(primitives.AUTO)
+        getattr(backend, primitive)(*arguments[primitive])
+    assert primitives.get_backend().name == "ctypes"
+
+
+def test_auto_unavailable() -> None:
+    """Test that auto selection names the backends tried when none can be loaded."""
+    loaders = {"missing": MagicMock(side_effect=ImportError)}
+    # pylint: disable=protected-access
+    with (
+        patch.object(primitives._backends, "loaders", loaders),
+        patch.object(primitives._backends, "backends", {}),
+    ):
+        backend = primitives.use_backend(primitives.AUTO)
+        with pytest.raises(ValueError, match="available, tried 'missing'"):
+            backend.encrypt(MESSAGE, b"", b"0" * 24, KEY)
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_time_backend(monkeypatch: pytest.MonkeyPatch, name: str) -> None:
+    """Test that timing a backend only uses the library of that backend."""
+    backend = primitives.use_backend(name)
+    monkeypatch.setattr(primitives, "_TIMING_NUMBER", 1)
+    monkeypatch.setitem(sys.modules, "pysodium", None)
+    assert primitives._time_backend(backend) > 0  # pylint: disable=protected-access
+
+
+def test_auto_cached(cache_dir: Path) -> None:
+    """Test that cached selection is used without timing backends."""
+    # pylint: disable=protected-access
+    cache_key = primitives._cache_key(BACKENDS)
+    (cache_dir / primitives.CACHE_FILE_NAME).write_text(
+        json.dumps({cache_key: {"crypto": "pynacl"}})
+    )
+    with patch.object(primitives, "_time_backend") as timer:
+        primitives.use_backend(primitives.AUTO).encrypt(MESSAGE, b"", b"0" * 24, KEY)
+    timer.assert_not_called()
+    assert primitives.get_backend().name == "pynacl"
+
+
+@pytest.mark.parametrize("content", ["not json", "[]", json.dumps({"x": {}})])
+def test_auto_corrupt_cache(cache_dir: Path, content: str) -> None:
+    """Test that corrupt cache is replaced."""
+    path = cache_dir / primitives.CACHE_FILE_NAME
+    path.write_text(content)
+    primitives.use_hash_backend(primitives.AUTO).blake2b(MESSAGE, KEY, 24)
+    cache = json.loads(path.read_text())
+    assert cache[primitives._cache_key(HASH_BACKENDS)] == {  # pylint: disable=protected-access
+        "hash": primitives.get_hash_backend().name
+    }
+
+
+def test_auto_unwritable_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test that selection works when cache can not be written."""
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+    monkeypatch.setenv(primitives.ENV_CACHE_DIR, str(not_a_directory))
+    primitives.use_hash_backend(primitives.AUTO).blake2b(MESSAGE, KEY, 24)
+    assert primitives.get_hash_backend().name in HASH_BACKENDS
+
+
+def test_cache_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test cache location precedence."""
+    assert primitives.cache_path() == tmp_path / primitives.CACHE_FILE_NAME
+    monkeypatch.delenv(primitives.ENV_CACHE_DIR)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert primitives.cache_path() == (
+        tmp_path / "xdg" / "python-paseto" / primitives.CACHE_FILE_NAME
+    )
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert primitives.cache_path() == (
+        Path.home() / ".cache" / "python-paseto" / primitives.CACHE_FILE_NAME
+    )
+
+
+def test_cache_key_versions(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that missing libraries are part of the cache key."""
+    # pylint: disable=protected-access
+    assert primitives._library_version("not-installed-distribution") is None
+    monkeypatch.delattr(paseto.crypto, "libsodium_wrapper")
+    monkeypatch.setitem(sys.modules, "paseto.crypto.libsodium_wrapper", None)
+    assert json.loads(primitives._cache_key(["pysodium"]))["libsodium"] is None
+
+
+@pytest.mark.parametrize(
+    ("variable", "value", "function", "expected"),
+    [
+        (primitives.ENV_BACKEND, "pynacl", "get_backend", "pynacl"),
+        (primitives.ENV_HASH_BACKEND, "ctypes", "get_hash_backend", "ctypes"),
+        (primitives.ENV_BACKEND, "", "get_backend", "pysodium"),
+    ],
+)
+def test_environment_variable(
+    variable: str, value: str, function: str, expected: str
+) -> None:
+    """Test that backends can be selected per process with environment variables."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"from paseto.crypto import primitives; print(primitives.{function}().name)",
+        ],
+        env={**os.environ, variable: value},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.strip() == expected
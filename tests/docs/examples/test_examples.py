@@ -6,7 +6,8 @@ import pytest
 
 
 @pytest.mark.parametrize(
-    "module_name", [("example1"), ("example2"), ("example3"), ("example4")]
+    "module_name",
+    [("example1"), ("example2"), ("example3"), ("example4"), ("example5")],
 )
 def test_examples(module_name: str) -> None:
     """Test examples by running them."""
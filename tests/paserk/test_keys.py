@@ -1,8 +1,17 @@
 """This module contains tests for functions that manage keys."""
 
+import json
+import os
+
 import pytest
 
+from paseto.exceptions import InvalidKey
 from paseto.paserk.keys import (
+    Key,
+    KeyIndex,
+    PublicKey,
+    SecretKey,
+    SymmetricKey,
     _create_asymmetric_key,
     _create_symmetric_key,
     _deserialize_key,
@@ -10,6 +19,7 @@ from paseto.paserk.keys import (
     _serialize_key,
     _validate_version,
     _verify_key,
+    paserk_ids,
 )
 
 
@@ -62,3 +72,108 @@ def test_verify_key() -> None:
     assert _verify_key(b"k4.unit_test.data", 4, b".unit_test.")
     assert not _verify_key(b"k4.unit_test.data", 3, b".unit_test.")
     assert not _verify_key(b"k4.unit_test.data", 3, b".something_else.")
+
+
+def test_symmetric_key() -> None:
+    """Test that symmetric key is parsed once and can be serialized again."""
+    serialized: bytes = _create_symmetric_key(4, b"0" * 32)
+    key = SymmetricKey(serialized)
+    assert key.version == 4
+    assert key.raw == b"0" * 32
+    assert bytes(key) == serialized
+    assert key.encryption_state.digest_size == 56
+    assert key.authentication_state.digest_size == 32
+
+
+def test_asymmetric_key() -> None:
+    """Test that public and secret keys are parsed."""
+    public_key, secret_key = _create_asymmetric_key(4)
+    assert bytes(PublicKey(public_key)) == public_key
+    assert bytes(SecretKey(secret_key)) == secret_key
+    assert len(SecretKey(secret_key).raw) == 64
+
+
+def test_key_from_raw() -> None:
+    """Test that key objects can be created from raw key material."""
+    key = SymmetricKey.from_raw(b"1" * 32)
+    assert bytes(key) == _create_symmetric_key(4, b"1" * 32)
+
+
+@pytest.mark.parametrize(
+    "key_class,key,version",
+    [
+        (SymmetricKey, b"k4.public.AAAA", 4),
+        (PublicKey, b"k4.secret.AAAA", 4),
+        (SecretKey, b"k4.local.AAAA", 4),
+        (SymmetricKey, b"k3.local.AAAA", 3),
+    ],
+)
+def test_key_invalid(key_class: type[SymmetricKey], key: bytes, version: int) -> None:
+    """Test that exception is raised when parsing a key of another type or version."""
+    with pytest.raises(InvalidKey):
+        key_class(key, version)
+
+
+def test_key_from_raw_invalid_version() -> None:
+    """Test that exception is raised for unsupported versions."""
+    with pytest.raises(InvalidKey):
+        SymmetricKey.from_raw(b"0" * 32, version=3)
+
+
+def get_paserk_test_cases(paserk_type: str) -> list[dict]:
+    """Return test cases of official PASERK test vectors of paserk_type."""
+    path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        "submodules",
+        "test-vectors",
+        "PASERK",
+        f"{paserk_type}.json",
+    )
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)["tests"]
+
+
+PASERK_ID_TEST_CASES = [
+    (key_class, test_case)
+    for key_class, paserk_type in [
+        (SymmetricKey, "k4.lid"),
+        (PublicKey, "k4.pid"),
+        (SecretKey, "k4.sid"),
+    ]
+    for test_case in get_paserk_test_cases(paserk_type)
+]
+
+
+@pytest.mark.parametrize(
+    "key_class,test_case",
+    PASERK_ID_TEST_CASES,
+    ids=[test_case["name"] for _, test_case in PASERK_ID_TEST_CASES],
+)
+def test_paserk_id(key_class: type[Key], test_case: dict) -> None:
+    """Test PASERK IDs against official test vectors, one key and in bulk."""
+    key = key_class.from_raw(bytes.fromhex(test_case["key"]))
+    assert key.paserk_id == test_case["paserk"]
+    assert paserk_ids([key_class.from_raw(key.raw)]) == [test_case["paserk"]]
+
+
+def test_paserk_id_memoized() -> None:
+    """Test that IDs are computed once per key object, in bulk or not."""
+    keys = [SymmetricKey.from_raw(bytes([index]) * 32) for index in range(3)]
+    ids = paserk_ids([keys[0], keys[1], keys[0], PublicKey.from_raw(b"0" * 32)])
+    assert ids[0] == ids[2] == keys[0].paserk_id
+    assert ids[3].startswith("k4.pid.")
+    assert keys[1]._paserk_id == ids[1]  # pylint: disable=protected-access
+    assert keys[2]._paserk_id is None  # pylint: disable=protected-access
+    assert keys[2].paserk_id == keys[2]._paserk_id  # pylint: disable=protected-access
+
+
+def test_key_index() -> None:
+    """Test finding keys by PASERK ID."""
+    keys = [SymmetricKey.from_raw(bytes([index]) * 32) for index in range(3)]
+    index = KeyIndex(keys[:2])
+    assert len(index) == 2
+    assert index.get(keys[1].paserk_id) is keys[1]
+    assert keys[2].paserk_id not in index
+    assert index.get(keys[2].paserk_id) is None
+    assert index.add(keys[2]) == keys[2].paserk_id
+    assert index.get(keys[2].paserk_id) is keys[2]
@@ -1,9 +1,21 @@
 """This module contains tests for common building blocks used in several protocol versions."""
 
+from collections.abc import Callable, Iterator
+
 import pytest
 
-from paseto.exceptions import InvalidFooter, InvalidHeader
-from paseto.protocol.common import check_footer, check_header, decode_message
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidToken
+from paseto.protocol import version2, version4
+from paseto.protocol.common import (
+    SizeLimits,
+    check_footer,
+    check_header,
+    decode_message,
+    encoded_size,
+    get_size_limits,
+    parse_token,
+    set_size_limits,
+)
 from paseto.protocol.util import b64
 
 
@@ -43,3 +55,138 @@ def test_verify_header_exception() -> None:
 def test_decode_message(message: bytes, header: bytes, expected: bytes) -> None:
     """Check message decoding."""
     assert decode_message(message, len(header)) == expected
+
+
+@pytest.mark.parametrize(
+    "token, header, payload, footer",
+    [
+        (b"v4.local.payload.footer", b"v4.local.", b"payload", b"footer"),
+        (b"v4.public.payload", b"v4.public.", b"payload", b""),
+        (b"v4.local.payload.", b"v4.local.", b"payload", b""),
+        (b"v4.local.", b"v4.local.", b"", b""),
+        (b"v4.local.payload.foo.bar", b"v4.local.", b"payload", b"foo.bar"),
+        (b"v4.local", b"", b"v4.local", b""),
+        (b"payload", b"", b"payload", b""),
+        (b"", b"", b"", b""),
+    ],
+)
+def test_parse_token(
+    token: bytes, header: bytes, payload: bytes, footer: bytes
+) -> None:
+    """Check that tokens are split into header, payload and footer."""
+    parsed = parse_token(token)
+    assert isinstance(parsed.payload, memoryview)
+    assert (parsed.header, parsed.payload, parsed.footer) == (header, payload, footer)
+
+
+def test_parsed_token_checks() -> None:
+    """Check footer and header validation and decoding of a parsed token."""
+    parsed = parse_token(b"v4.local." + b64(b"message") + b"." + b64(b"footer"))
+    parsed.check_header(b"v4.local.")
+    parsed.check_footer(b64(b"footer"))
+    parsed.check_footer(b"")
+    assert parsed.decode_payload() == b"message"
+    assert parsed.decode_footer() == b"footer"
+    assert parse_token(b"v4.local." + b64(b"message")).decode_footer() == b""
+    with pytest.raises(InvalidHeader):
+        parsed.check_header(b"v4.public.")
+    with pytest.raises(InvalidFooter):
+        parsed.check_footer(b64(b"other"))
+    with pytest.raises(InvalidFooter):
+        parse_token(
+            b"v4.local.payload." + b64(b"foo") + b"." + b64(b"foo")
+        ).check_footer(b64(b"foo"))
+
+
+@pytest.fixture
+def small_limits() -> Iterator[SizeLimits]:
+    """Use small size limits in a test."""
+    limits = SizeLimits(token=150, payload=100, footer=10)
+    previous = set_size_limits(limits)
+    yield limits
+    set_size_limits(previous)
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.parametrize(
+    "token, min_payload_size",
+    [
+        (b"v4.local." + b64(b"x" * 100), 64),
+        (b"v4.local." + b64(b"x" * 64) + b"." + b64(b"x" * 10), 64),
+        (b"v4.local." + b64(b"x" * 64) + b"." + b"." * 10, 64),
+    ],
+)
+def test_check_structure(token: bytes, min_payload_size: int) -> None:
+    """Check tokens within size limits."""
+    parse_token(token).check_structure(min_payload_size)
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.parametrize(
+    "token, min_payload_size, error",
+    [
+        (b"v4.local." + b64(b"x" * 101), 64, "payload size"),
+        (b"v4.local." + b64(b"x" * 63), 64, "payload size"),
+        (b"v4.local." + b64(b"x" * 64) + b"AAA", 64, "payload size"),
+        (b"v4.local." + b64(b"x" * 64) + b"." + b64(b"x" * 11), 64, "Footer"),
+        (b"v4.local." + b64(b"x" * 64) + b"." + b"." * 20, 64, "Footer"),
+    ],
+)
+def test_check_structure_invalid(
+    token: bytes, min_payload_size: int, error: str
+) -> None:
+    """Check that tokens outside of size limits are rejected."""
+    with pytest.raises(InvalidToken, match=error):
+        parse_token(token).check_structure(min_payload_size)
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.parametrize(
+    "token",
+    [b"v4.local." + b64(b"x" * 100) + b"." + b64(b"x" * 10), b"v4.local." + b"." * 150],
+)
+def test_parse_token_too_large(token: bytes) -> None:
+    """Check that tokens larger than the limit are rejected before they are split."""
+    with pytest.raises(InvalidToken, match="Token"):
+        parse_token(token)
+
+
+@pytest.mark.parametrize("payload", [b"AAAA+AAA", b"AAAA/AAA", b"AA=A", b"AAA AAAA"])
+def test_decode_payload_invalid(payload: bytes) -> None:
+    """Check that payloads outside of the base64url alphabet are rejected."""
+    with pytest.raises(InvalidToken, match="base64url"):
+        parse_token(b"v4.local." + payload).decode_payload()
+
+
+@pytest.mark.parametrize("footer", [b"AAAA+AAA", b"AA=A", b"AAAAA", b"AAAA!"])
+def test_decode_footer_invalid(footer: bytes) -> None:
+    """Check that footers outside of the base64url alphabet are rejected."""
+    with pytest.raises(InvalidToken, match="Footer is not base64url"):
+        parse_token(b"v4.local.AAAA." + footer).decode_footer()
+
+
+def test_size_limits() -> None:
+    """Check default limits and that protocol functions apply them."""
+    assert get_size_limits() == SizeLimits()
+    assert encoded_size(3) == 4
+    assert encoded_size(64) == 86
+    v4_key = version4.create_symmetric_key()
+    v4_public_key, v4_secret_key = version4.create_asymmetric_key()
+    tokens: list[tuple[Callable[..., bytes], bytes, bytes]] = [
+        (version4.decrypt, version4.encrypt(b"x" * 100, v4_key), v4_key),
+        (version4.verify, version4.sign(b"x" * 100, v4_secret_key), v4_public_key),
+        (version2.decrypt, version2.encrypt(b"x" * 100, b"0" * 32), b"0" * 32),
+    ]
+    previous = set_size_limits(SizeLimits(payload=100))
+    try:
+        for function, token, key in tokens:
+            with pytest.raises(InvalidToken):
+                function(token, key)
+    finally:
+        set_size_limits(previous)
+    for function, token, key in tokens:
+        assert function(token, key) == b"x" * 100
+    with pytest.raises(InvalidToken):
+        version2.verify(b"v2.public." + b64(b"x" * 63), b"0" * 32)
+    with pytest.raises(InvalidToken):
+        version4.local_codec(v4_key).decode(b"v4.local." + b64(b"x" * 63))
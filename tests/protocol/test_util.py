@@ -1,8 +1,19 @@
 """This module contains unit tests for util module."""
 
+import hashlib
+import tracemalloc
+from collections.abc import Iterator
+
 import pytest
 
-from paseto.protocol.util import b64, b64decode, padding_size, pae
+from paseto.protocol.util import (
+    b64,
+    b64_chunks,
+    b64decode,
+    padding_size,
+    pae,
+    pae_update,
+)
 
 
 # https://tools.ietf.org/html/draft-paragon-paseto-rfc-00#section-2.2.1
@@ -83,6 +94,36 @@ def test_pae_input_type() -> None:
         pae(())  # type: ignore
 
 
+@pytest.mark.parametrize(
+    "pieces", [[], [b""], [b"test"], [b"one", b"two", b"three"], [b"x" * 1000, b""]]
+)
+def test_pae_update(pieces: list[bytes]) -> None:
+    """Check that pae_update() hashes the same byte stream as pae()."""
+    hash_object = hashlib.blake2b()
+    pae_update(hash_object, list(pieces))
+    assert hash_object.digest() == hashlib.blake2b(pae(pieces)).digest()
+
+
+def test_pae_update_input_type() -> None:
+    """Check that exception is raised for invalid input types."""
+    with pytest.raises(TypeError):
+        pae_update(hashlib.blake2b(), ())  # type: ignore
+
+
+def test_pae_update_memory() -> None:
+    """Check that peak memory of pae_update() does not grow with input size."""
+
+    def peak_memory(piece: bytes) -> int:
+        hash_object = hashlib.blake2b()
+        tracemalloc.start()
+        pae_update(hash_object, [b"header", piece, b"footer"])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    assert peak_memory(b"x" * 2**20) <= peak_memory(b"x" * 16) + 256
+
+
 # test cases from https://tools.ietf.org/html/rfc4648#section-10 without the padding '='
 def test_b64_reference() -> None:
     """Test b64() with test cases from the base64 RFC."""
@@ -102,6 +143,27 @@ def test_b64_reference() -> None:
         assert b64decode(test_case[1]) == test_case[0]
 
 
+@pytest.mark.parametrize(
+    "chunks",
+    [[], [b""], [b"f"], [b"f", b"o", b"o", b"b"], [b"foob", b"ar"], [b"x" * 100] * 3],
+)
+def test_b64_chunks(chunks: list[bytes]) -> None:
+    """Test that encoding chunks gives the same result as encoding all input."""
+    assert b"".join(b64_chunks(chunks)) == b64(b"".join(chunks))
+
+
+def test_b64_chunks_reused_buffer() -> None:
+    """Test that chunks may be views of one buffer overwritten for every chunk."""
+    buffer = bytearray(4)
+
+    def chunks() -> Iterator[memoryview]:
+        for chunk in (b"foob", b"ar"):
+            buffer[: len(chunk)] = chunk
+            yield memoryview(buffer)[: len(chunk)]
+
+    assert b"".join(b64_chunks(chunks())) == b64(b"foobar")
+
+
 def test_padding_size() -> None:
     """Test padding size calculations, including impossible values."""
 
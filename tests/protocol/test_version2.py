@@ -3,8 +3,9 @@
 import pytest
 from pysodium import crypto_sign_seed_keypair, crypto_sign_SEEDBYTES
 
-from paseto.exceptions import InvalidFooter, InvalidHeader
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidKey
 from paseto.protocol import version2
+from tests.util import batch_results, corrupted_tokens, single_results, successful
 
 
 @pytest.mark.parametrize("footer", [b"", b"baz"])
@@ -44,3 +45,60 @@ def test_decrypt_invalid_header() -> None:
     """Check that exception is raised when header is not valid."""
     with pytest.raises(InvalidHeader):
         version2.decrypt(b"some_incorrect_header.message.footer", b"a key")
+
+
+@pytest.mark.parametrize("footer", [b"", b"some_footer"])
+def test_encrypt_decrypt_many(footer: bytes) -> None:
+    """Test that batch functions match single token functions item by item."""
+    key = b"0" * 32
+    messages = [b"", b"foo", b"x" * 1000]
+
+    tokens = successful(version2.encrypt_many(iter(messages), key, footer))
+    assert single_results(version2.decrypt, tokens, key, footer) == messages
+
+    items = corrupted_tokens(version2.encrypt(b"foo", key, b"f"), version2.HEADER_LOCAL)
+    assert batch_results(version2.decrypt_many(items, key, b"f")) == single_results(
+        version2.decrypt, items, key, b"f"
+    )
+
+
+@pytest.mark.parametrize("footer", [b"", b"some_footer"])
+def test_sign_verify_many(footer: bytes) -> None:
+    """Test that batch functions match single token functions item by item."""
+    public_key, secret_key = crypto_sign_seed_keypair(b"\x00" * crypto_sign_SEEDBYTES)
+    messages = [b"", b"foo", b"x" * 1000]
+
+    tokens = successful(version2.sign_many(messages, secret_key, footer))
+    assert tokens == single_results(version2.sign, messages, secret_key, footer)
+    assert version2.verify_many(tokens, public_key, footer) == messages
+
+    items = corrupted_tokens(version2.sign(b"foo", secret_key, b"f"), b"v2.public.")
+    assert batch_results(version2.verify_many(items, public_key, b"f")) == (
+        single_results(version2.verify, items, public_key, b"f")
+    )
+    with pytest.raises(InvalidKey):
+        version2.sign_many([b"foo"], public_key)
+    with pytest.raises(InvalidKey):
+        version2.verify_many(tokens, secret_key, footer)
+    with pytest.raises(InvalidKey):
+        version2.verify_many([], public_key[:-1])
+
+
+def test_codecs() -> None:
+    """Test that codecs produce and accept the same tokens as single token functions."""
+    key = b"0" * 32
+    public_key, secret_key = crypto_sign_seed_keypair(b"\x00" * crypto_sign_SEEDBYTES)
+
+    codec = version2.local_codec(key, footer=b"footer")
+    token = codec.encode(b"foo")
+    assert version2.decrypt(token, key, b"footer") == b"foo"
+    assert codec.decode(version2.encrypt(b"bar", key, b"footer")) == b"bar"
+
+    signer = version2.public_codec(secret_key, b"footer")
+    token = signer.encode(b"foo")
+    assert token == version2.sign(b"foo", secret_key, b"footer")
+    assert signer.decode(token) == b"foo"
+    verifier = version2.public_codec(public_key, b"footer")
+    assert verifier.decode(token) == b"foo"
+    with pytest.raises(ValueError, match="secret key"):
+        verifier.encode(b"foo")
@@ -1,11 +1,22 @@
 """This module contains test for version4.py"""
 
+import ctypes
+import hashlib
+import io
+import mmap
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
 import pytest
 
-from paseto.exceptions import InvalidKey, InvalidMac
-from paseto.paserk.keys import _create_symmetric_key
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidKey, InvalidMac
+from paseto.paserk.keys import PublicKey, SecretKey, SymmetricKey, _create_symmetric_key
 from paseto.protocol import version4
-from paseto.protocol.version4 import _verify_key
+from paseto.protocol.common import ParsedToken
+from paseto.protocol.util import b64decode, pae
+from paseto.protocol.version4 import _mac, _verify_key
+from tests.util import batch_results, corrupted_tokens, single_results, successful
 
 
 def test_encrypt_decrypt() -> None:
@@ -54,3 +65,362 @@ def test_verify_key() -> None:
     """Test that exception is raised when key is not verified."""
     with pytest.raises(InvalidKey):
         _verify_key(b"", b"some type")
+
+    _verify_key(version4.create_symmetric_key(), b".local.")
+
+
+def test_encrypt_decrypt_parsed_key() -> None:
+    """Test that parsed and serialized keys can be used interchangeably."""
+    message: bytes = b"foo"
+    key: bytes = version4.create_symmetric_key()
+    parsed_key = SymmetricKey(key)
+
+    assert version4.decrypt(version4.encrypt(message, parsed_key), key) == message
+    assert version4.decrypt(version4.encrypt(message, key), parsed_key) == message
+
+
+def test_sign_verify_parsed_key() -> None:
+    """Test that parsed and serialized keys can be used interchangeably."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    message = b"foo"
+
+    signed = version4.sign(message, SecretKey(secret_key))
+    assert version4.verify(signed, PublicKey(public_key)) == message
+    assert version4.verify(version4.sign(message, secret_key), public_key) == message
+
+
+def test_parsed_key_wrong_type() -> None:
+    """Test that exception is raised when parsed key has wrong type."""
+    public_key, secret_key = version4.create_asymmetric_key()
+
+    with pytest.raises(InvalidKey):
+        version4.encrypt(b"foo", PublicKey(public_key))  # type: ignore
+
+    with pytest.raises(InvalidKey):
+        version4.sign(b"foo", PublicKey(public_key))  # type: ignore
+
+    with pytest.raises(InvalidKey):
+        version4.verify(b"v4.public.", secret_key)
+
+
+def test_mac() -> None:
+    """Test that MAC is computed over PAE encoded pieces."""
+    pieces = [b"header", b"nonce", b"ciphertext", b"footer", b"assertion"]
+    expected = hashlib.blake2b(pae(pieces), key=b"k" * 32, digest_size=32).digest()
+    assert _mac(b"k" * 32, list(pieces)) == expected
+
+
+def test_mac_memory() -> None:
+    """Test that computing MAC does not copy the ciphertext."""
+
+    def peak_memory(ciphertext: bytes) -> int:
+        tracemalloc.start()
+        _mac(b"k" * 32, [version4.HEADER_LOCAL, b"n" * 32, ciphertext, b"f", b"i"])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    # first call allocates once, measured calls start warm
+    peak_memory(b"")
+    assert peak_memory(b"x" * 2**20) <= peak_memory(b"x" * 16) + 256
+
+
+def test_encrypt_decrypt_memory() -> None:
+    """Test that peak memory per token grows only with the token payload.
+
+    Base64 is patched out, its buffers are tied to the token and would hide a copy.
+    """
+    key = SymmetricKey(version4.create_symmetric_key())
+
+    def peak_memory(size: int) -> tuple[int, int, int]:
+        message = b"x" * size
+        token = version4.encrypt(message, key)
+        payload = b64decode(token[len(version4.HEADER_LOCAL) :])
+        forged = payload[:-1] + bytes([payload[-1] ^ 1])
+
+        with patch.object(version4, "b64", lambda data: b""):
+            tracemalloc.start()
+            version4.encrypt(message, key)
+            encrypt_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        with patch.object(ParsedToken, "decode_payload", lambda _: payload):
+            tracemalloc.start()
+            version4.decrypt(token, key)
+            decrypt_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        with patch.object(ParsedToken, "decode_payload", lambda _: forged):
+            tracemalloc.start()
+            with pytest.raises(InvalidMac):
+                version4.decrypt(token, key)
+            reject_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return encrypt_peak, decrypt_peak, reject_peak
+
+    small_encrypt, small_decrypt, small_reject = peak_memory(2**10)
+    large_encrypt, large_decrypt, large_reject = peak_memory(2**20)
+    growth = 2**20 - 2**10
+
+    # payload is assembled in place and copied neither into PAE nor into the MAC
+    assert large_encrypt - small_encrypt < growth + 4096
+    # writable copy of the payload is authenticated without any further copy
+    assert large_reject - small_reject < growth + 4096
+    # plus the returned message
+    assert large_decrypt - small_decrypt < 2 * growth + 4096
+
+
+def _encrypt_stream(message: bytes, key: bytes, **kwargs: bytes | int) -> bytes:
+    destination = io.BytesIO()
+    version4.encrypt_stream(io.BytesIO(message), destination, key, **kwargs)  # type: ignore
+    return destination.getvalue()
+
+
+def _decrypt_stream(token: bytes, key: bytes, **kwargs: bytes | int) -> bytes:
+    destination = io.BytesIO()
+    version4.decrypt_stream(io.BytesIO(token), destination, key, **kwargs)  # type: ignore
+    return destination.getvalue()
+
+
+@pytest.mark.parametrize(
+    "size", [0, 1, 2, 3, 31, 32, 63, 64, 65, 95, 96, 97, 191, 192, 193, 384, 1000]
+)
+@pytest.mark.parametrize(
+    "footer,implicit_assertion", [(b"", b""), (b"some footer", b"some assertion")]
+)
+def test_encrypt_decrypt_stream(
+    size: int, footer: bytes, implicit_assertion: bytes
+) -> None:
+    """Test that streaming functions are compatible with encrypt() and decrypt()."""
+    message: bytes = bytes(range(256)) * 4
+    message = message[:size]
+    key: bytes = version4.create_symmetric_key()
+    kwargs: dict[str, bytes | int] = {
+        "footer": footer,
+        "implicit_assertion": implicit_assertion,
+        "chunk_size": version4.STREAM_CHUNK_ALIGNMENT,
+    }
+
+    with patch.object(version4.os, "urandom", return_value=b"n" * 32):
+        token: bytes = _encrypt_stream(message, key, **kwargs)
+        assert token == version4.encrypt(message, key, footer, implicit_assertion)
+
+    assert _decrypt_stream(token, key, **kwargs) == message
+    assert version4.decrypt(token, key, footer, implicit_assertion) == message
+
+
+def test_decrypt_stream_mmap() -> None:
+    """Test that tokens can be decrypted from a memory mapped file."""
+    message: bytes = b"x" * 100_000
+    key = SymmetricKey(version4.create_symmetric_key())
+
+    with tempfile.TemporaryFile() as token_file:
+        token_file.write(version4.encrypt(message, key, b"footer"))
+        token_file.flush()
+        with mmap.mmap(token_file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            destination = io.BytesIO()
+            version4.decrypt_stream(source, destination, key, b"footer")
+
+    assert destination.getvalue() == message
+
+
+def test_decrypt_stream_footer_not_verified() -> None:
+    """Test that footer is not a part of the payload when it is not verified."""
+    key: bytes = version4.create_symmetric_key()
+    token: bytes = version4.encrypt(b"foo", key, b"footer")
+
+    with pytest.raises(InvalidMac):
+        _decrypt_stream(token, key)
+
+
+def test_decrypt_stream_invalid_mac() -> None:
+    """Test that no plaintext is written when MAC is not valid."""
+    key: bytes = version4.create_symmetric_key()
+    token: bytes = version4.encrypt(b"x" * 1000, key)
+    token = token[:-2] + (b"AA" if token[-2:] != b"AA" else b"BB")
+
+    destination = io.BytesIO()
+    with pytest.raises(InvalidMac):
+        version4.decrypt_stream(io.BytesIO(token), destination, key)
+    assert destination.getvalue() == b""
+
+
+@pytest.mark.parametrize(
+    "token,footer,exception",
+    [
+        (b"v4.local." + b"A" * 86, b"footer", InvalidFooter),
+        (b"v4.local", b"footer", InvalidFooter),
+        (b"v4.public." + b"A" * 86, b"", InvalidHeader),
+        (b"v4.local." + b"A" * 84, b"", InvalidMac),
+        (b"v4.local.", b"", InvalidMac),
+        (b"v4.local." + b"A" * 85, b"", ValueError),
+    ],
+)
+def test_decrypt_stream_invalid_token(
+    token: bytes, footer: bytes, exception: type[Exception]
+) -> None:
+    """Test that exceptions are raised for malformed tokens."""
+    key: bytes = version4.create_symmetric_key()
+    with pytest.raises(exception):
+        _decrypt_stream(token, key, footer=footer)
+
+
+@pytest.mark.parametrize("chunk_size", [0, -192, 64, 1000])
+def test_stream_invalid_chunk_size(chunk_size: int) -> None:
+    """Test that chunk size has to keep cipher blocks and base64 groups aligned."""
+    key: bytes = version4.create_symmetric_key()
+    with pytest.raises(ValueError, match="chunk_size"):
+        _encrypt_stream(b"foo", key, chunk_size=chunk_size)
+    with pytest.raises(ValueError, match="chunk_size"):
+        _decrypt_stream(b"v4.local.", key, chunk_size=chunk_size)
+
+
+def test_stream_short_reads() -> None:
+    """Test that sources returning fewer bytes than requested are supported."""
+    message: bytes = b"x" * 1000
+    key: bytes = version4.create_symmetric_key()
+
+    class ShortReads(io.BytesIO):
+        """Returns at most 7 bytes per read."""
+
+        def read(self, size: int | None = -1) -> bytes:
+            return super().read(7 if size is None or size < 0 else min(size, 7))
+
+    token = io.BytesIO()
+    version4.encrypt_stream(ShortReads(message), token, key, chunk_size=192)
+    assert version4.decrypt(token.getvalue(), key) == message
+
+    destination = io.BytesIO()
+    version4.decrypt_stream(ShortReads(token.getvalue()), destination, key)
+    assert destination.getvalue() == message
+
+
+def test_encrypt_stream_message_size_changed() -> None:
+    """Test that exception is raised when source changes size during encryption."""
+    key: bytes = version4.create_symmetric_key()
+    source = io.BytesIO(b"x" * 1000)
+    with (
+        patch.object(version4, "_remaining_size", return_value=2000),
+        pytest.raises(ValueError, match="size changed"),
+    ):
+        version4.encrypt_stream(source, io.BytesIO(), key)
+
+
+def test_stream_memory() -> None:
+    """Test that peak memory of streaming functions is bounded by the chunk size.
+
+    Every chunk is written into one buffer, no ctypes buffer is created per chunk.
+    """
+    message: bytes = b"x" * 2**22
+    key = SymmetricKey(version4.create_symmetric_key())
+    chunk_size: int = 64 * version4.STREAM_CHUNK_ALIGNMENT
+
+    with (
+        tempfile.TemporaryFile() as source,
+        tempfile.TemporaryFile() as token,
+        tempfile.TemporaryFile() as destination,
+        patch.object(ctypes, "create_string_buffer", side_effect=AssertionError),
+    ):
+        source.write(message)
+        source.seek(0)
+
+        tracemalloc.start()
+        version4.encrypt_stream(source, token, key, chunk_size=chunk_size)
+        token.seek(0)
+        version4.decrypt_stream(token, destination, key, chunk_size=chunk_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    assert peak < 16 * chunk_size
+
+
+@pytest.mark.parametrize(
+    "footer,implicit_assertion", [(b"", b""), (b"some footer", b"some assertion")]
+)
+def test_encrypt_decrypt_many(footer: bytes, implicit_assertion: bytes) -> None:
+    """Test that batch functions match single token functions item by item."""
+    key = SymmetricKey(version4.create_symmetric_key())
+    messages = [b"", b"foo", b"x" * 1000]
+
+    tokens = successful(
+        version4.encrypt_many(iter(messages), key, footer, implicit_assertion)
+    )
+    assert single_results(
+        version4.decrypt, tokens, key, footer, implicit_assertion
+    ) == (messages)
+
+    items = corrupted_tokens(version4.encrypt(b"foo", key, b"f"), version4.HEADER_LOCAL)
+    assert batch_results(version4.decrypt_many(items, key, b"f")) == single_results(
+        version4.decrypt, items, key, b"f"
+    )
+    assert not version4.decrypt_many([], key)
+
+
+@pytest.mark.parametrize(
+    "footer,implicit_assertion", [(b"", b""), (b"some footer", b"some assertion")]
+)
+def test_sign_verify_many(footer: bytes, implicit_assertion: bytes) -> None:
+    """Test that batch functions match single token functions item by item."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    messages = [b"", b"foo", b"x" * 1000]
+
+    tokens = successful(
+        version4.sign_many(messages, secret_key, footer, implicit_assertion)
+    )
+    assert tokens == single_results(
+        version4.sign, messages, secret_key, footer, implicit_assertion
+    )
+    assert version4.verify_many(tokens, public_key, footer, implicit_assertion) == (
+        messages
+    )
+
+    items = corrupted_tokens(version4.sign(b"foo", secret_key, b"f"), b"v4.public.")
+    assert batch_results(version4.verify_many(items, public_key, b"f")) == (
+        single_results(version4.verify, items, public_key, b"f")
+    )
+
+
+def test_batch_invalid_key() -> None:
+    """Test that an unusable key fails the whole batch."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    with pytest.raises(InvalidKey):
+        version4.encrypt_many([b"foo"], public_key)
+    with pytest.raises(InvalidKey):
+        version4.decrypt_many([b"foo"], secret_key)
+    with pytest.raises(InvalidKey):
+        version4.sign_many([b"foo"], public_key)
+    with pytest.raises(InvalidKey):
+        version4.verify_many([b"foo"], secret_key)
+
+
+def test_codecs() -> None:
+    """Test that codecs produce and accept the same tokens as single token functions."""
+    key = version4.create_symmetric_key()
+    public_key, secret_key = version4.create_asymmetric_key()
+    footer, implicit_assertion = b"some footer", b"some assertion"
+
+    codec = version4.local_codec(
+        key, footer=footer, implicit_assertion=implicit_assertion
+    )
+    token = codec.encode(b"foo")
+    assert version4.decrypt(token, key, footer, implicit_assertion) == b"foo"
+    assert codec.decode(version4.encrypt(b"bar", key, footer, implicit_assertion)) == (
+        b"bar"
+    )
+    with pytest.raises(InvalidFooter):
+        version4.local_codec(key, b"other footer").decode(token)
+
+    signer = version4.public_codec(SecretKey(secret_key), footer, implicit_assertion)
+    token = signer.encode(b"foo")
+    assert token == version4.sign(b"foo", secret_key, footer, implicit_assertion)
+    assert signer.decode(token) == b"foo"
+    verifier = version4.public_codec(public_key, footer, implicit_assertion)
+    assert verifier.decode(token) == b"foo"
+    assert version4.public_codec(PublicKey(public_key), footer).decode(
+        version4.sign(b"bar", secret_key, footer)
+    ) == (b"bar")
+    with pytest.raises(InvalidKey):
+        verifier.encode(b"foo")
+    with pytest.raises(InvalidKey):
+        version4.public_codec(key)
@@ -0,0 +1,186 @@
+"""This module contains tests for the asyncio token client."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from paseto.aio import AsyncTokenClient
+from paseto.exceptions import InvalidFooter, InvalidKey
+from paseto.protocol import version2, version4
+
+FOOTER = b"footer"
+ASSERTION = b"assertion"
+
+
+def test_round_trip() -> None:
+    """Test every operation against single token functions."""
+    key = version4.create_symmetric_key()
+    public_key, secret_key = version4.create_asymmetric_key()
+
+    async def run() -> None:
+        client = AsyncTokenClient()
+        token = await client.encrypt(b"foo", key, FOOTER, ASSERTION)
+        assert version4.decrypt(token, key, FOOTER, ASSERTION) == b"foo"
+        assert await client.decrypt(token, key, FOOTER, ASSERTION) == b"foo"
+        token = await client.sign(b"bar", secret_key, FOOTER, ASSERTION)
+        assert token == version4.sign(b"bar", secret_key, FOOTER, ASSERTION)
+        assert await client.verify(token, public_key, FOOTER, ASSERTION) == b"bar"
+        with pytest.raises(ValueError):
+            await client.verify(token, public_key, FOOTER)
+
+    asyncio.run(run())
+
+
+def test_coalesce() -> None:
+    """Test that concurrent calls with equal arguments share one batch."""
+    key, other_key = b"0" * 32, b"1" * 32
+    batch_many = MagicMock(wraps=version2.encrypt_many)
+    messages = [str(number).encode() for number in range(20)]
+
+    async def run() -> list[bytes]:
+        # full batches are dispatched without waiting for the window to pass
+        client = AsyncTokenClient(batch_window=60, max_batch_size=10)
+        tokens = await asyncio.gather(
+            *(client.submit(batch_many, message, key) for message in messages)
+        )
+        client = AsyncTokenClient(batch_window=0)
+        tokens += await asyncio.gather(
+            client.submit(batch_many, b"a", key),
+            client.submit(batch_many, b"b", other_key),
+            client.submit(batch_many, b"c", key),
+        )
+        return tokens
+
+    tokens = asyncio.run(run())
+    assert [call.args[0] for call in batch_many.call_args_list] == [
+        messages[:10],
+        messages[10:],
+        [b"a", b"c"],
+        [b"b"],
+    ]
+    assert [version2.decrypt(token, key) for token in tokens[:20]] == messages
+    assert version2.decrypt(tokens[21], other_key) == b"b"
+
+
+def test_errors() -> None:
+    """Test that failing items and failing batches raise in their callers."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    token = version4.sign(b"foo", secret_key, FOOTER)
+
+    def failing_many(items: list[bytes]) -> list[bytes | Exception]:
+        raise InvalidKey
+
+    async def run() -> list[bytes | BaseException]:
+        client = AsyncTokenClient()
+        results = await asyncio.gather(
+            client.verify(token, public_key, FOOTER),
+            client.verify(token, public_key, b"other"),
+            client.submit(failing_many, b"foo"),
+            client.submit(failing_many, b"bar"),
+            return_exceptions=True,
+        )
+        return list(results)
+
+    results = asyncio.run(run())
+    assert results[0] == b"foo"
+    assert isinstance(results[1], InvalidFooter)
+    assert isinstance(results[2], InvalidKey)
+    assert isinstance(results[3], InvalidKey)
+
+
+def test_cancel() -> None:
+    """Test that cancelled calls are dropped before dispatch and ignored after."""
+    started, release = threading.Event(), threading.Event()
+    calls: list[list[bytes]] = []
+
+    def blocking_many(items: list[bytes]) -> list[bytes | Exception]:
+        calls.append(items)
+        started.set()
+        release.wait(5)
+        return list(items)
+
+    async def run() -> None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            client = AsyncTokenClient(executor, batch_window=0.01)
+            kept = asyncio.ensure_future(client.submit(blocking_many, b"kept"))
+            dropped = asyncio.ensure_future(client.submit(blocking_many, b"dropped"))
+            await asyncio.sleep(0)
+            dropped.cancel()
+            await asyncio.to_thread(started.wait, 5)
+
+            # cancelled while running, its result is discarded
+            running = asyncio.ensure_future(client.submit(blocking_many, b"running"))
+            await asyncio.sleep(0.05)
+            running.cancel()
+            release.set()
+            assert await kept == b"kept"
+            with pytest.raises(asyncio.CancelledError):
+                await running
+
+            # a batch whose every call was cancelled is not dispatched
+            cancelled = asyncio.ensure_future(client.submit(blocking_many, b"none"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert calls == [[b"kept"], [b"running"]]
+
+
+def test_cancelled_executor() -> None:
+    """Test that callers are cancelled when the executor drops their batch."""
+
+    async def run() -> None:
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        client = AsyncTokenClient(executor, batch_window=0)
+        executor.submit(release.wait, 5)
+        waiting = asyncio.ensure_future(
+            client.submit(version2.encrypt_many, b"a", b"0" * 32)
+        )
+        await asyncio.sleep(0.01)
+        executor.shutdown(wait=False, cancel_futures=True)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(run())
+
+
+def test_in_flight_limit() -> None:
+    """Test that calls beyond max_in_flight wait for earlier results."""
+    release = threading.Event()
+    sizes: list[int] = []
+
+    def blocking_many(items: list[bytes]) -> list[bytes | Exception]:
+        sizes.append(len(items))
+        release.wait(5)
+        return list(items)
+
+    async def run() -> list[bytes]:
+        client = AsyncTokenClient(batch_window=0, max_in_flight=2)
+        calls = asyncio.gather(*(client.submit(blocking_many, b"x") for _ in range(5)))
+        await asyncio.sleep(0.05)
+        assert sizes == [2]
+        release.set()
+        return await calls
+
+    assert asyncio.run(run()) == [b"x"] * 5
+    assert sum(sizes) == 5
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        {"batch_window": -1},
+        {"max_batch_size": 0},
+        {"max_in_flight": 0},
+    ],
+)
+def test_invalid_limits(arguments: dict[str, float]) -> None:
+    """Test exception when limits can not be satisfied."""
+    with pytest.raises(ValueError):
+        AsyncTokenClient(**arguments)  # type: ignore[arg-type]
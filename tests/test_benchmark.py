@@ -1,65 +1,55 @@
 """This module contains benchmark tests intended to guide development of a performant codebase."""
 
+import ctypes
 import hashlib
 
-import nacl.bindings
 import pysodium
 import pytest
 from pytest_benchmark.fixture import BenchmarkFixture
 
-from paseto.crypto import primitives
-from paseto.protocol import version2
+from paseto.crypto import libsodium_wrapper, primitives
+from paseto.paserk.keys import PublicKey, SymmetricKey
+from paseto.protocol import version2, version4
 
 KEY = b"0" * 32
 MESSAGE = b"foo"
 FOOTER = b"sample_footer"
 
 
-@pytest.mark.benchmark(group="encrypt")
-def test_encrypt_one(benchmark: BenchmarkFixture) -> None:
-    """Benchmark only encryption."""
-    primitives.encrypt = nacl.bindings.crypto_aead_xchacha20poly1305_ietf_encrypt
-
-    token = benchmark(version2.encrypt, MESSAGE, KEY, FOOTER)
-    plain_text = version2.decrypt(token, KEY, FOOTER)
-    assert plain_text == MESSAGE
+BACKENDS = ["pysodium", "pynacl", "ctypes"]
+HASH_BACKENDS = ["hashlib", "pysodium", "pynacl", "ctypes"]
 
 
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", BACKENDS)
 @pytest.mark.benchmark(group="encrypt")
-def test_encrypt_two(benchmark: BenchmarkFixture) -> None:
+def test_encrypt(benchmark: BenchmarkFixture, backend: str) -> None:
     """Benchmark only encryption."""
-    primitives.encrypt = pysodium.crypto_aead_xchacha20poly1305_ietf_encrypt
+    primitives.use_backend(backend)
 
     token = benchmark(version2.encrypt, MESSAGE, KEY, FOOTER)
     plain_text = version2.decrypt(token, KEY, FOOTER)
     assert plain_text == MESSAGE
 
 
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", BACKENDS)
 @pytest.mark.benchmark(group="decrypt")
-def test_decrypt_one(benchmark: BenchmarkFixture) -> None:
+def test_decrypt(benchmark: BenchmarkFixture, backend: str) -> None:
     """Benchmark only decryption."""
-    primitives.decrypt = nacl.bindings.crypto_aead_xchacha20poly1305_ietf_decrypt
-
-    token = version2.encrypt(MESSAGE, KEY, FOOTER)
-    plain_text = benchmark(version2.decrypt, token, KEY, FOOTER)
-    assert plain_text == MESSAGE
-
-
-@pytest.mark.benchmark(group="decrypt")
-def test_decrypt_two(benchmark: BenchmarkFixture) -> None:
-    """Benchmark only decryption."""
-    primitives.decrypt = pysodium.crypto_aead_xchacha20poly1305_ietf_decrypt
+    primitives.use_backend(backend)
 
     token = version2.encrypt(MESSAGE, KEY, FOOTER)
     plain_text = benchmark(version2.decrypt, token, KEY, FOOTER)
     assert plain_text == MESSAGE
 
 
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", BACKENDS)
 @pytest.mark.benchmark(group="encrypt_and_decrypt")
-def test_encrypt_and_decrypt_one(benchmark: BenchmarkFixture) -> None:
+def test_encrypt_and_decrypt(benchmark: BenchmarkFixture, backend: str) -> None:
     """Benchmark encryption and decryption run together."""
-    primitives.encrypt = nacl.bindings.crypto_aead_xchacha20poly1305_ietf_encrypt
-    primitives.decrypt = nacl.bindings.crypto_aead_xchacha20poly1305_ietf_decrypt
+    primitives.use_backend(backend)
 
     def encrypt_and_decrypt() -> bytes:
         token = version2.encrypt(MESSAGE, KEY, FOOTER)
@@ -69,43 +59,143 @@ def test_encrypt_and_decrypt_one(benchmark: BenchmarkFixture) -> None:
     assert plain_text == MESSAGE
 
 
-@pytest.mark.benchmark(group="encrypt_and_decrypt")
-def test_encrypt_and_decrypt_two(benchmark: BenchmarkFixture) -> None:
-    """Benchmark encryption and decryption run together."""
-    primitives.decrypt = pysodium.crypto_aead_xchacha20poly1305_ietf_decrypt
-    primitives.encrypt = pysodium.crypto_aead_xchacha20poly1305_ietf_encrypt
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.benchmark(group="sign_and_verify")
+def test_sign_and_verify(benchmark: BenchmarkFixture, backend: str) -> None:
+    """Benchmark signing and verification run together."""
+    primitives.use_backend(backend)
+    public_key, secret_key = pysodium.crypto_sign_keypair()
 
-    def encrypt_and_decrypt() -> bytes:
-        token = version2.encrypt(MESSAGE, KEY, FOOTER)
-        return version2.decrypt(token, KEY, FOOTER)
+    def sign_and_verify() -> bytes:
+        token = version2.sign(MESSAGE, secret_key, FOOTER)
+        return version2.verify(token, public_key, FOOTER)
 
-    plain_text = benchmark(encrypt_and_decrypt)
-    assert plain_text == MESSAGE
+    message = benchmark(sign_and_verify)
+    assert message == MESSAGE
 
 
-def test_hash_functions() -> None:
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", HASH_BACKENDS)
+def test_hash_functions(backend: str) -> None:
     """Test that hash functions produce the same digest."""
+    blake2b = primitives.use_hash_backend(backend).blake2b
     assert (
-        pysodium.crypto_generichash(MESSAGE, KEY)
+        blake2b(MESSAGE, KEY, 32)
         == hashlib.blake2b(MESSAGE, key=KEY, digest_size=32).digest()
     )
 
 
+@pytest.mark.usefixtures("restore_backends")
+@pytest.mark.parametrize("backend", HASH_BACKENDS)
 @pytest.mark.benchmark(group="hash")
-def test_hash_one(benchmark: BenchmarkFixture) -> None:
+def test_hash(benchmark: BenchmarkFixture, backend: str) -> None:
     """Benchmark hash function."""
+    blake2b = primitives.use_hash_backend(backend).blake2b
 
-    def hash_one() -> None:
-        pysodium.crypto_generichash(MESSAGE, KEY)
+    benchmark(blake2b, MESSAGE, KEY, 32)
 
-    benchmark(hash_one)
 
+@pytest.mark.benchmark(group="v4_decrypt_key")
+def test_v4_decrypt_serialized_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.local decryption with key parsed on every call."""
+    key = version4.create_symmetric_key()
+    token = version4.encrypt(MESSAGE, key, FOOTER)
 
-@pytest.mark.benchmark(group="hash")
-def test_hash_two(benchmark: BenchmarkFixture) -> None:
-    """Benchmark hash function."""
+    plain_text = benchmark(version4.decrypt, token, key, FOOTER)
+    assert plain_text == MESSAGE
+
+
+@pytest.mark.benchmark(group="v4_decrypt_key")
+def test_v4_decrypt_parsed_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.local decryption with key parsed once."""
+    key = SymmetricKey(version4.create_symmetric_key())
+    token = version4.encrypt(MESSAGE, key, FOOTER)
+
+    plain_text = benchmark(version4.decrypt, token, key, FOOTER)
+    assert plain_text == MESSAGE
 
-    def hash_two() -> None:
-        hashlib.blake2b(MESSAGE, key=KEY, digest_size=32).digest()
 
-    benchmark(hash_two)
+@pytest.mark.benchmark(group="v4_verify_key")
+def test_v4_verify_serialized_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.public verification with key parsed on every call."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    token = version4.sign(MESSAGE, secret_key, FOOTER)
+
+    message = benchmark(version4.verify, token, public_key, FOOTER)
+    assert message == MESSAGE
+
+
+@pytest.mark.benchmark(group="v4_verify_key")
+def test_v4_verify_parsed_key(benchmark: BenchmarkFixture) -> None:
+    """Benchmark v4.public verification with key parsed once."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    parsed_public_key = PublicKey(public_key)
+    token = version4.sign(MESSAGE, secret_key, FOOTER)
+
+    message = benchmark(version4.verify, token, parsed_public_key, FOOTER)
+    assert message == MESSAGE
+
+
+def legacy_crypto_stream_xchacha20_xor(
+    message: bytes, nonce: bytes, key: bytes
+) -> bytes:
+    """Previous wrapper, looks up sizes and copies result on every call."""
+    # pylint: disable=protected-access
+    sodium = libsodium_wrapper._sodium
+    if len(nonce) != sodium.crypto_stream_xchacha20_noncebytes():
+        raise ValueError("incorrect nonce size")
+    if len(key) != sodium.crypto_stream_xchacha20_keybytes():
+        raise ValueError("incorrect key size")
+    ciphertext = ctypes.create_string_buffer(len(message))
+    sodium.crypto_stream_xchacha20_xor(
+        ciphertext, message, ctypes.c_longlong(len(message)), nonce, key
+    )
+    return ciphertext.raw
+
+
+XOR_NONCE = b"0" * 24
+
+
+@pytest.mark.parametrize("size", [64, 65536])
+@pytest.mark.benchmark(group="xchacha20_xor")
+def test_xor_legacy(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark previous ctypes wrapper."""
+    message = b"x" * size
+    result = benchmark(legacy_crypto_stream_xchacha20_xor, message, XOR_NONCE, KEY)
+    assert result == libsodium_wrapper.crypto_stream_xchacha20_xor(
+        message, XOR_NONCE, KEY
+    )
+
+
+@pytest.mark.parametrize("size", [64, 65536])
+@pytest.mark.benchmark(group="xchacha20_xor")
+def test_xor(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark ctypes wrapper with prototypes resolved once."""
+    message = b"x" * size
+    benchmark(libsodium_wrapper.crypto_stream_xchacha20_xor, message, XOR_NONCE, KEY)
+
+
+@pytest.mark.parametrize("writable", [False, True], ids=["bytes", "bytearray"])
+@pytest.mark.parametrize("size", [64, 65536])
+@pytest.mark.benchmark(group="xchacha20_xor")
+def test_xor_memoryview(benchmark: BenchmarkFixture, size: int, writable: bool) -> None:
+    """Benchmark ctypes wrapper with a zero copy slice of bytes or bytearray as input.
+
+    Slices of bytes are exported with PyObject_GetBuffer(), of bytearray shared with
+    ctypes.
+    """
+    data = b"x" * (size + 64)
+    message = memoryview(bytearray(data) if writable else data)[32:-32]
+    benchmark(libsodium_wrapper.crypto_stream_xchacha20_xor, message, XOR_NONCE, KEY)
+
+
+@pytest.mark.parametrize("size", [64, 65536])
+@pytest.mark.benchmark(group="xchacha20_xor")
+def test_xor_out(benchmark: BenchmarkFixture, size: int) -> None:
+    """Benchmark ctypes wrapper writing into a preallocated buffer."""
+    message = b"x" * size
+    out = bytearray(size)
+    benchmark(
+        libsodium_wrapper.crypto_stream_xchacha20_xor, message, XOR_NONCE, KEY, out
+    )
@@ -0,0 +1,293 @@
+"""This module contains tests for caches of keys and verified tokens."""
+
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
+
+import pytest
+
+from paseto.cache import BloomFilter, LRUCache, NegativeCache, TokenCache
+from paseto.exceptions import InvalidMac, RejectedToken
+
+
+def test_lru_cache() -> None:
+    """Test that the least recently used item is evicted and counters are kept."""
+    evicted: list[tuple[str, int]] = []
+    cache: LRUCache[str, int] = LRUCache(
+        2, lambda key, value: evicted.append((key, value))
+    )
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert evicted == [("b", 2)]
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    assert len(cache) == 1
+    cache.clear()
+    assert not cache
+    assert evicted == [("b", 2)]
+
+
+def test_get_or_create() -> None:
+    """Test that factory is only called on a miss."""
+    calls: list[str] = []
+
+    def factory(key: str) -> str:
+        calls.append(key)
+        return key.upper()
+
+    cache: LRUCache[str, str] = LRUCache(1)
+    assert cache.get_or_create("a", factory) == "A"
+    assert cache.get_or_create("a", factory) == "A"
+    assert cache.get_or_create("b", factory) == "B"
+    assert calls == ["a", "b"]
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 1)
+
+
+def test_get_or_create_race() -> None:
+    """Test that a value cached while factory ran is returned instead of its own."""
+    cache: LRUCache[str, str] = LRUCache(1)
+
+    def factory(key: str) -> str:
+        cache.put(key, "first")
+        return "second"
+
+    assert cache.get_or_create("a", factory) == "first"
+    assert cache.get("a") == "first"
+
+
+def test_invalid_size() -> None:
+    """Test exception for caches that can not hold any item."""
+    with pytest.raises(ValueError, match="positive"):
+        LRUCache(0)
+
+
+class FakeClock:  # pylint: disable=too-few-public-methods
+    """Clock advanced by tests."""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+PAYLOAD = b'{"sub":"a"}'
+
+
+def claims(expiry: float | str | None) -> bytes:
+    """Return JSON payload with exp claim."""
+    if isinstance(expiry, float):
+        expiry = datetime.fromtimestamp(expiry, timezone.utc).isoformat()
+    return json.dumps({"exp": expiry}).encode()
+
+
+def test_token_cache() -> None:
+    """Test that payloads are cached per token, key ID, footer and implicit assertion."""
+    cache = TokenCache()
+    cache.put(b"token", "kid", PAYLOAD, b"footer", b"assertion")
+    assert cache.get(b"token", "kid", b"footer", b"assertion") == PAYLOAD
+    assert cache.get(b"token", "kid", b"footer") is None
+    assert cache.get(b"token", "other", b"footer", b"assertion") is None
+    assert cache.get(b"token", "kidfooter", b"", b"assertion") is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.put(b"token", "kid", PAYLOAD, b"footer", b"assertion")
+    assert len(cache) == 1
+    cache.clear()
+    assert not cache
+    assert cache.size == 0
+
+
+def test_token_cache_decode() -> None:
+    """Test that decode runs only on a miss and failures are not cached."""
+    cache = TokenCache()
+    calls: list[bytes] = []
+
+    def decode(token: bytes) -> bytes:
+        calls.append(token)
+        if token == b"invalid":
+            raise InvalidMac
+        return PAYLOAD
+
+    assert cache.decode(b"token", "kid", decode) == PAYLOAD
+    assert cache.decode(b"token", "kid", decode) == PAYLOAD
+    for _ in range(2):
+        with pytest.raises(InvalidMac):
+            cache.decode(b"invalid", "kid", decode)
+    assert calls == [b"token", b"invalid", b"invalid"]
+
+
+def test_token_cache_expiry() -> None:
+    """Test that entries never outlive the exp claim of their token or max_ttl."""
+    clock = FakeClock()
+    cache = TokenCache(max_ttl=60, clock=clock)
+    cache.put(b"a", "kid", claims(clock.now + 10))
+    cache.put(b"b", "kid", b"{}")
+    cache.put(b"c", "kid", claims(clock.now + 3600))
+    cache.put(b"expired", "kid", claims(clock.now - 1))
+    assert len(cache) == 3
+    clock.now += 10
+    assert cache.get(b"a", "kid") is None
+    assert cache.get(b"b", "kid") == b"{}"
+    clock.now += 50
+    assert cache.get(b"b", "kid") is None
+    assert cache.get(b"c", "kid") is None
+    assert cache.expirations == 3
+    assert not cache
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        claims("2999-01-01T00:00:00"),
+        claims("tomorrow"),
+        json.dumps({"exp": 1}).encode(),
+        b"{not json",
+    ],
+)
+def test_token_cache_invalid_expiry(payload: bytes) -> None:
+    """Test that tokens with an exp claim that can not be parsed are not cached."""
+    cache = TokenCache()
+    cache.put(b"token", "kid", payload)
+    assert not cache
+
+
+def test_token_cache_payloads() -> None:
+    """Test that only payloads with a known expiry are cached."""
+    cache = TokenCache()
+    cache.put(b"a", "kid", b" {}")
+    cache.put(b"b", "kid", claims("2999-01-01T00:00:00Z"))
+    for payload in (b"not json", b"[]", b"[" * 100_000, claims(None)):
+        cache.put(payload, "kid", payload)
+    assert len(cache) == 2
+    # codecs other than JSON supply the expiry of their payloads
+    clock = FakeClock()
+    cache = TokenCache(max_ttl=60, clock=clock, expiry=lambda _: clock.now + 10)
+    cache.put(b"binary", "kid", b"\x07\x00")
+    clock.now += 10
+    assert cache.get(b"binary", "kid") is None
+    assert cache.expirations == 1
+
+
+def test_token_cache_byte_budget() -> None:
+    """Test that least recently used entries are evicted to stay within max_bytes."""
+    cache = TokenCache(max_bytes=1500, expiry=lambda _: math.inf)
+    for token in (b"a", b"b", b"c"):
+        cache.put(token, "kid", b"x" * 300)
+    assert cache.get(b"a", "kid")
+    cache.put(b"d", "kid", b"x" * 300)
+    assert cache.get(b"b", "kid") is None
+    assert cache.get(b"c", "kid")
+    assert cache.evictions == 1
+    assert cache.size <= 1500
+    cache.put(b"e", "kid", b"x" * 1400)
+    assert cache.get(b"e", "kid") is None
+    assert len(cache) == 3
+
+
+def test_token_cache_invalidate() -> None:
+    """Test that entries of a revoked key are removed at once."""
+    cache = TokenCache()
+    cache.put(b"a", "old", PAYLOAD)
+    cache.put(b"b", "old", PAYLOAD)
+    cache.put(b"c", "new", PAYLOAD)
+    assert cache.invalidate("old") == 2
+    assert cache.invalidate("old") == 0
+    assert cache.get(b"a", "old") is None
+    assert cache.get(b"c", "new") == PAYLOAD
+    assert len(cache) == 1
+
+
+def test_token_cache_invalid_size() -> None:
+    """Test exception for caches that can not hold any entry."""
+    with pytest.raises(ValueError, match="positive"):
+        TokenCache(0)
+    with pytest.raises(ValueError, match="positive"):
+        TokenCache(max_ttl=0)
+
+
+def fail(token: bytes) -> bytes:
+    """Decode function rejecting every token."""
+    raise InvalidMac(token)
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_negative_cache(approximate: bool) -> None:
+    """Test that tokens failing to decode are rejected without decoding again."""
+    cache = NegativeCache(approximate=approximate)
+    with pytest.raises(InvalidMac):
+        cache.decode(b"token", fail, b"context")
+    with pytest.raises(RejectedToken):
+        cache.decode(b"token", fail, b"context")
+    with pytest.raises(InvalidMac):
+        cache.decode(b"token", fail)
+    assert cache.decode(b"other", lambda token: token) == b"other"
+    assert cache.rejected(b"token")
+    assert not cache.rejected(b"token", b"other context")
+    assert not cache.rejected(b"other")
+    assert (cache.hits, cache.misses, cache.additions) == (2, 5, 2)
+    cache.clear()
+    assert not cache.rejected(b"token")
+
+
+def test_negative_cache_exact() -> None:
+    """Test that exact entries expire after ttl and the oldest are dropped."""
+    clock = FakeClock()
+    cache = NegativeCache(2, ttl=10, clock=clock)
+    cache.add(b"a")
+    clock.now += 5
+    cache.add(b"b")
+    cache.add(b"a")
+    cache.add(b"c")
+    assert len(cache) == 2
+    assert not cache.rejected(b"b")
+    clock.now += 9
+    assert cache.rejected(b"a")
+    clock.now += 1
+    assert not cache.rejected(b"a")
+    cache.add(b"d")
+    assert len(cache) == 1
+
+
+def test_negative_cache_approximate() -> None:
+    """Test that approximate entries are kept between ttl and twice ttl."""
+    clock = FakeClock()
+    cache = NegativeCache(100, ttl=10, approximate=True, clock=clock)
+    cache.add(b"a")
+    clock.now += 10
+    cache.add(b"b")
+    assert cache.rejected(b"a")
+    clock.now += 10
+    assert not cache.rejected(b"a")
+    assert cache.rejected(b"b")
+    clock.now += 20
+    assert not cache.rejected(b"b")
+    assert not cache
+
+
+def test_bloom_filter() -> None:
+    """Test that added digests are found and the false positive rate is bounded."""
+    bloom_filter = BloomFilter(1000, 0.01)
+    digests = [
+        hashlib.blake2b(index.to_bytes(4, "little"), digest_size=16).digest()
+        for index in range(1000)
+    ]
+    for digest in digests[:500]:
+        bloom_filter.add(digest)
+    assert all(digest in bloom_filter for digest in digests[:500])
+    assert sum(digest in bloom_filter for digest in digests[500:]) < 25
+    bloom_filter.clear()
+    assert not any(digest in bloom_filter for digest in digests[:500])
+
+
+def test_negative_cache_invalid() -> None:
+    """Test exceptions for invalid sizes and error rates."""
+    with pytest.raises(ValueError, match="positive"):
+        NegativeCache(0)
+    with pytest.raises(ValueError, match="error_rate"):
+        NegativeCache(approximate=True, error_rate=1)
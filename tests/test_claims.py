@@ -0,0 +1,288 @@
+"""This module contains tests for encoding, decoding and validating claims."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+
+from paseto.claims import (
+    ClaimsTemplate,
+    ClaimsValidator,
+    CoarseClock,
+    LazyClaims,
+    decode_claims,
+    encode_claims,
+    format_time,
+    parse_time,
+)
+from paseto.exceptions import InvalidClaims
+
+NOW = 1_700_000_000.0
+
+
+def validator(**rules: Any) -> ClaimsValidator:
+    """Return validator of rules with the clock stopped at NOW."""
+    rules.setdefault("clock", lambda: NOW)
+    return ClaimsValidator(**rules)
+
+
+def at(offset: float) -> str:
+    """Return time offset seconds from NOW as claim."""
+    return format_time(NOW + offset)
+
+
+def test_encode_decode() -> None:
+    """Test that datetimes are encoded as ISO 8601 strings and read back."""
+    expiration = datetime.fromtimestamp(NOW, timezone.utc) + timedelta(hours=1)
+    payload = encode_claims({"sub": "foo", "exp": expiration})
+    assert payload == b'{"sub":"foo","exp":"2023-11-14T23:13:20+00:00"}'
+    claims = decode_claims(payload)
+    assert parse_time(claims["exp"]) == NOW + 3600
+    with pytest.raises(TypeError, match="not JSON serializable"):
+        encode_claims({"exp": object()})
+    with pytest.raises(InvalidClaims, match="not JSON"):
+        decode_claims(b"foo")
+    with pytest.raises(InvalidClaims, match="not a JSON object"):
+        decode_claims(b"[]")
+
+
+def test_time() -> None:
+    """Test parsing and formatting times with a time zone."""
+    assert parse_time("2023-11-14T22:13:20Z") == NOW
+    assert parse_time("2023-11-14T23:13:20+01:00") == NOW
+    assert format_time(NOW) == "2023-11-14T22:13:20+00:00"
+    assert parse_time("2023-11-14t22:13:20.999z") == NOW
+    assert parse_time("2023-11-14T22:13:20.1Z") == NOW
+    assert parse_time("2023-11-14T23:13:20.123456789+01:00") == NOW
+    assert parse_time("1969-12-31T23:59:59.5Z") == -1
+    assert parse_time("2023-11-14T18:13:20-04:00") == NOW
+    assert parse_time("1969-12-31T23:59:59Z") == -1
+    assert parse_time("2024-02-29T00:00:00Z") == 1_709_164_800
+    assert parse_time("0001-01-01T00:00:00Z") == -62_135_596_800
+    assert parse_time("9999-12-31T23:59:59Z") == 253_402_300_799
+    with pytest.raises(TypeError, match="not int"):
+        parse_time(1)
+    with pytest.raises(ValueError, match="time zone"):
+        format_time(datetime(2023, 11, 14))  # noqa: DTZ001
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2023-11-14T22:13:20",
+        "2023-11-14",
+        "yesterday",
+        "2023-11-14 22:13:20Z",
+        "2023-11-14T22:13:20+0100",
+        "2023-13-14T22:13:20Z",
+        "2023-00-14T22:13:20Z",
+        "2023-02-29T22:13:20Z",
+        "2023-11-00T22:13:20Z",
+        "2023-11-14T24:13:20Z",
+        "2023-11-14T22:60:20Z",
+        "2023-11-14T22:13:60Z",
+        "2023-11-14T22:13:20+24:00",
+        "2023-11-14T22:13:20Z\n",
+        "\u0662023-11-14T22:13:20Z",
+        "2024-01-01T00:00+00:00",
+        "2024-01-01T00:00:+00:00",
+        "2024-01-01T00:00:00,5Z",
+        "2024-W01-1T00:00:00Z",
+        "2024-01-01T00:00:00.Z",
+        "2024-01-01T00:00:00+01:60",
+        "2024-01-01T00:00:00+0100",
+        "20240101T000000Z",
+    ],
+)
+def test_invalid_time(value: str) -> None:
+    """Test that only the RFC 3339 subset of PASETO is parsed."""
+    with pytest.raises(ValueError, match="Invalid time"):
+        parse_time(value)
+
+
+def test_parse_time_matches_datetime() -> None:
+    """Test parsing against datetime for every day of a leap and a common year."""
+    start = datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
+    for day in range(2 * 366):
+        time = start + timedelta(days=day, hours=day % 24)
+        local_time = time.astimezone(timezone(timedelta(hours=-5)))
+        assert parse_time(time.isoformat()) == time.timestamp()
+        assert parse_time(local_time.isoformat()) == time.timestamp()
+
+
+def test_coarse_clock() -> None:
+    """Test that the coarse clock is updated at most once per tick."""
+    now = [NOW + 0.5]
+    clock = CoarseClock(2.0, lambda: now[0])
+    assert clock() == NOW
+    now[0] += 1.9
+    assert clock() == NOW
+    now[0] += 0.1
+    assert clock() == NOW + 2
+    assert validator(clock=clock).check({"exp": at(2)}) == "Token has expired"
+    with pytest.raises(ValueError, match="positive"):
+        CoarseClock(0)
+
+
+def test_valid_claims() -> None:
+    """Test claims passing every rule."""
+    claims = {
+        "iss": "issuer",
+        "sub": "subject",
+        "aud": "b",
+        "exp": at(60),
+        "nbf": at(-60),
+        "iat": at(-60),
+        "jti": "id",
+    }
+    rules = validator(
+        issuer="issuer",
+        subject="subject",
+        audience=["a", "b"],
+        required=["jti"],
+        max_age=120,
+    )
+    assert rules.check(claims) is None
+    rules.validate(claims)
+    assert rules.decode(encode_claims(claims)) == claims
+    assert validator().check({}) is None
+
+
+@pytest.mark.parametrize(
+    "rules, claims, reason",
+    [
+        ({"issuer": "a"}, {}, "Missing claim iss"),
+        ({"required": ["jti", "exp"]}, {"sub": "a"}, "Missing claim exp"),
+        ({"max_age": 60}, {"exp": at(60)}, "Missing claim iat"),
+        ({"issuer": "a"}, {"iss": "b"}, "Invalid iss claim"),
+        ({"subject": "a"}, {"sub": ["a"]}, "Invalid sub claim"),
+        ({"audience": "a"}, {"aud": "b"}, "Invalid aud claim"),
+        ({}, {"exp": at(0)}, "Token has expired"),
+        ({"leeway": 10}, {"exp": at(-10)}, "Token has expired"),
+        ({}, {"nbf": at(1)}, "Token is not valid yet"),
+        ({}, {"iat": at(1)}, "Token is issued in the future"),
+        ({"max_age": 60}, {"iat": at(-61)}, "Token is too old"),
+        ({}, {"exp": "tomorrow"}, "Invalid exp claim"),
+        ({}, {"nbf": 1}, "Invalid nbf claim"),
+        ({}, {"iat": "2023-11-14"}, "Invalid iat claim"),
+        ({}, {"exp": at(0), "nbf": at(1)}, "Token has expired"),
+        ({}, {"exp": None}, "Invalid exp claim"),
+        ({}, {"nbf": None}, "Invalid nbf claim"),
+        ({}, {"iat": None}, "Invalid iat claim"),
+        ({"issuer": "a"}, {"iss": None}, "Invalid iss claim"),
+        ({"subject": "a"}, {"sub": None}, "Invalid sub claim"),
+        ({"audience": "a"}, {"aud": None}, "Invalid aud claim"),
+    ],
+)
+def test_invalid_claims(
+    rules: dict[str, Any], claims: dict[str, Any], reason: str
+) -> None:
+    """Test that the reason of the first failing rule is reported."""
+    assert validator(**rules).check(claims) == reason
+    with pytest.raises(InvalidClaims, match=reason):
+        validator(**rules).validate(claims)
+
+
+def test_leeway() -> None:
+    """Test that leeway tolerates clock skew in both directions."""
+    rules = validator(leeway=10, max_age=60)
+    assert rules.check({"exp": at(-9), "nbf": at(10), "iat": at(-70)}) is None
+    assert rules.check({"iat": at(10)}) is None
+
+
+@pytest.mark.parametrize(
+    "claims, dynamic",
+    [
+        (
+            {"iss": "a", "exp": None, "sub": "b", "iat": None, "jti": None},
+            ["exp", "iat", "jti"],
+        ),
+        ({"exp": None, "data": {"é": [1, 2.5, True, None]}}, ["exp"]),
+        ({"sub": "a", "exp": None}, ["exp"]),
+        ({"exp": None}, ["exp"]),
+        ({"sub": "a"}, []),
+        ({}, []),
+    ],
+)
+def test_template(claims: dict[str, Any], dynamic: list[str]) -> None:
+    """Test that templates encode the same JSON as encode_claims()."""
+    template = ClaimsTemplate(claims, dynamic)
+    for values in (
+        {"exp": at(60), "iat": 1_700_000_000, "jti": 'a"€'},
+        {"exp": datetime.fromtimestamp(NOW, timezone.utc), "iat": 1.5, "jti": True},
+        {"exp": None, "iat": [1], "jti": {"a": "b"}},
+    ):
+        values = {name: values[name] for name in dynamic}
+        assert template.encode(values) == encode_claims({**claims, **values})
+
+
+def test_template_errors() -> None:
+    """Test that dynamic claims must be in the template and have values."""
+    with pytest.raises(ValueError, match=r"\['exp'\] are not in claims"):
+        ClaimsTemplate({"sub": "a"}, ["exp"])
+    template = ClaimsTemplate({"sub": "a", "exp": None, "iat": None}, ["exp", "iat"])
+    with pytest.raises(ValueError, match="exactly"):
+        template.encode({"exp": 1})
+    with pytest.raises(ValueError, match="Value of 'iat'"):
+        template.encode({"exp": 1, "jti": 2})
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b'{"sub":"a","scope":"read","perms":{"sub":["x"]},"n":[1,2.5,null,true]}',
+        b' {\n  "sub" : "a" ,\t"scope":"b"\r} ',
+        b'{"sub":"a","scope":"b","sub":"c"}',
+        b'{"\\u0073ub":"a","sub":"b","scope":"\\"sub\\""}',
+        b'{"scope":"sub"}',
+        '{"sub":"é","€":1}'.encode(),
+        b"\xef\xbb\xbf" + b'{"sub":"a"}',
+        b"{}",
+    ],
+)
+def test_lazy_claims(payload: bytes) -> None:
+    """Test that lazy claims equal the claims of decode_claims()."""
+    claims = decode_claims(payload)
+    assert LazyClaims(payload).project(["sub", "scope"]) == {
+        key: claims[key] for key in ("sub", "scope") if key in claims
+    }
+    lazy = LazyClaims(payload)
+    for key in ("sub", "scope", "missing"):
+        assert lazy.get(key) == claims.get(key)
+    assert dict(lazy) == claims
+    assert len(lazy) == len(claims)
+    assert list(LazyClaims(payload)) == list(claims)
+
+
+def test_lazy_claims_partial() -> None:
+    """Test that claims after those read are not parsed."""
+    lazy = LazyClaims(b'{"sub":"a","scope":"b","perms":{"broken"}')
+    assert lazy.project(["scope", "sub"]) == {"scope": "b", "sub": "a"}
+    assert lazy["sub"] == "a"
+    with pytest.raises(InvalidClaims, match="not JSON"):
+        lazy.get("perms")
+    # keys repeated in claims already parsed do not stop early projection
+    lazy = LazyClaims(b'{"perms":{"sub":1},"sub":"a","scope":"b","x":{"broken"}')
+    assert lazy.project(["sub"]) == {"sub": "a"}
+    assert lazy.project([]) == {}
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b'{"sub":"a",}',
+        b'{"sub" "a"}',
+        b'{"sub":"a" "scope":"b"}',
+        b'{"sub":}',
+        b'{"sub":"a"',
+        b'{"sub":"a"} {}',
+        b'{"sub":"a"}}',
+        b"{sub:1}",
+        b"[]",
+        b"\xff",
+    ],
+)
+def test_lazy_claims_malformed(payload: bytes) -> None:
+    """Test that malformed payloads raise InvalidClaims once they are scanned."""
+    with pytest.raises(InvalidClaims):
+        dict(LazyClaims(payload))
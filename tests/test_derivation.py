@@ -0,0 +1,55 @@
+"""This module contains tests for deriving keys of tenants from a master key."""
+
+import pytest
+
+from paseto.derivation import KeyDeriver
+from paseto.exceptions import InvalidKey
+from paseto.paserk.keys import Key, SymmetricKey
+from paseto.protocol import version4
+
+MASTER_KEY = version4.create_symmetric_key()
+
+
+def test_derived_keys() -> None:
+    """Test that keys are deterministic and differ between tenants and purposes."""
+    deriver = KeyDeriver(MASTER_KEY)
+    other = KeyDeriver(SymmetricKey(MASTER_KEY), cache_size=1)
+    assert deriver.local_key("tenant").raw == other.local_key(b"tenant").raw
+    assert deriver.secret_key("tenant").raw == other.secret_key("tenant").raw
+    assert deriver.local_key("tenant").raw != deriver.local_key("other").raw
+    assert deriver.local_key("tenant").raw != deriver.secret_key("tenant").raw[:32]
+    assert (
+        KeyDeriver(version4.create_symmetric_key()).local_key("tenant").raw
+        != deriver.local_key("tenant").raw
+    )
+
+
+def test_derived_keys_are_usable() -> None:
+    """Test that derived key objects work with the version4 functions."""
+    deriver = KeyDeriver(MASTER_KEY)
+    token = version4.encrypt(b"foo", deriver.local_key("tenant"))
+    assert version4.decrypt(token, deriver.local_key("tenant")) == b"foo"
+    token = version4.sign(b"foo", deriver.secret_key("tenant"))
+    assert version4.verify(token, deriver.public_key("tenant")) == b"foo"
+
+
+def test_cache() -> None:
+    """Test that derived keys are cached, counted and evicted."""
+    evicted: list[tuple[tuple[str, bytes], Key]] = []
+    deriver = KeyDeriver(
+        MASTER_KEY, cache_size=2, on_evict=lambda *item: evicted.append(item)
+    )
+    key = deriver.local_key("a")
+    assert deriver.local_key("a") is key
+    deriver.secret_key("a")
+    deriver.local_key("b")
+    assert evicted == [(("v4.local", b"a"), key)]
+    assert deriver.local_key("a") is not key
+    assert (deriver.cache.hits, deriver.cache.misses) == (1, 4)
+    assert deriver.cache.evictions == 2
+
+
+def test_invalid_master_key() -> None:
+    """Test that the master key must be a v4.local key."""
+    with pytest.raises(InvalidKey):
+        KeyDeriver(version4.create_asymmetric_key()[1])
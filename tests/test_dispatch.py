@@ -0,0 +1,115 @@
+"""This module contains tests for decoding tokens of any version and purpose."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pysodium import crypto_sign_seed_keypair, crypto_sign_SEEDBYTES
+
+import paseto
+from paseto import dispatch
+from paseto.dispatch import UNKNOWN_PURPOSE, Decoder
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidKey
+from paseto.paserk.keys import PublicKey
+from paseto.protocol import version2, version4
+from paseto.protocol.common import parse_token
+
+FOOTER = b"footer"
+ASSERTION = b"assertion"
+V2_KEY = b"0" * 32
+V2_PUBLIC_KEY, V2_SECRET_KEY = crypto_sign_seed_keypair(b"\x00" * crypto_sign_SEEDBYTES)
+V4_KEY = version4.create_symmetric_key()
+V4_PUBLIC_KEY, V4_SECRET_KEY = version4.create_asymmetric_key()
+
+KEYRING = {
+    "v2.local": V2_KEY,
+    "v2.public": V2_PUBLIC_KEY,
+    "v4.local": V4_KEY,
+    "v4.public": PublicKey(V4_PUBLIC_KEY),
+}
+
+TOKENS = {
+    "v2.local": version2.encrypt(b"v2.local", V2_KEY, FOOTER),
+    "v2.public": version2.sign(b"v2.public", V2_SECRET_KEY, FOOTER),
+    "v4.local": version4.encrypt(b"v4.local", V4_KEY, FOOTER, ASSERTION),
+    "v4.public": version4.sign(b"v4.public", V4_SECRET_KEY, FOOTER, ASSERTION),
+}
+
+
+def test_decoder() -> None:
+    """Test that every purpose is routed to its implementation and counted."""
+    decoder = Decoder(KEYRING, FOOTER, ASSERTION)
+    for purpose, token in TOKENS.items():
+        assert decoder.decode(token) == purpose.encode()
+    assert decoder.decode(TOKENS["v4.local"]) == b"v4.local"
+    assert decoder.stats.decoded == {
+        "v2.local": 1,
+        "v2.public": 1,
+        "v4.local": 2,
+        "v4.public": 1,
+    }
+    assert not decoder.stats.failed
+
+
+def test_decoder_bytearray(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that tokens in writable buffers are routed like bytes."""
+    monkeypatch.setattr(dispatch, "stats", dispatch.DecodeStats())
+    decoder = Decoder(KEYRING, FOOTER, ASSERTION)
+    for purpose, token in TOKENS.items():
+        assert decoder.decode(bytearray(token)) == purpose.encode()
+        assert paseto.decode(bytearray(token), KEYRING, FOOTER, ASSERTION) == (
+            purpose.encode()
+        )
+        assert dispatch.token_purpose(parse_token(bytearray(token))) == purpose
+    assert decoder.stats.decoded == dispatch.stats.decoded == dict.fromkeys(TOKENS, 1)
+
+
+def test_decoder_threads() -> None:
+    """Test that no counts are lost when threads share a decoder."""
+    decoder = Decoder(KEYRING, FOOTER, ASSERTION)
+    tokens = list(TOKENS.values()) * 500
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(decoder.decode, tokens))
+    assert decoder.stats.decoded == dict.fromkeys(TOKENS, 500)
+
+
+def test_decoder_errors() -> None:
+    """Test that failures raise the exception of the implementation and are counted."""
+    decoder = Decoder({"v4.public": V4_PUBLIC_KEY}, FOOTER, ASSERTION)
+    with pytest.raises(InvalidKey, match="v4.local"):
+        decoder.decode(TOKENS["v4.local"])
+    with pytest.raises(InvalidHeader):
+        decoder.decode(b"v3.public." + TOKENS["v4.public"][len(b"v4.public.") :])
+    with pytest.raises(InvalidHeader):
+        decoder.decode(b"")
+    with pytest.raises(InvalidFooter):
+        Decoder({"v4.public": V4_PUBLIC_KEY}, b"other").decode(TOKENS["v4.public"])
+    with pytest.raises(ValueError):
+        Decoder({"v4.public": V4_PUBLIC_KEY}, FOOTER).decode(TOKENS["v4.public"])
+    assert decoder.stats.failed == {"v4.local": 1, UNKNOWN_PURPOSE: 2}
+    assert not decoder.stats.decoded
+
+
+def test_decoder_invalid_keyring() -> None:
+    """Test exceptions for keyrings that can not be used."""
+    with pytest.raises(ValueError, match="v3.local"):
+        Decoder({"v3.local": V4_KEY})
+    with pytest.raises(InvalidKey):
+        Decoder({"v4.local": V4_PUBLIC_KEY})
+
+
+def test_decode(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the top level function, which only creates the codec it needs."""
+    monkeypatch.setattr(dispatch, "stats", dispatch.DecodeStats())
+    keyring = {**KEYRING, "v4.local": V4_PUBLIC_KEY}
+    assert (
+        paseto.decode(TOKENS["v4.public"], keyring, FOOTER, ASSERTION) == b"v4.public"
+    )
+    assert paseto.decode(TOKENS["v2.local"], keyring, FOOTER) == b"v2.local"
+    with pytest.raises(InvalidKey):
+        paseto.decode(TOKENS["v4.local"], keyring, FOOTER, ASSERTION)
+    with pytest.raises(InvalidKey, match="v4.local"):
+        paseto.decode(TOKENS["v4.local"], {}, FOOTER)
+    with pytest.raises(InvalidHeader):
+        paseto.decode(b"v4.secret.foo", keyring)
+    assert dispatch.stats.decoded == {"v4.public": 1, "v2.local": 1}
+    assert dispatch.stats.failed == {"v4.local": 1, UNKNOWN_PURPOSE: 1}
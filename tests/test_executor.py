@@ -0,0 +1,247 @@
+"""This module contains tests for the parallel token executor."""
+
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future
+from multiprocessing.shared_memory import SharedMemory
+from unittest.mock import ANY
+
+import pytest
+
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidKey
+from paseto.executor import (
+    ProcessTokenExecutor,
+    TokenExecutor,
+    _initialize_worker,
+    _pack,
+    _PendingChunk,
+    _process_chunk,
+    _unpack,
+)
+from paseto.paserk.keys import Key, PublicKey, SymmetricKey
+from paseto.protocol import version2, version4
+from tests.util import successful
+
+FOOTER = b"footer"
+ASSERTION = b"assertion"
+
+
+def test_verify_preserves_order() -> None:
+    """Test that results of every token come back in input order."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    messages = [str(number).encode() for number in range(100)]
+    tokens = [
+        version4.sign(message, secret_key, FOOTER, ASSERTION) for message in messages
+    ]
+    tokens[7] = b"v2.public." + tokens[7][len(b"v4.public.") :]
+    tokens[42] = tokens[42].rpartition(b".")[0]
+
+    with TokenExecutor(max_workers=4, max_pending=3, chunk_size=5) as executor:
+        results = list(executor.verify(tokens, public_key, FOOTER, ASSERTION))
+        parsed_key = PublicKey(public_key)
+        assert list(executor.verify(tokens, parsed_key, FOOTER, ASSERTION)) == [
+            result if isinstance(result, bytes) else ANY for result in results
+        ]
+
+    assert isinstance(results[7], InvalidHeader)
+    assert isinstance(results[42], InvalidFooter)
+    del results[42], results[7], messages[42], messages[7]
+    assert results == messages
+
+
+def test_decrypt() -> None:
+    """Test that v4.local tokens are decrypted with raw or parsed keys."""
+    key = version4.create_symmetric_key()
+    messages = [b"x" * size for size in range(0, 3000, 100)]
+    tokens = [version4.encrypt(message, key, FOOTER) for message in messages]
+
+    with TokenExecutor(max_workers=2, chunk_size=4) as executor:
+        assert list(executor.decrypt(tokens, key, FOOTER)) == messages
+        assert (
+            list(executor.decrypt(iter(tokens), SymmetricKey(key), FOOTER)) == messages
+        )
+        assert not list(executor.decrypt([], key))
+
+
+def test_map_version2() -> None:
+    """Test that any batch function can be used."""
+    key = b"0" * 32
+    messages = [b"foo", b"bar", b"baz"]
+    with TokenExecutor(max_workers=2, chunk_size=2) as executor:
+        tokens = successful(list(executor.map(version2.encrypt_many, messages, key)))
+        assert list(executor.map(version2.decrypt_many, tokens, key)) == messages
+
+
+def test_invalid_key() -> None:
+    """Test that an unusable key raises before any token is processed."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    with TokenExecutor(max_workers=1) as executor:
+        with pytest.raises(InvalidKey):
+            executor.verify([], secret_key)
+        with pytest.raises(InvalidKey):
+            executor.decrypt([], public_key)
+
+
+def test_batch_error() -> None:
+    """Test that an exception failing a whole chunk is raised to the consumer."""
+
+    def failing_many(chunk: list[bytes]) -> list[bytes | Exception]:
+        raise InvalidKey
+
+    with TokenExecutor(max_workers=1) as executor, pytest.raises(InvalidKey):
+        list(executor.map(failing_many, [b"token"]))
+
+
+def test_backpressure() -> None:
+    """Test that input is read no further ahead than pending chunks allow."""
+    consumed = 0
+    key = b"0" * 32
+
+    def messages() -> Iterator[bytes]:
+        nonlocal consumed
+        for _ in range(1000):
+            consumed += 1
+            yield b"foo"
+
+    with TokenExecutor(max_workers=2, max_pending=3, chunk_size=10) as executor:
+        results = executor.map(version2.encrypt_many, messages(), key)
+        next(results)
+        assert consumed == 3 * 10
+        for _ in range(10):
+            next(results)
+        assert consumed == 4 * 10
+        results.close()
+        assert consumed == 4 * 10
+
+
+def test_close_cancels_pending() -> None:
+    """Test that chunks not started yet are cancelled when results are abandoned."""
+    release = threading.Event()
+    calls: list[list[bytes]] = []
+
+    def blocking_many(chunk: list[bytes]) -> list[bytes | Exception]:
+        calls.append(chunk)
+        if chunk != [b"a"]:
+            release.wait(5)
+        return list(chunk)
+
+    executor = TokenExecutor(max_workers=1, max_pending=4, chunk_size=1)
+    results = executor.map(blocking_many, [b"a", b"b", b"c", b"d"])
+    assert next(results) == b"a"
+    results.close()
+    release.set()
+    executor.shutdown()
+    assert [b"c"] not in calls
+    assert [b"d"] not in calls
+
+    with TokenExecutor(max_workers=1) as executor:
+        results = executor.map(blocking_many, [b"a"])
+        assert next(results) == b"a"
+        results.close()
+
+
+@pytest.mark.parametrize(
+    ("max_pending", "chunk_size"), [(0, 1), (1, 0), (-1, 1), (None, -5)]
+)
+def test_invalid_limits(max_pending: int | None, chunk_size: int) -> None:
+    """Test exception when limits can not be satisfied."""
+    with pytest.raises(ValueError, match="positive"):
+        TokenExecutor(max_pending=max_pending, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize(
+    ("footer", "implicit_assertion"), [(b"", b""), (FOOTER, ASSERTION)]
+)
+def test_process_round_trip(footer: bytes, implicit_assertion: bytes) -> None:
+    """Test every operation of the process pool against single token functions."""
+    key = version4.create_symmetric_key()
+    public_key, secret_key = version4.create_asymmetric_key()
+    messages = [b"x" * size for size in range(0, 200, 7)]
+
+    def run(operation: str, key: bytes | Key, items: list[bytes]) -> list[bytes]:
+        with ProcessTokenExecutor(
+            operation, key, footer, implicit_assertion, max_workers=2, chunk_size=4
+        ) as executor:
+            return successful(list(executor.map(items)))
+
+    tokens = run("encrypt", SymmetricKey(key), messages)
+    assert [
+        version4.decrypt(token, key, footer, implicit_assertion) for token in tokens
+    ] == (messages)
+    assert run("decrypt", key, tokens) == messages
+
+    tokens = run("sign", secret_key, messages)
+    assert tokens == [
+        version4.sign(message, secret_key, footer, implicit_assertion)
+        for message in messages
+    ]
+    assert run("verify", PublicKey(public_key), tokens) == messages
+
+
+def test_process_errors() -> None:
+    """Test that failing items get their exception in place of a result."""
+    public_key, secret_key = version4.create_asymmetric_key()
+    tokens = [version4.sign(b"foo", secret_key, FOOTER)] * 5
+    tokens[3] = b"v4.local." + tokens[3][len(b"v4.public.") :]
+
+    with ProcessTokenExecutor("verify", public_key, FOOTER, max_workers=1) as executor:
+        results = list(executor.map(tokens))
+        assert not list(executor.map([]))
+    assert isinstance(results[3], InvalidHeader)
+    del results[3]
+    assert results == [b"foo"] * 4
+
+
+def test_process_close_early() -> None:
+    """Test that abandoning results frees chunks in flight."""
+    key = version4.create_symmetric_key()
+    with ProcessTokenExecutor(
+        "encrypt", key, max_workers=1, max_pending=8, chunk_size=2
+    ) as executor:
+        results = executor.map(b"foo" for _ in range(100))
+        next(results)
+        results.close()
+
+
+def test_process_invalid_arguments() -> None:
+    """Test exceptions raised before any worker is started."""
+    public_key, _ = version4.create_asymmetric_key()
+    with pytest.raises(ValueError, match="Unknown operation"):
+        ProcessTokenExecutor("hash", public_key)
+    with pytest.raises(ValueError, match="positive"):
+        ProcessTokenExecutor("verify", public_key, chunk_size=0)
+    with pytest.raises(InvalidKey):
+        ProcessTokenExecutor("sign", public_key)
+
+
+def test_process_worker() -> None:
+    """Test worker functions in this process, where coverage is measured."""
+    key = version4.create_symmetric_key()
+    tokens = [
+        version4.encrypt(b"foo", key),
+        b"v4.local.AAAA",
+        version4.encrypt(b"", key),
+    ]
+    input_block = SharedMemory(create=True, size=4096)
+    output_block = SharedMemory(create=True, size=4096)
+    try:
+        _pack(tokens, input_block)
+        _initialize_worker("decrypt", key, b"", b"")
+        errors = _process_chunk(input_block.name, output_block.name, len(tokens))
+        assert list(errors) == [1]
+        assert _unpack(output_block, 3) == [b"foo", b"", b""]
+    finally:
+        for block in (input_block, output_block):
+            block.close()
+            block.unlink()
+
+
+def test_release_pending_chunk() -> None:
+    """Test that a chunk not started yet is cancelled and its blocks freed."""
+    future: Future[dict[int, Exception]] = Future()
+    blocks = [SharedMemory(create=True, size=16) for _ in range(2)]
+    _PendingChunk(future, blocks[0], blocks[1], 1).release()
+    assert future.cancelled()
+    for block in blocks:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(block.name)
@@ -0,0 +1,191 @@
+"""This module contains tests for keyrings with key rotation."""
+
+import pytest
+
+import paseto
+from paseto.cache import NegativeCache, TokenCache
+from paseto.exceptions import (
+    InvalidHeader,
+    InvalidKey,
+    InvalidMac,
+    InvalidToken,
+    RejectedToken,
+)
+from paseto.keyring import KeyState, footer_kid, kid_footer
+from paseto.paserk.keys import PublicKey, SecretKey, SymmetricKey
+from paseto.protocol import version2, version4
+
+OLD_KEY = version4.create_symmetric_key()
+NEW_KEY = version4.create_symmetric_key()
+PUBLIC_KEY, SECRET_KEY = version4.create_asymmetric_key()
+
+
+def create_keyring() -> paseto.Keyring:
+    """Return keyring with an old and a new local key and a public key."""
+    keyring = paseto.Keyring()
+    keyring.add("old", "v4.local", OLD_KEY)
+    keyring.add("new", "v4.local", NEW_KEY)
+    keyring.add("public", "v4.public", SECRET_KEY)
+    return keyring
+
+
+def test_encode_decode() -> None:
+    """Test that tokens name the newest active key and are decoded with it."""
+    keyring = create_keyring()
+    token = keyring.encode(b"foo", "v4.local", b"assertion")
+    assert version4.decrypt(token, NEW_KEY, b'{"kid":"new"}', b"assertion") == b"foo"
+    assert [kid for kid, _ in keyring.candidates(token)] == ["new"]
+    assert keyring.decode(token, b"assertion") == b"foo"
+    with pytest.raises(InvalidMac):
+        keyring.decode(token)
+    token = keyring.encode(b"bar", "v4.public")
+    assert keyring.decode(token) == b"bar"
+
+
+def test_rotation() -> None:
+    """Test that retiring keys only decode and retired keys reject their tokens."""
+    keyring = create_keyring()
+    token = keyring.encode(b"foo", "v4.local")
+    keyring.set_state("new", KeyState.RETIRING)
+    assert keyring.state("new") is KeyState.RETIRING
+    assert keyring.current("v4.local")[0] == "old"
+    assert keyring.decode(token) == b"foo"
+    keyring.set_state("new", KeyState.RETIRED)
+    with pytest.raises(InvalidKey, match="retired"):
+        keyring.decode(token)
+    keyring.set_state("old", KeyState.RETIRED)
+    with pytest.raises(InvalidKey, match="No active key"):
+        keyring.encode(b"foo", "v4.local")
+    keyring.remove("new")
+    assert "new" not in keyring
+    assert len(keyring) == 2
+    with pytest.raises(InvalidKey, match="No v4.local key with ID new"):
+        keyring.decode(token)
+    with pytest.raises(KeyError):
+        keyring.get("new")
+
+
+def test_trial_without_kid() -> None:
+    """Test that tokens without key ID are tried with active, then retiring keys."""
+    keyring = create_keyring()
+    keyring.add("retiring", "v4.local", SymmetricKey(OLD_KEY), KeyState.RETIRING)
+    keyring.add("retired", "v4.local", OLD_KEY, KeyState.RETIRED)
+    token = version4.encrypt(b"foo", OLD_KEY)
+    assert [kid for kid, _ in keyring.candidates(token)] == ["new", "old", "retiring"]
+    assert keyring.decode(token) == b"foo"
+    assert isinstance(keyring.get("old"), SymmetricKey)
+    with pytest.raises(InvalidMac):
+        keyring.decode(version4.encrypt(b"foo", version4.create_symmetric_key()))
+    with pytest.raises(InvalidKey, match="No key for v4.local"):
+        paseto.Keyring().decode(token)
+
+
+def test_add_key() -> None:
+    """Test that keys added by PASERK ID decode tokens naming that ID."""
+    keyring = paseto.Keyring()
+    local_key = SymmetricKey(NEW_KEY)
+    assert keyring.add_key(local_key) == local_key.paserk_id
+    public_kid = keyring.add_key(SecretKey(SECRET_KEY))
+    assert public_kid == PublicKey(PUBLIC_KEY).paserk_id
+    token = keyring.encode(b"foo", "v4.public")
+    assert version4.verify(token, PUBLIC_KEY, kid_footer(public_kid)) == b"foo"
+    verifying = paseto.Keyring()
+    assert verifying.add_key(PublicKey(PUBLIC_KEY), KeyState.RETIRING) == public_kid
+    assert verifying.decode(token) == b"foo"
+    assert keyring.decode(keyring.encode(b"bar", "v4.local")) == b"bar"
+
+
+def test_token_cache() -> None:
+    """Test that payloads of tokens with a key ID are cached until the key retires."""
+    first, second = b'{"sub":"foo"}', b'{"sub":"bar"}'
+    cache = TokenCache()
+    keyring = paseto.Keyring(cache)
+    keyring.add("old", "v4.local", OLD_KEY)
+    keyring.add("new", "v4.local", NEW_KEY)
+    token = keyring.encode(first, "v4.local", b"assertion")
+    for _ in range(2):
+        assert keyring.decode(token, b"assertion") == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    with pytest.raises(InvalidMac):
+        keyring.decode(token)
+    assert keyring.decode(version4.encrypt(second, OLD_KEY)) == second
+    assert len(cache) == 1
+    keyring.set_state("new", KeyState.RETIRING)
+    assert len(cache) == 1
+    keyring.set_state("new", KeyState.RETIRED)
+    assert not cache
+    with pytest.raises(InvalidKey, match="retired"):
+        keyring.decode(token, b"assertion")
+    keyring.decode(keyring.encode(first, "v4.local"))
+    keyring.remove("old")
+    assert not cache
+    keyring.remove("new")
+
+
+def test_negative_cache() -> None:
+    """Test that failed tokens are rejected until keys change."""
+    negative_cache = NegativeCache()
+    keyring = paseto.Keyring(negative_cache=negative_cache)
+    keyring.add("old", "v4.local", OLD_KEY)
+    token = version4.encrypt(b"foo", NEW_KEY, kid_footer("new"))
+    with pytest.raises(InvalidKey):
+        keyring.decode(token)
+    with pytest.raises(RejectedToken):
+        keyring.decode(token)
+    keyring.add("new", "v4.local", NEW_KEY)
+    assert keyring.decode(token) == b"foo"
+    with pytest.raises(InvalidMac):
+        keyring.decode(token, b"assertion")
+    with pytest.raises(RejectedToken):
+        keyring.decode(token, b"assertion")
+    assert negative_cache.additions == 2
+
+
+def test_decode_errors() -> None:
+    """Test tokens with a key ID of another purpose or an unsupported header."""
+    keyring = create_keyring()
+    keyring.add("v2", "v2.local", b"0" * 32)
+    token = version2.encrypt(b"foo", b"0" * 32, kid_footer("new"))
+    with pytest.raises(InvalidKey, match="No v2.local key with ID new"):
+        keyring.decode(token)
+    assert keyring.decode(version2.encrypt(b"foo", b"0" * 32, b"footer")) == b"foo"
+    with pytest.raises(InvalidHeader):
+        keyring.decode(b"v3.local.foo")
+    # footers nesting too deep for json are tried against every key
+    token = version4.encrypt(b"foo", OLD_KEY, b'{"kid":' + b"[" * 8000)
+    assert keyring.decode(token) == b"foo"
+    # malformed footers are rejected before any key is looked up
+    for token in (keyring.encode(b"foo", "v4.local") + b"!", b"v4.local.AAAA.AAAAA"):
+        with pytest.raises(InvalidToken, match="Footer"):
+            keyring.decode(token)
+
+
+def test_add_errors() -> None:
+    """Test that keys are validated when added."""
+    keyring = create_keyring()
+    with pytest.raises(ValueError, match="already exists"):
+        keyring.add("old", "v4.local", NEW_KEY)
+    with pytest.raises(ValueError, match="v3.local"):
+        keyring.add("v3", "v3.local", NEW_KEY)
+    with pytest.raises(InvalidKey):
+        keyring.add("other", "v4.local", PUBLIC_KEY)
+    assert len(keyring) == 3
+
+
+@pytest.mark.parametrize(
+    "footer, kid",
+    [
+        (b'{"kid":"foo"}', "foo"),
+        (b'{"kid": "foo", "wpk": "bar"}', "foo"),
+        (b'{"kid":1}', None),
+        (b'{"iss":"foo"}', None),
+        (b"{kid}", None),
+        pytest.param(b'{"kid":' + b"[" * 8000, None, id="unclosed"),
+        pytest.param(b'{"kid":' + b"[" * 8000 + b"]" * 8000 + b"}", None, id="nested"),
+        (b"kid", None),
+        (b"", None),
+    ],
+)
+def test_footer_kid(footer: bytes, kid: str | None) -> None:
+    """Test reading key ID from footers that may not be JSON."""
+    assert footer_kid(footer) == kid
@@ -0,0 +1,203 @@
+"""This module contains tests for payload codecs."""
+
+import inspect
+import json
+import sys
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from paseto import payload
+from paseto.claims import encode_claims
+from paseto.exceptions import InvalidFooter, InvalidHeader, InvalidPayload
+from paseto.payload import (
+    ClaimsCodec,
+    PayloadCodec,
+    codec_footer,
+    decode_binary,
+    encode_binary,
+    footer_codec,
+    get_codec,
+)
+from paseto.protocol import version2, version4
+
+KEY = version4.create_symmetric_key()
+PUBLIC_KEY, SECRET_KEY = version4.create_asymmetric_key()
+
+CLAIMS = {
+    "iss": "issuer",
+    "exp": "2023-11-14T22:13:20+00:00",
+    "n": [0, 1, -1, 63, -64, 2**40, -(2**40), 2.5, -0.0, True, False, None],
+    "nested": {"é": {"€": [[]]}, "": ""},
+}
+
+
+@pytest.mark.parametrize("name", ["json", "binary"])
+@pytest.mark.parametrize(
+    "purpose, encode_key, decode_key",
+    [("v4.local", KEY, KEY), ("v4.public", SECRET_KEY, PUBLIC_KEY)],
+)
+def test_claims_codec(
+    name: str, purpose: str, encode_key: bytes, decode_key: bytes
+) -> None:
+    """Test that tokens name their payload codec and decode with it."""
+    token = ClaimsCodec(purpose, encode_key, name).encode(CLAIMS)
+    decoder = ClaimsCodec(purpose, decode_key)
+    for _ in range(2):
+        assert decoder.decode(token) == CLAIMS
+    if purpose == "v4.local":
+        assert version4.decrypt(token, KEY, codec_footer(name))
+
+
+def test_footer_without_codec() -> None:
+    """Test that tokens with other footers are decoded with the default codec."""
+    decoder = ClaimsCodec("v2.local", b"0" * 32, "binary")
+    for footer in (b"", b"footer", b'{"kid":"a"}', b'{"cty":1}'):
+        token = version2.encrypt(encode_claims(CLAIMS), b"0" * 32, footer)
+        assert decoder.decode(token) == CLAIMS
+    token = version2.encrypt(
+        encode_binary(CLAIMS), b"0" * 32, b'{"kid":"a","cty":"binary"}'
+    )
+    assert decoder.decode(token) == CLAIMS
+
+
+def test_decode_errors() -> None:
+    """Test tokens naming unknown codecs, of other purposes or with invalid payloads."""
+    decoder = ClaimsCodec("v4.local", KEY)
+    with pytest.raises(InvalidFooter, match="Unknown payload codec 'xml'"):
+        decoder.decode(version4.encrypt(b"<a/>", KEY, codec_footer("xml")))
+    for data in (b"\x05\x01", bytes([8] + [0xFF] * 8 + [0x7F])):
+        with pytest.raises(InvalidPayload, match="not valid binary"):
+            decoder.decode(version4.encrypt(data, KEY, codec_footer("binary")))
+    with pytest.raises(InvalidPayload, match="not valid json"):
+        decoder.decode(version4.encrypt(b"{", KEY, codec_footer("json")))
+    token = ClaimsCodec("v4.public", SECRET_KEY).encode(CLAIMS)
+    with pytest.raises(InvalidHeader):
+        decoder.decode(token)
+    with pytest.raises(ValueError, match="Unknown payload codec"):
+        ClaimsCodec("v4.local", KEY, "xml")
+
+
+@pytest.mark.parametrize(
+    "footer, name",
+    [
+        (b'{"cty":"binary"}', "binary"),
+        (b'{"kid":"a","cty":"xml"}', "xml"),
+        (b'{"cty":1}', "json"),
+        (b"{cty}", "json"),
+        pytest.param(b'{"cty":' + b"[" * 8000, "json", id="nested"),
+        (b"", "json"),
+    ],
+)
+def test_footer_codec(footer: bytes, name: str) -> None:
+    """Test reading the payload codec from footers that may not be JSON."""
+    assert footer_codec(footer) == name
+
+
+def test_binary() -> None:
+    """Test that the binary encoding reads back the values JSON reads back."""
+    values: dict[str, Any] = {
+        **CLAIMS,
+        "tuple": (1, "a"),
+        "large": [2**64 - 1, -(2**63)],
+        "deep": [[[[[[[[[[{"a": [[[[[[[[[[{}]]]]]]]]]]}]]]]]]]]]],
+        "k" * 200: "v" * 200,
+        "time": datetime(2023, 11, 14, tzinfo=timezone.utc),
+    }
+    assert decode_binary(encode_binary(values)) == json.loads(encode_claims(values))
+    assert len(encode_binary(CLAIMS)) < len(encode_claims(CLAIMS))
+    assert encode_binary({"a": 1}) == b"\x07\x01\x01a\x03\x02"
+    # UTC times as format_time() writes them are epoch seconds
+    assert encode_binary("1970-01-01T00:00:01+00:00") == b"\x08\x02"
+    assert decode_binary(b"\x08\x01") == "1969-12-31T23:59:59+00:00"
+    for value in ("1970-01-01t00:00:01+00:00", "2023-W46-2T22:13:20+00:00", "x" * 25):
+        assert decode_binary(encode_binary(value)) == value
+        assert encode_binary(value)[0] == 5
+    with pytest.raises(TypeError, match="Keys must be str"):
+        encode_binary({1: 1})
+    with pytest.raises(TypeError, match="set can not be encoded"):
+        encode_binary({1})
+    for number in (2**64, -(2**63) - 1):
+        with pytest.raises(ValueError, match="does not fit into 64 bits"):
+            encode_binary(number)
+
+
+def test_binary_nesting() -> None:
+    """Test that lists and dicts nest up to 255 deep."""
+    value: Any = None
+    for depth in range(255):
+        value = [value] if depth % 2 else {"a": value}
+    assert decode_binary(encode_binary(value)) == value
+    with pytest.raises(ValueError, match="nested more than 255 deep"):
+        encode_binary([value])
+    with pytest.raises(ValueError, match="nested more than 255 deep"):
+        decode_binary(b"\x06\x01" + encode_binary(value))
+
+
+def test_binary_recursion_error() -> None:
+    """Test that running out of stack within the nesting limit raises ValueError."""
+    data = b"\x06\x01" * 100 + b"\x00"
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 50)
+    try:
+        with pytest.raises(ValueError, match="nests too deep"):
+            decode_binary(data)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"", "Truncated"),
+        (b"\x05\x02a", "Truncated"),
+        (b"\x07\x01\x02a", "Truncated"),
+        (b"\x03\x80", "Truncated"),
+        (b"\x04\x00", "Truncated"),
+        (b"\x06\x01", "Truncated"),
+        (b"\x05\x01\xff", "Truncated"),
+        (b"\x00\x00", "Trailing data"),
+        (b"\x08\x80", "Truncated"),
+        (b"\x09", "Unknown type tag 9"),
+        (bytes([3] + [0xFF] * 10 + [0x01]), "Varint longer than 10 bytes"),
+        (bytes([5] + [0xFF] * 10), "Varint longer than 10 bytes"),
+        (bytes([8] + [0xFF] * 8 + [0x7F]), "Time out of range"),
+        (bytes([8] + [0xFF] * 9 + [0x01]), "Time out of range"),
+        (bytes([6] * 100000) + b"\x00", "nested more than 255 deep"),
+        (b"\x07\x01\x01a" * 300 + b"\x00", "nested more than 255 deep"),
+    ],
+)
+def test_binary_errors(data: bytes, message: str) -> None:
+    """Test that malformed binary payloads raise ValueError."""
+    with pytest.raises(ValueError, match=message):
+        decode_binary(data)
+
+
+@pytest.fixture
+def restore_payload_codecs() -> Iterator[None]:
+    """Restore the registered payload codecs after a test."""
+    # pylint: disable=protected-access
+    loaders, codecs = payload._loaders.copy(), payload._codecs.copy()
+    yield
+    payload._loaders.clear()
+    payload._loaders.update(loaders)
+    payload._codecs.clear()
+    payload._codecs.update(codecs)
+
+
+@pytest.mark.usefixtures("restore_payload_codecs")
+def test_registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test registering codecs and falling back to json without orjson."""
+    payload.register_codec("missing", MagicMock(side_effect=ImportError))
+    payload.register_codec("plain", lambda: PayloadCodec("plain", bytes, bytes))
+    assert payload.available_codecs() == ["json", "binary", "plain"]
+    with pytest.raises(ValueError, match="'missing' is not available"):
+        get_codec("missing")
+    token = ClaimsCodec("v4.local", KEY, "plain").encode(b"foo")
+    assert ClaimsCodec("v4.local", KEY).decode(token) == b"foo"
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    payload.register_codec("json", payload._load_json)  # pylint: disable=protected-access
+    assert get_codec("json").encode is encode_claims
@@ -1,6 +1,10 @@
 """This module contains utility functions used in tests."""
 
 import json
+from collections.abc import Callable
+from typing import Any
+
+from paseto.protocol.common import BATCH_ITEM_ERRORS
 
 TransformedTestCaseV4 = tuple[str, bytes, bytes, bytes, bytes, bytes, bytes]
 TransformedTestCaseV2 = tuple[str, bytes, bytes, bytes, bytes, bytes]
@@ -76,3 +80,44 @@ def transform_test_case_for_v2_local(test_case: dict) -> TransformedTestCaseV2:
         json.dumps(test_case["payload"], separators=(",", ":")).encode(),
         test_case["footer"].encode(),
     )
+
+
+def single_results(
+    function: Callable[..., bytes], items: list[bytes], *args: Any
+) -> list[bytes | type[Exception]]:
+    """Return result of function, or type of exception it raised, for each item."""
+    results: list[bytes | type[Exception]] = []
+    for item in items:
+        try:
+            results.append(function(item, *args))
+        except BATCH_ITEM_ERRORS as error:
+            results.append(type(error))
+    return results
+
+
+def successful(results: list[bytes | Exception]) -> list[bytes]:
+    """Return results of a batch function, checking that no item failed."""
+    tokens = [result for result in results if isinstance(result, bytes)]
+    assert len(tokens) == len(results)
+    return tokens
+
+
+def batch_results(results: list[bytes | Exception]) -> list[bytes | type[Exception]]:
+    """Replace exceptions returned by a batch function with their types."""
+    return [
+        type(result) if isinstance(result, Exception) else result for result in results
+    ]
+
+
+def corrupted_tokens(token: bytes, header: bytes) -> list[bytes]:
+    """Return token followed by variants failing each check of decryption."""
+    body, _, footer = token[len(header) :].partition(b".")
+    forged = body[:-2] + (b"A" if body[-2:-1] != b"A" else b"B") + body[-1:]
+    return [
+        token,
+        token.replace(header, b"v3.local."),
+        header + body + b"." + footer + b"x",
+        header + forged + b"." + footer,
+        header + b"!" + body + b"." + footer,
+        header + body[:20] + b"." + footer,
+    ]